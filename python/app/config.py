@@ -1,10 +1,33 @@
+import os
 from typing import Dict, List, Tuple
 
 # Constantes y configuración
 WEATHER_UPDATE_INTERVAL = 15  # segundos
 MAX_HISTORY_SIZE = 10
+ROUTE_LOG_PATH = os.environ.get("METRO_ROUTE_LOG_PATH", "route_history.jsonl")
+ROUTE_LOG_PAGE_SIZE = 100
+MAX_ROUTE_LOG_PAGE_SIZE = 1000
 DEFAULT_COORDINATES = (6.2442, -75.5812)
 
+# Instantáneas para arranques en caliente (estado del clima y pesos del grafo)
+SNAPSHOT_PATH = os.environ.get("METRO_SNAPSHOT_PATH", "metro_snapshot.npz")
+SNAPSHOT_INTERVAL = 4  # cada cuántas actualizaciones del clima se guarda
+
+# Historial del clima por estación en memoria: últimas actualizaciones (un día)
+WEATHER_HISTORY_SIZE = 24 * 3600 // WEATHER_UPDATE_INTERVAL
+
+# Estado compartido entre workers: nombre del segmento de memoria compartida
+# donde un proceso productor publica el clima y los pesos (vacío = desactivado)
+SHARED_STATE_NAME = os.environ.get("METRO_SHARED_STATE", "")
+SHARED_STATE_POLL_INTERVAL = 1  # segundos entre lecturas de los workers lectores
+# Segundos sin latido del productor tras los cuales un lector toma su lugar
+SHARED_STATE_PRODUCER_TIMEOUT = 3 * WEATHER_UPDATE_INTERVAL
+
+# Grabación opcional de las actualizaciones del clima y de las consultas de rutas
+# (HTTP y WebSocket) en un registro binario para reproducirlas (vacío = desactivada)
+RECORD_PATH = os.environ.get("METRO_RECORD_PATH", "")
+RECORDED_PATH_PREFIXES = ("/route", "/admin/closures")
+
 # Factores de velocidad según el clima
 WEATHER_SPEED_FACTORS = {
     "sunny": 1.0,      # Velocidad normal
@@ -30,6 +53,27 @@ LINE_TRANSPORT_TYPES = {
     "0": "bus", "1": "bus", "2": "bus"
 }
 
+# Frecuencia de servicio por línea: minutos entre vehículos y horario de la
+# primera y la última salida desde cada terminal (hora local)
+LINE_SERVICE = {
+    "A": {"headway": 4, "first_departure": "04:30", "last_departure": "23:00"},
+    "B": {"headway": 6, "first_departure": "04:30", "last_departure": "23:00"},
+    "H": {"headway": 1, "first_departure": "04:30", "last_departure": "23:00"},
+    "J": {"headway": 1, "first_departure": "04:30", "last_departure": "23:00"},
+    "K": {"headway": 1, "first_departure": "04:30", "last_departure": "23:00"},
+    "L": {"headway": 2, "first_departure": "09:00", "last_departure": "18:00"},
+    "M": {"headway": 1, "first_departure": "04:30", "last_departure": "23:00"},
+    "P": {"headway": 1, "first_departure": "04:30", "last_departure": "23:00"},
+    "TA": {"headway": 5, "first_departure": "04:30", "last_departure": "23:00"},
+    "0": {"headway": 8, "first_departure": "05:00", "last_departure": "22:00"},
+    "1": {"headway": 6, "first_departure": "05:00", "last_departure": "22:00"},
+    "2": {"headway": 6, "first_departure": "05:00", "last_departure": "22:00"}
+}
+DEFAULT_LINE_SERVICE = {"headway": 10, "first_departure": "05:00", "last_departure": "22:00"}
+LOCAL_UTC_OFFSET = -5  # horas (Colombia)
+MAX_TIMETABLE_TRANSFERS = 5
+TIMETABLE_CRITERIA = ("earliest", "min_transfers")
+
 # Tiempo de transbordo en minutos
 TRANSFER_TIME = 3.0
 
@@ -307,4 +351,60 @@ WEATHER_STATES = {
         "humidity_range": (80, 100),
         "visibility_range": (1, 4)
     }
-}
\ No newline at end of file
+}
+
+# Tamaño de celda (metros) de la grilla espacial del clima: el diámetro del
+# fenómeno climático más pequeño, de modo que estaciones cercanas compartan celda
+WEATHER_GRID_CELL_SIZE = 2 * min(state["radius"] for state in WEATHER_STATES.values())
+
+# Precálculo de las rutas más solicitadas tras cada cambio de pesos
+POPULAR_ROUTES_K = 20
+POPULARITY_SKETCH_WIDTH = 2048
+POPULARITY_SKETCH_DEPTH = 4
+
+# Índice espacial de estaciones para búsquedas por coordenadas
+STATION_INDEX_CELL_SIZE = 500  # metros
+NEAREST_STATIONS_K = 3
+MAX_NEAREST_STATIONS = 10
+
+# Búsqueda de estaciones por nombre (sin tildes ni mayúsculas)
+STATION_SEARCH_LIMIT = 10
+MAX_STATION_SEARCH_LIMIT = 50
+# Un nombre escrito por el usuario se resuelve a la mejor coincidencia si su puntaje
+# (0 a 1) llega al umbral y supera por el margen a la siguiente estación distinta
+STATION_MATCH_THRESHOLD = 0.3
+STATION_MATCH_MARGIN = 0.05
+WALKING_SPEED = 4.5  # km/h
+
+# Límites por conexión WebSocket: consultas simultáneas y tasa (cubeta de fichas)
+WS_MAX_IN_FLIGHT = 4
+WS_RATE_LIMIT = 5.0  # consultas por segundo
+WS_RATE_BURST = 10
+
+# Formatos de la matriz de tiempos de viaje
+MATRIX_FORMATS = ("json", "npy")
+MATRIX_METRICS = ("times", "transfers")
+
+# Mapa de la red para renderizar en el cliente (GeoJSON y teselas vectoriales)
+MAX_TILE_ZOOM = 20
+MAX_CACHED_TILES = 4096
+
+# Confiabilidad de rutas: simulación de Monte Carlo sobre futuros del clima
+RELIABILITY_SAMPLES = 500  # muestras por defecto
+MAX_RELIABILITY_SAMPLES = 20000
+RELIABILITY_PARALLEL_THRESHOLD = 2000  # desde esta cantidad las muestras se reparten en procesos
+RELIABILITY_CHUNK_SIZE = 1000  # muestras por tarea en el grupo de procesos
+RELIABILITY_WORKERS = min(4, os.cpu_count() or 1)
+
+# Simulador de escenarios del clima sin servidor (capacidad de la red en un día completo)
+SCENARIO_TICKS = 24 * 3600 // WEATHER_UPDATE_INTERVAL  # un día de actualizaciones del clima
+SCENARIO_BLOCK_TICKS = 1024  # actualizaciones evaluadas por lote
+SCENARIO_WORST_SEGMENTS = 5
+SCENARIO_SUSPENSION_PENALTY = 3.0  # desde esta penalización el tramo se considera suspendido
+SCENARIO_FORMATS = ("npz", "csv")
+
+# Fuente alternativa de la red: un feed GTFS local (zip). Si se indica, sus líneas,
+# transbordos y frecuencias reemplazan a los definidos arriba al construir la red
+# (NetworkConfig), no al importar este módulo
+GTFS_FEED_PATH = os.environ.get("METRO_GTFS_PATH", "")
+GTFS_CACHE_DIR = os.environ.get("METRO_GTFS_CACHE_DIR", ".gtfs_cache")
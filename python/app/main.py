@@ -5,7 +5,8 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.routes import api
-from app.services.weather_service import weather_monitoring_system
+from app.services import init_services, shutdown_services, get_metro_system, get_weather_monitoring_system
+from app.config import RECORD_PATH, RECORDED_PATH_PREFIXES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,8 +24,27 @@ app.add_middleware(
 # Incluir las rutas
 app.include_router(api.router)
 
+# Grabación opcional de las consultas de rutas para reproducirlas después
+if RECORD_PATH:
+    from app.services.recording_service import record_http
+
+    @app.middleware("http")
+    async def record_requests(request, call_next):
+        if request.url.path.startswith(RECORDED_PATH_PREFIXES):
+            record_http(request.method, request.url.path, request.url.query)
+        return await call_next(request)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Crear los servicios al arrancar (no al importar) para que los workers inicien rápido
+    init_services()
+    weather_monitoring_system = get_weather_monitoring_system()
+    
+    # Publicar el primer clima antes de atender solicitudes (salvo que venga de una instantánea
+    # o de otro worker), ya que las solicitudes solo leen la última instantánea publicada
+    if weather_monitoring_system.snapshot is None:
+        await weather_monitoring_system.tick()
+    
     # Iniciar la tarea de actualización del clima cuando la aplicación arranca
     weather_task = asyncio.create_task(weather_monitoring_system.update_weather_periodically())
     yield
@@ -34,6 +54,11 @@ async def lifespan(app: FastAPI):
         await weather_task
     except asyncio.CancelledError:
         logger.info("Tarea de clima cancelada")
+    # Guardar el estado final para el próximo arranque (solo quien simula el clima)
+    if not weather_monitoring_system.is_shared_reader:
+        from app.services.snapshot_service import save_state
+        save_state(get_metro_system(), weather_monitoring_system)
+    shutdown_services()
 
 app.router.lifespan_context = lifespan
 
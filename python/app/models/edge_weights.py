@@ -0,0 +1,46 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+import numpy as np
+
+INFINITY = float('inf')
+
+
+@dataclass(frozen=True)
+class EdgeWeights:
+    """
+    Versión inmutable de los pesos de las aristas del grafo.
+    `values[eid]` es el peso de la arista cuyo atributo `eid` vale `eid`, y
+    `weather_conditions` es el clima con el que se calcularon. Un escritor construye
+    la siguiente versión aparte y la publica reemplazando la referencia; cada búsqueda
+    fija una versión al empezar y la usa hasta terminar, sin bloqueos.
+    """
+    version: int
+    values: np.ndarray
+    weather_conditions: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def create(cls, version: int, values, weather_conditions: Dict[str, Dict]) -> "EdgeWeights":
+        values = np.array(values, dtype=np.float64, copy=True)
+        values.flags.writeable = False
+        return cls(version=version, values=values, weather_conditions=weather_conditions)
+
+    def next(self, values, weather_conditions: Dict[str, Dict] = None) -> "EdgeWeights":
+        """Construye la versión siguiente (sin publicarla)"""
+        return EdgeWeights.create(
+            self.version + 1,
+            values,
+            self.weather_conditions if weather_conditions is None else weather_conditions
+        )
+
+    @property
+    def weight(self) -> Callable[[str, str, Dict], Optional[float]]:
+        """
+        Función de peso compatible con networkx para esta versión.
+        Las aristas cerradas tienen peso infinito y se ocultan (None) a la búsqueda.
+        """
+        values = self.values
+
+        def weight(u, v, data):
+            value = values[data['eid']]
+            return None if value == INFINITY else value
+        return weight
@@ -1,32 +1,116 @@
 import networkx as nx
-from typing import Dict, List, Tuple
-from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timezone, timedelta
 import random
+import numpy as np
 from math import radians, sin, cos, sqrt, atan2
 from app.config import (
-    METRO_LINES, 
     WEATHER_SPEED_FACTORS, 
     TRANSPORT_SPEEDS, 
-    LINE_TRANSPORT_TYPES,
-    TRANSFER_CONNECTIONS,
     TRANSFER_TIME,
-    TRANSFER_VISUAL
+    TRANSFER_VISUAL,
+    STATION_INDEX_CELL_SIZE,
+    WALKING_SPEED,
+    POPULAR_ROUTES_K,
+    POPULARITY_SKETCH_WIDTH,
+    POPULARITY_SKETCH_DEPTH,
+    LOCAL_UTC_OFFSET,
+    MAX_TIMETABLE_TRANSFERS,
+    TIMETABLE_CRITERIA,
+    WEATHER_STATES,
+    STATION_MATCH_THRESHOLD,
+    STATION_MATCH_MARGIN
 )
-from app.models.weather_monitoring import WeatherMonitoringSystem
+from app.models.route_history import RouteHistory
+from app.models.edge_weights import EdgeWeights
+from app.models.network_config import NetworkConfig
+from app.models.timetable import Timetable, format_clock, parse_clock
+from app.utils.spatial_index import GridIndex
+from app.utils.station_search import StationSearchIndex
+from app.utils.routing import multi_source_dijkstra
+from app.utils.popularity import TopKTracker
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Penalizaciones específicas por tipo de transporte
+TRANSPORT_WEATHER_PENALTIES = {
+    "metro": {
+        "cloudy": 1.3,   # 30% más lento
+        "rainy": 1.8,    # 80% más lento
+        "stormy": 2.5    # 150% más lento
+    },
+    "cable": {
+        "cloudy": 1.5,   # 50% más lento
+        "rainy": 2.0,    # 100% más lento
+        "stormy": 3.0    # 200% más lento (o suspensión del servicio)
+    },
+    "tranvia": {
+        "cloudy": 1.4,   # 40% más lento
+        "rainy": 1.9,    # 90% más lento
+        "stormy": 2.7    # 170% más lento
+    },
+    "bus": {
+        "cloudy": 1.6,   # 60% más lento
+        "rainy": 2.2,    # 120% más lento
+        "stormy": 3.0    # 200% más lento
+    }
+}
+SEVERE_WEATHER_PENALTY = 2.0    # Por encima de esta penalización se agrega un retraso de seguridad
+SAFETY_DELAY_FACTOR = 0.3       # 30% del tiempo base adicional
+TRAVEL_TIME_VARIABILITY = (0.9, 1.1)  # Variabilidad aleatoria (±10%)
+MIN_TRAVEL_TIME = 1.0           # Minutos
+LINE_CHANGE_TIME = 3            # Minutos por cada cambio de línea en una ruta
+
 class MetroSystem:
-    def __init__(self):
+    def __init__(self, network: NetworkConfig, verify_connectivity: bool = True,
+                 previous: "MetroSystem" = None):
+        """
+        Construye la red definida por `network`. Con `previous` se construye el reemplazo de una red en servicio (recarga de la
+        configuración): comparte su historial, su popularidad y su hilo de precálculo y
+        reutiliza los índices de estaciones si las estaciones no cambiaron.
+        """
+        self.network = network
         self.metro_graph = nx.Graph()
         self.current_route = None
-        self.route_history = []
-        self.weather_conditions = {}
+        self.history = previous.history if previous else RouteHistory()
+        # Pesos de las aristas publicados (versión inmutable que se reemplaza completa)
+        self._weights: EdgeWeights = None
+        # Caché de rutas: (versión de los pesos, rutas); se reemplaza completa, nunca por partes
+        self._route_cache: Tuple[int, Dict[Tuple[str, str], Dict]] = (0, {})
+        # Filas de la matriz de tiempos (por estación de origen) de una versión de los pesos
+        self._matrix_rows: Tuple[int, Dict[str, Tuple[np.ndarray, np.ndarray]]] = (-1, {})
+        # Arreglos de la red para evaluar tiempos por lotes (se crean en el primer uso)
+        self._edge_cost_model: Dict[str, np.ndarray] = None
+        # Cierres administrativos: aristas (por eid) y estaciones fuera de servicio
+        self.closed_edges: Set[int] = set()
+        self.closed_stations: Set[str] = set()
+        if previous:
+            self.popularity = previous.popularity
+            self._prewarm_executor = previous._prewarm_executor
+        else:
+            self.popularity = TopKTracker(POPULAR_ROUTES_K, POPULARITY_SKETCH_WIDTH, POPULARITY_SKETCH_DEPTH)
+            self._prewarm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="route-prewarm")
         self.connected_clients = set()
-        self.weather_monitoring = WeatherMonitoringSystem()
-        self.initialize_graph()
-        self.update_weather()
+        self.initialize_graph(verify_connectivity, previous)
+
+    @property
+    def weather_conditions(self) -> Dict[str, Dict]:
+        """Clima con el que se calcularon los pesos publicados"""
+        return self._weights.weather_conditions
+
+    @property
+    def weights_version(self) -> int:
+        return self._weights.version
+
+    def pin_weights(self) -> EdgeWeights:
+        """Fija la versión actual de los pesos para usarla durante toda una búsqueda"""
+        return self._weights
+
+    def _publish_weights(self, weights: EdgeWeights):
+        """Publica una nueva versión de los pesos con un reemplazo atómico de la referencia"""
+        self._weights = weights
 
     def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         R = 6371  # Radio de la Tierra en km
@@ -37,18 +121,22 @@ class MetroSystem:
 
     def get_station_coordinates(self, station: str, line: str = None) -> List[float]:
         """Obtiene las coordenadas de una estación"""
-        if line and line in METRO_LINES:
-            if station in METRO_LINES[line]["stations"]:
-                return METRO_LINES[line]["stations"][station]
+        lines = self.network.lines
+        if line and line in lines:
+            if station in lines[line]["stations"]:
+                return lines[line]["stations"][station]
         
         # Si no se especifica línea o no se encuentra en la línea especificada,
         # buscar en todas las líneas
-        for line_info in METRO_LINES.values():
+        for line_info in lines.values():
             if station in line_info["stations"]:
                 return line_info["stations"][station]
         return None
 
-    def calculate_travel_time(self, station1: str, station2: str, line: str) -> float:
+    def calculate_travel_time(self, station1: str, station2: str, line: str,
+                              weather_conditions: Dict[str, Dict] = None) -> float:
+        if weather_conditions is None:
+            weather_conditions = self.weather_conditions
         coords1 = self.get_station_coordinates(station1)
         coords2 = self.get_station_coordinates(station2)
         
@@ -56,46 +144,22 @@ class MetroSystem:
             return 1.0
             
         distance = self.calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
-        base_speed = TRANSPORT_SPEEDS[LINE_TRANSPORT_TYPES.get(line, "metro")]
+        base_speed = TRANSPORT_SPEEDS[self.network.transport_types.get(line, "metro")]
 
         # Obtener condiciones climáticas de ambas estaciones
-        weather1 = self.weather_conditions.get(station1, {'type': 'sunny'})
-        weather2 = self.weather_conditions.get(station2, {'type': 'sunny'})
+        weather1 = weather_conditions.get(station1, {'type': 'sunny'})
+        weather2 = weather_conditions.get(station2, {'type': 'sunny'})
         
         # Usar el clima más severo entre las dos estaciones
         weather_type1 = weather1.get('type', 'sunny')
         weather_type2 = weather2.get('type', 'sunny')
         
         # Factores base según el tipo de transporte
-        transport_type = LINE_TRANSPORT_TYPES.get(line, "metro")
-        
-        # Penalizaciones específicas por tipo de transporte
-        transport_penalties = {
-            "metro": {
-                "cloudy": 1.3,   # 30% más lento
-                "rainy": 1.8,    # 80% más lento
-                "stormy": 2.5    # 150% más lento
-            },
-            "cable": {
-                "cloudy": 1.5,   # 50% más lento
-                "rainy": 2.0,    # 100% más lento
-                "stormy": 3.0    # 200% más lento (o suspensión del servicio)
-            },
-            "tranvia": {
-                "cloudy": 1.4,   # 40% más lento
-                "rainy": 1.9,    # 90% más lento
-                "stormy": 2.7    # 170% más lento
-            },
-            "bus": {
-                "cloudy": 1.6,   # 60% más lento
-                "rainy": 2.2,    # 120% más lento
-                "stormy": 3.0    # 200% más lento
-            }
-        }
-
+        transport_type = self.network.transport_types.get(line, "metro")
+        
         # Obtener el factor de penalización específico para este tipo de transporte y clima
-        weather_penalty1 = transport_penalties.get(transport_type, {}).get(weather_type1, 1.0)
-        weather_penalty2 = transport_penalties.get(transport_type, {}).get(weather_type2, 1.0)
+        weather_penalty1 = TRANSPORT_WEATHER_PENALTIES.get(transport_type, {}).get(weather_type1, 1.0)
+        weather_penalty2 = TRANSPORT_WEATHER_PENALTIES.get(transport_type, {}).get(weather_type2, 1.0)
         
         # Usar la penalización más alta
         final_penalty = max(weather_penalty1, weather_penalty2)
@@ -116,18 +180,18 @@ class MetroSystem:
         weather_adjusted_time = base_time * final_weather_factor
         
         # Añadir penalizaciones adicionales por condiciones severas
-        if final_penalty > 2.0:  # Para climas muy severos
+        if final_penalty > SEVERE_WEATHER_PENALTY:  # Para climas muy severos
             # Añadir tiempo extra para precauciones de seguridad
-            safety_delay = base_time * 0.3  # 30% del tiempo base adicional
+            safety_delay = base_time * SAFETY_DELAY_FACTOR
             weather_adjusted_time += safety_delay
         
         # Añadir variabilidad aleatoria (±10%)
-        final_time = weather_adjusted_time * random.uniform(0.9, 1.1)
+        final_time = weather_adjusted_time * random.uniform(*TRAVEL_TIME_VARIABILITY)
         
         # Asegurar un tiempo mínimo razonable
-        return max(final_time, 1.0)
+        return max(final_time, MIN_TRAVEL_TIME)
 
-    def initialize_graph(self):
+    def initialize_graph(self, verify_connectivity: bool = True, previous: "MetroSystem" = None):
         """Inicializa el grafo del metro con la nueva estructura de datos"""
         logger.info("Iniciando inicialización del grafo")
         
@@ -136,14 +200,14 @@ class MetroSystem:
         
         # Primero agregar todos los nodos (estaciones) una sola vez
         added_stations = set()
-        for line_name, line_info in METRO_LINES.items():
+        for line_name, line_info in self.network.lines.items():
             for station, coords in line_info["stations"].items():
                 if station not in added_stations:
                     self.metro_graph.add_node(station, pos=coords)
                     added_stations.add(station)
         
         # Luego agregar las conexiones entre estaciones
-        for line_name, line_info in METRO_LINES.items():
+        for line_name, line_info in self.network.lines.items():
             stations = list(line_info["stations"].keys())
             # Crear conexiones entre estaciones consecutivas en la misma línea
             for i in range(len(stations) - 1):
@@ -156,7 +220,7 @@ class MetroSystem:
                 )
         
         # Agregar conexiones de transbordo
-        for station1, station2 in TRANSFER_CONNECTIONS:
+        for station1, station2 in self.network.transfers:
             self.metro_graph.add_edge(
                 station1,
                 station2,
@@ -165,8 +229,39 @@ class MetroSystem:
                 weight=TRANSFER_TIME
             )
         
-        # Verificar la conectividad del grafo
-        if not nx.is_connected(self.metro_graph):
+        # Identificar cada arista por su posición y publicar los pesos iniciales
+        for eid, (station1, station2) in enumerate(self.metro_graph.edges()):
+            self.metro_graph[station1][station2]['eid'] = eid
+        self._publish_weights(EdgeWeights.create(
+            0,
+            [weight for _, _, weight in self.metro_graph.edges(data='weight')],
+            {}
+        ))
+        
+        self._edge_cost_model = None
+        
+        # Horario por líneas para consultas con hora de salida
+        self.timetable = Timetable(self.metro_graph, self.network.lines, self.network.services)
+        
+        if previous is not None and list(previous.metro_graph.nodes(data='pos')) == list(self.metro_graph.nodes(data='pos')):
+            # Recarga sin cambios en las estaciones: los índices de estaciones siguen valiendo
+            self.station_index = previous.station_index
+            self.station_search = previous.station_search
+        else:
+            # Índice espacial de estaciones para consultas por coordenadas
+            # (se omiten nodos sin coordenadas creados solo por conexiones de transbordo)
+            self.station_index = GridIndex.build(
+                {station: pos for station, pos in self.metro_graph.nodes(data='pos') if pos},
+                STATION_INDEX_CELL_SIZE
+            )
+            
+            # Índice de nombres sin tildes ni mayúsculas para búsqueda y resolución de nombres
+            self.station_search = StationSearchIndex(self.metro_graph.nodes())
+        
+        # Verificar la conectividad del grafo (se omite en arranques en caliente)
+        if not verify_connectivity:
+            logger.info("Verificación de conectividad omitida: la red coincide con la instantánea")
+        elif not nx.is_connected(self.metro_graph):
             components = list(nx.connected_components(self.metro_graph))
             logger.warning(f"El grafo no está completamente conectado. Hay {len(components)} componentes separados")
             for i, component in enumerate(components):
@@ -176,17 +271,158 @@ class MetroSystem:
         
         logger.info(f"Grafo inicializado con {len(self.metro_graph.nodes())} estaciones y {len(self.metro_graph.edges())} conexiones")
 
+    @property
+    def route_history(self) -> List[Dict]:
+        """Últimas rutas calculadas, de la más reciente a la más antigua"""
+        return self.history.recent()
+
     def add_to_history(self, route: Dict) -> Dict:
         """Agregar ruta al historial con ID único"""
-        route_with_id = {
-            **route,
-            "id": len(self.route_history),
-            "timestamp": datetime.now().isoformat()
+        return self.history.add(route)
+
+    def _build_route(self, path: List[str], weights: EdgeWeights = None) -> Dict:
+        """Construye la descripción de una ruta (tiempos, líneas, transbordos y clima) a partir de su camino"""
+        weather_conditions = (weights or self.pin_weights()).weather_conditions
+        total_time = 0
+        total_distance = 0
+        lines = []
+        current_line = None
+        transbordos = []
+        weather_impacts = []
+        
+        for i in range(len(path) - 1):
+            station1, station2 = path[i], path[i + 1]
+            edge = self.metro_graph[station1][station2]
+            
+            # Obtener coordenadas y calcular distancia
+            coords1 = self.get_station_coordinates(station1)
+            coords2 = self.get_station_coordinates(station2)
+            
+            if coords1 and coords2:  # Verificar que existan las coordenadas
+                segment_distance = self.calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
+                total_distance += segment_distance
+            
+            # Calcular tiempo de viaje
+            time = self.calculate_travel_time(station1, station2, edge['line'], weather_conditions)
+            total_time += time
+            
+            # Registrar línea y transbordos
+            if edge['line'] != current_line:
+                if current_line is not None:  # Si hay cambio de línea
+                    transbordos.append(station1)
+                    total_time += LINE_CHANGE_TIME  # Añadir tiempo de transbordo
+                current_line = edge['line']
+                if current_line not in lines:
+                    lines.append(current_line)
+            
+            # Registrar impactos del clima
+            weather1 = weather_conditions.get(station1, {'type': 'sunny', 'name': 'Soleado'})
+            weather2 = weather_conditions.get(station2, {'type': 'sunny', 'name': 'Soleado'})
+            
+            if weather1['type'] != 'sunny' or weather2['type'] != 'sunny':
+                weather_impacts.append({
+                    "segment": [station1, station2],
+                    "line": edge['line'],
+                    "conditions": {
+                        "origin": {
+                            "station": station1,
+                            "weather": weather1['name'],
+                            "impact": round((1 - WEATHER_SPEED_FACTORS[weather1['type']]) * 100)
+                        },
+                        "destination": {
+                            "station": station2,
+                            "weather": weather2['name'],
+                            "impact": round((1 - WEATHER_SPEED_FACTORS[weather2['type']]) * 100)
+                        }
+                    }
+                })
+
+        route = {
+            "path": path,
+            "coordinates": [self.get_station_coordinates(station) for station in path],
+            "num_stations": len(path) - 1,
+            "lines": lines,
+            "estimated_time": round(total_time),
+            "total_distance": round(total_distance, 2),
+            "transbordos": transbordos,
+            "weather_impacts": weather_impacts,
+            "weather_conditions": weather_conditions
         }
-        self.route_history.insert(0, route_with_id)
-        if len(self.route_history) > 10:
-            self.route_history.pop()
-        return route_with_id
+        return route
+
+    def _pinned_route_cache(self, weights: EdgeWeights) -> Optional[Dict[Tuple[str, str], Dict]]:
+        """Rutas en caché de la versión de los pesos fijada (None si la caché es de otra versión)"""
+        version, cache = self._route_cache
+        return cache if version == weights.version else None
+
+    def _compute_route(self, origin: str, destination: str, weights: EdgeWeights = None,
+                       cache: Optional[Dict[Tuple[str, str], Dict]] = None) -> Dict:
+        """
+        Calcula una ruta con una única versión de los pesos (la publicada si no se indica)
+        y la guarda en `cache`, las rutas en caché capturadas al fijar esos pesos. Si la
+        caché se reemplazó entretanto, la ruta queda en el diccionario descartado.
+        """
+        if weights is None:
+            weights = self.pin_weights()
+            cache = self._pinned_route_cache(weights)
+        path = nx.shortest_path(self.metro_graph, origin, destination, weight=weights.weight)
+        logger.info(f"Ruta encontrada: {path}")
+
+        route = self._build_route(path, weights)
+        if cache is not None:
+            cache[(origin, destination)] = route
+        return route
+
+    def invalidate_route_cache(self):
+        """Descarta las rutas calculadas y asocia la caché a la versión vigente de los pesos"""
+        self._route_cache = (self.weights_version, {})
+
+    @property
+    def cached_routes(self) -> int:
+        return len(self._pinned_route_cache(self.pin_weights()) or {})
+
+    def schedule_prewarm(self):
+        """Recalcula en segundo plano las rutas más solicitadas para la versión actual de los pesos"""
+        self._prewarm_executor.submit(self.prewarm_popular_routes, self.weights_version)
+
+    def wait_for_background_work(self):
+        """Espera a que terminen los precálculos y recálculos de rutas ya programados"""
+        self._prewarm_executor.submit(lambda: None).result()
+
+    def prewarm_popular_routes(self, version: int) -> int:
+        """Calcula las rutas más populares que no estén en caché; se detiene si los pesos cambian"""
+        computed = 0
+        for (origin, destination), _ in self.popularity.top():
+            weights = self.pin_weights()
+            if version != weights.version:
+                logger.info("Precálculo de rutas populares interrumpido: los pesos cambiaron")
+                break
+            cache = self._pinned_route_cache(weights)
+            if cache is not None and (origin, destination) in cache:
+                continue
+            try:
+                self._compute_route(origin, destination, weights, cache)
+                computed += 1
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                continue
+            except Exception as e:
+                logger.error(f"Error al precalcular la ruta {origin} -> {destination}: {e}", exc_info=True)
+        if computed:
+            logger.info(f"Rutas populares precalculadas: {computed}")
+        return computed
+
+    def popular_routes(self) -> List[Dict]:
+        """Pares origen-destino más solicitados con su frecuencia estimada"""
+        cache = self._pinned_route_cache(self.pin_weights()) or {}
+        return [
+            {
+                "origin": origin,
+                "destination": destination,
+                "estimated_requests": count,
+                "cached": (origin, destination) in cache
+            }
+            for (origin, destination), count in self.popularity.top()
+        ]
 
     def find_route(self, origin: str, destination: str) -> Dict:
         """Encuentra la mejor ruta entre dos estaciones"""
@@ -209,74 +445,14 @@ class MetroSystem:
             logger.info(f"Nodos en el grafo: {len(self.metro_graph.nodes())}")
             logger.info(f"Aristas en el grafo: {len(self.metro_graph.edges())}")
             
-            path = nx.shortest_path(self.metro_graph, origin, destination, weight='weight')
-            logger.info(f"Ruta encontrada: {path}")
-            
-            total_time = 0
-            total_distance = 0
-            lines = []
-            current_line = None
-            transbordos = []
-            weather_impacts = []
-            
-            for i in range(len(path) - 1):
-                station1, station2 = path[i], path[i + 1]
-                edge = self.metro_graph[station1][station2]
-                
-                # Obtener coordenadas y calcular distancia
-                coords1 = self.get_station_coordinates(station1)
-                coords2 = self.get_station_coordinates(station2)
-                
-                if coords1 and coords2:  # Verificar que existan las coordenadas
-                    segment_distance = self.calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
-                    total_distance += segment_distance
-                
-                # Calcular tiempo de viaje
-                time = self.calculate_travel_time(station1, station2, edge['line'])
-                total_time += time
-                
-                # Registrar línea y transbordos
-                if edge['line'] != current_line:
-                    if current_line is not None:  # Si hay cambio de línea
-                        transbordos.append(station1)
-                        total_time += 3  # Añadir tiempo de transbordo
-                    current_line = edge['line']
-                    if current_line not in lines:
-                        lines.append(current_line)
-                
-                # Registrar impactos del clima
-                weather1 = self.weather_conditions.get(station1, {'type': 'sunny', 'name': 'Soleado'})
-                weather2 = self.weather_conditions.get(station2, {'type': 'sunny', 'name': 'Soleado'})
-                
-                if weather1['type'] != 'sunny' or weather2['type'] != 'sunny':
-                    weather_impacts.append({
-                        "segment": [station1, station2],
-                        "line": edge['line'],
-                        "conditions": {
-                            "origin": {
-                                "station": station1,
-                                "weather": weather1['name'],
-                                "impact": round((1 - WEATHER_SPEED_FACTORS[weather1['type']]) * 100)
-                            },
-                            "destination": {
-                                "station": station2,
-                                "weather": weather2['name'],
-                                "impact": round((1 - WEATHER_SPEED_FACTORS[weather2['type']]) * 100)
-                            }
-                        }
-                    })
-
-            route = {
-                "path": path,
-                "coordinates": [self.get_station_coordinates(station) for station in path],
-                "num_stations": len(path) - 1,
-                "lines": lines,
-                "estimated_time": round(total_time),
-                "total_distance": round(total_distance, 2),
-                "transbordos": transbordos,
-                "weather_impacts": weather_impacts,
-                "weather_conditions": self.weather_conditions
-            }
+            self.popularity.add((origin, destination))
+            weights = self.pin_weights()
+            cache = self._pinned_route_cache(weights)
+            route = cache.get((origin, destination)) if cache is not None else None
+            if route is not None:
+                logger.info(f"Ruta obtenida de la caché: {route['path']}")
+            else:
+                route = self._compute_route(origin, destination, weights, cache)
             
             return self.add_to_history(route)
         
@@ -287,42 +463,535 @@ class MetroSystem:
             logger.error(f"Error al calcular ruta: {e}", exc_info=True)
             return None
 
-    def update_weather(self):
-        """Actualiza las condiciones climáticas basadas en lecturas de sensores"""
-        updated_conditions = {}
-        
-        for station_name, weather_station in self.weather_monitoring.stations.items():
-            weather_data = self.weather_monitoring.update_weather()[station_name]
-            weather_station.weather_data = weather_data
-            weather_station.last_updated = datetime.now(timezone.utc)
+    def find_timetable_route(self, origin: str, destination: str, depart_at: str = None,
+                             criterion: str = "earliest") -> Dict:
+        """
+        Encuentra un viaje saliendo a una hora dada ('HH:MM', por defecto la hora local actual)
+        según el horario de cada línea, incluyendo las esperas en las paradas.
+        `criterion` elige entre la llegada más temprana ("earliest") y el menor número
+        de transbordos ("min_transfers"); las demás opciones se devuelven como alternativas.
+        Lanza ValueError si `depart_at` no es una hora válida.
+        """
+        if depart_at is None:
+            now = datetime.now(timezone(timedelta(hours=LOCAL_UTC_OFFSET)))
+            departure = now.hour * 60.0 + now.minute
+        else:
+            departure = parse_clock(depart_at)
+
+        try:
+            logger.info(f"Buscando viaje desde {origin} hasta {destination} saliendo a las {format_clock(departure)}")
             
-            # Preparar datos para el cliente
-            updated_conditions[station_name] = {
-                "type": weather_data["type"],
-                "intensity": weather_data["intensity"],
-                "name": weather_data["name"],
-                "icon": weather_data["icon"],
-                "location": weather_data["location"],
-                "readings": weather_data["readings"],
-                "station_id": weather_data["station_id"],
-                "last_updated": weather_data["last_updated"],
-                "status": weather_data["status"]
+            if origin not in self.metro_graph.nodes():
+                logger.error(f"Estación de origen '{origin}' no encontrada")
+                return None
+            if destination not in self.metro_graph.nodes():
+                logger.error(f"Estación de destino '{destination}' no encontrada")
+                return None
+            if criterion not in TIMETABLE_CRITERIA:
+                logger.error(f"Criterio '{criterion}' no soportado")
+                return None
+            
+            weights = self.pin_weights()
+            journeys = self.timetable.journeys(origin, destination, departure, weights, MAX_TIMETABLE_TRANSFERS)
+            if not journeys:
+                logger.error(f"No hay servicio entre {origin} y {destination} a las {format_clock(departure)}")
+                return None
+            
+            # Los viajes van del que usa menos vehículos al que llega más temprano
+            journey = journeys[0] if criterion == "min_transfers" else journeys[-1]
+            logger.info(f"Viaje encontrado: {journey['path']}")
+            return {
+                "origin": origin,
+                "destination": destination,
+                "depart_at": format_clock(departure),
+                "criterion": criterion,
+                "journey": journey,
+                "alternatives": [option for option in journeys if option is not journey],
+                "weights_version": weights.version
             }
         
-        self.weather_conditions = updated_conditions
+        except Exception as e:
+            logger.error(f"Error al calcular viaje con horario: {e}", exc_info=True)
+            return None
+
+    def _matrix_row(self, source: str, weights: EdgeWeights) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tiempos (minutos según los pesos) y transbordos desde una estación hacia todas
+        las demás, en el orden de los nodos del grafo, con una sola búsqueda desde el origen.
+        """
+        nodes = list(self.metro_graph.nodes())
+        times = np.full(len(nodes), np.inf)
+        transfers = np.full(len(nodes), -1, dtype=np.int32)
+        distances, paths = nx.single_source_dijkstra(self.metro_graph, source, weight=weights.weight)
+        for i, station in enumerate(nodes):
+            if station not in distances:
+                continue
+            times[i] = distances[station]
+            # Transbordos = cambios de línea en el camino (las conexiones a pie no cuentan como línea)
+            path = paths[station]
+            lines = [self.metro_graph[a][b]['line'] for a, b in zip(path, path[1:])]
+            lines = [line for line in lines if line != TRANSFER_VISUAL["line"]]
+            transfers[i] = sum(1 for a, b in zip(lines, lines[1:]) if a != b)
+        return times, transfers
+
+    def travel_time_matrix(self, stations: List[str] = None) -> Dict:
+        """
+        Matriz densa de tiempos de viaje y transbordos entre estaciones (toda la red si no
+        se indican) con la versión actual de los pesos. Cada fila sale de una búsqueda desde
+        su origen y se guarda en caché hasta que cambien los pesos (clima o cierres).
+        Los pares sin ruta tienen tiempo infinito y -1 transbordos.
+        """
+        nodes = list(self.metro_graph.nodes())
+        if stations is None:
+            stations = nodes
+        unknown = [station for station in stations if station not in self.metro_graph]
+        if unknown:
+            raise ValueError(f"Estaciones no encontradas: {', '.join(unknown)}")
+
+        weights = self.pin_weights()
+        version, rows = self._matrix_rows
+        if version != weights.version:
+            rows = {}
+            self._matrix_rows = (weights.version, rows)
+
+        node_index = {station: i for i, station in enumerate(nodes)}
+        columns = [node_index[station] for station in stations]
+        times = np.empty((len(stations), len(stations)))
+        transfers = np.empty((len(stations), len(stations)), dtype=np.int32)
+        computed = 0
+        for i, station in enumerate(stations):
+            row = rows.get(station)
+            if row is None:
+                row = self._matrix_row(station, weights)
+                rows[station] = row
+                computed += 1
+            times[i] = row[0][columns]
+            transfers[i] = row[1][columns]
+        logger.info(f"Matriz de {len(stations)}x{len(stations)} (versión {weights.version}): {computed} filas calculadas")
+        return {
+            "stations": stations,
+            "times": times,
+            "transfers": transfers,
+            "weights_version": weights.version
+        }
+
+    def edge_cost_model(self) -> Dict:
+        """
+        Red en arreglos para evaluar los tiempos de todas las aristas por lotes, con las
+        mismas reglas de calculate_travel_time: adyacencia CSR por nodo (en el orden de
+        los nodos del grafo), extremos de cada arista, tiempo base en minutos (NaN si
+        falta alguna coordenada) y penalización por estado del clima (en el orden de
+        WEATHER_STATES) según el tipo de transporte de la línea.
+        """
+        if self._edge_cost_model is not None:
+            return self._edge_cost_model
+
+        nodes = list(self.metro_graph.nodes())
+        node_index = {station: i for i, station in enumerate(nodes)}
+        num_edges = self.metro_graph.number_of_edges()
+        endpoints = np.empty((num_edges, 2), dtype=np.int32)
+        base_time = np.full(num_edges, np.nan)
+        penalties = np.ones((num_edges, len(WEATHER_STATES)))
+        lines = [None] * num_edges
+        for station1, station2, data in self.metro_graph.edges(data=True):
+            eid = data['eid']
+            endpoints[eid] = node_index[station1], node_index[station2]
+            lines[eid] = data['line']
+            transport_type = self.network.transport_types.get(data['line'], "metro")
+            table = TRANSPORT_WEATHER_PENALTIES.get(transport_type, {})
+            penalties[eid] = [table.get(state, 1.0) for state in WEATHER_STATES]
+            coords1 = self.get_station_coordinates(station1)
+            coords2 = self.get_station_coordinates(station2)
+            if coords1 and coords2:
+                distance = self.calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
+                base_time[eid] = distance / TRANSPORT_SPEEDS[transport_type] * 60
+
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int32)
+        neighbors, edge_ids = [], []
+        for i, station in enumerate(nodes):
+            for neighbor, data in self.metro_graph[station].items():
+                neighbors.append(node_index[neighbor])
+                edge_ids.append(data['eid'])
+            indptr[i + 1] = len(neighbors)
+
+        self._edge_cost_model = {
+            "nodes": nodes,
+            "lines": lines,
+            "indptr": indptr,
+            "neighbors": np.array(neighbors, dtype=np.int32),
+            "edge_ids": np.array(edge_ids, dtype=np.int32),
+            "endpoints": endpoints,
+            "base_time": base_time,
+            "penalties": penalties
+        }
+        return self._edge_cost_model
+
+    def search_stations(self, query: str, limit: int) -> List[Dict]:
+        """Estaciones cuyo nombre coincide con la consulta, ordenadas por parecido"""
+        return self.station_search.search(query, limit)
+
+    def resolve_station(self, name: str) -> Tuple[str, List[Dict]]:
+        """
+        Estación de la red a la que se refiere un nombre escrito por el usuario (sin tildes,
+        en minúsculas, abreviado o con errores). Devuelve None y sugerencias si es ambiguo,
+        como "Caribe" con parada de metro y de bus; "metro caribe" lo desambigua.
+        """
+        return self.station_search.resolve(name, STATION_MATCH_THRESHOLD, STATION_MATCH_MARGIN)
+
+    def nearest_stations(self, lat: float, lon: float, k: int = 1) -> List[Dict]:
+        """Obtiene las k estaciones más cercanas a una coordenada con el tramo a pie hasta cada una"""
+        nearest = []
+        for station, _ in self.station_index.nearest(lat, lon, k):
+            coords = self.get_station_coordinates(station)
+            distance = self.calculate_distance(lat, lon, coords[0], coords[1])
+            nearest.append({
+                "station": station,
+                "coordinates": coords,
+                "distance": round(distance, 3),
+                "walking_time": round((distance / WALKING_SPEED) * 60, 1)
+            })
+        return nearest
+
+    def find_route_between_coordinates(self, origin: Tuple[float, float],
+                                       destination: Tuple[float, float], k: int = 1) -> Dict:
+        """
+        Encuentra la mejor ruta entre dos coordenadas.
+        Añade tramos a pie hacia las k estaciones más cercanas al origen y al destino
+        y elige la mejor combinación en una sola búsqueda desde varios orígenes.
+        """
+        try:
+            logger.info(f"Buscando ruta desde {origin} hasta {destination} (k={k})")
+
+            origin_walks = {s["station"]: s for s in self.nearest_stations(origin[0], origin[1], k)}
+            destination_walks = {s["station"]: s for s in self.nearest_stations(destination[0], destination[1], k)}
+            if not origin_walks or not destination_walks:
+                logger.error("No hay estaciones cercanas a las coordenadas indicadas")
+                return None
+
+            weights = self.pin_weights()
+            result = multi_source_dijkstra(
+                self.metro_graph,
+                {station: walk["walking_time"] for station, walk in origin_walks.items()},
+                {station: walk["walking_time"] for station, walk in destination_walks.items()},
+                weight=weights.weight
+            )
+            if result is None:
+                logger.error(f"No existe ruta entre {origin} y {destination}")
+                return None
+
+            _, path = result
+            logger.info(f"Ruta encontrada: {path}")
+
+            route = self._build_route(path, weights)
+            origin_walk = {**origin_walks[path[0]], "from": list(origin)}
+            destination_walk = {**destination_walks[path[-1]], "to": list(destination)}
+            route["walking"] = {"origin": origin_walk, "destination": destination_walk}
+            route["estimated_time"] = round(
+                route["estimated_time"] + origin_walk["walking_time"] + destination_walk["walking_time"]
+            )
+
+            return self.add_to_history(route)
+
+        except Exception as e:
+            logger.error(f"Error al calcular ruta entre coordenadas: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    def _travel_conditions(conditions: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Copia el clima publicado al formato que usa el cálculo de tiempos"""
+        return {
+            station: {
+                "type": data.get("type", "sunny"),
+                "name": data.get("name", "Soleado"),
+                "icon": data.get("icon", "☀️"),
+                "intensity": data.get("intensity", 1.0)
+            }
+            for station, data in conditions.items()
+        }
+
+    def _compute_edge_weights(self, weather_conditions: Dict[str, Dict]) -> np.ndarray:
+        """Calcula aparte (sin tocar los pesos publicados) los pesos de todas las aristas para un clima"""
+        values = np.empty(self.metro_graph.number_of_edges(), dtype=np.float64)
+        for station1, station2, data in self.metro_graph.edges(data=True):
+            values[data['eid']] = self.calculate_travel_time(station1, station2, data['line'], weather_conditions)
+        # Las aristas cerradas siguen cerradas aunque cambie el clima
+        values[list(self._closed_eids())] = np.inf
+        return values
+
+    def set_weather_conditions(self, conditions: Dict[str, Dict]):
+        """Publica una nueva versión con el clima indicado y los mismos pesos"""
+        current = self.pin_weights()
+        self._publish_weights(current.next(current.values, self._travel_conditions(conditions)))
+
+    def apply_weather(self, snapshot):
+        """
+        Suscriptor del pipeline del clima: calcula los pesos de las aristas para
+        la nueva instantánea del clima y los publica como una nueva versión.
+        """
+        logger.info(f"Actualizando pesos del grafo con el clima de la versión {snapshot.version}")
+        
+        current = self.pin_weights()
+        weather_conditions = self._travel_conditions(snapshot.conditions)
+        values = self._compute_edge_weights(weather_conditions)
+        
+        # Contar y registrar los cambios significativos (más de 12 segundos)
+        with np.errstate(invalid='ignore'):  # aristas cerradas: inf - inf
+            changed = np.flatnonzero(np.abs(values - current.values) > 0.2)
+        if logger.isEnabledFor(logging.DEBUG):
+            for station1, station2, data in self.metro_graph.edges(data=True):
+                eid = data['eid']
+                if abs(values[eid] - current.values[eid]) > 0.2:
+                    weather1 = snapshot.conditions.get(station1, {}).get('type', 'sunny')
+                    weather2 = snapshot.conditions.get(station2, {}).get('type', 'sunny')
+                    logger.debug(
+                        f"Peso actualizado: {station1} → {station2} | "
+                        f"Línea: {data['line']} | "
+                        f"Tiempo: {current.values[eid]:.1f}min → {values[eid]:.1f}min | "
+                        f"Clima: {weather1}/{weather2}"
+                    )
+        
+        self._publish_weights(current.next(values, weather_conditions))
+        
+        if len(changed) > 0:
+            logger.info(f"Pesos actualizados: {len(changed)} de {len(values)} aristas modificadas debido a cambios en el clima")
+        else:
+            logger.info("Pesos del grafo actualizados (sin cambios significativos)")
+
+    def refresh_route_cache(self, snapshot):
+        """
+        Suscriptor del pipeline del clima: descarta las rutas en caché y
+        recalcula en segundo plano las más solicitadas.
+        """
+        self.invalidate_route_cache()
+        self.schedule_prewarm()
 
     def _update_edge_weights(self):
         """Actualiza los pesos de las aristas basándose en el clima actual"""
+        current = self.pin_weights()
+        self._publish_weights(current.next(self._compute_edge_weights(current.weather_conditions)))
+        self.invalidate_route_cache()
+
+    def edge_weights(self) -> np.ndarray:
+        """Vector (de solo lectura) de los pesos publicados, indexado por el atributo `eid` de las aristas"""
+        return self.pin_weights().values
+
+    def restore_edge_weights(self, weights: np.ndarray, conditions: Dict[str, Dict] = None,
+                             reset_closures: bool = False):
+        """
+        Restaura los pesos de las aristas desde un vector guardado con edge_weights(),
+        junto con el clima con el que se calcularon, en una sola publicación.
+        Con `reset_closures` las aristas que estaban cerradas al guardar se reabren
+        (por ejemplo al arrancar desde una instantánea, donde los cierres no se conservan).
+        """
+        if len(weights) != self.metro_graph.number_of_edges():
+            raise ValueError(f"Se esperaban {self.metro_graph.number_of_edges()} pesos y se recibieron {len(weights)}")
+        current = self.pin_weights()
+        weather_conditions = current.weather_conditions if conditions is None else self._travel_conditions(conditions)
+        weights = np.array(weights, dtype=np.float64)
+        closed = self._closed_eids()
+        reopened = set(np.flatnonzero(np.isinf(weights)).tolist()) - closed if reset_closures else set()
+        if reopened:
+            for station1, station2, data in self.metro_graph.edges(data=True):
+                if data['eid'] in reopened:
+                    weights[data['eid']] = self.calculate_travel_time(station1, station2, data['line'], weather_conditions)
+        weights[list(closed)] = np.inf
+        self._publish_weights(current.next(weights, weather_conditions))
+        self.invalidate_route_cache()
+
+    def inherit_state(self, previous: "MetroSystem") -> Dict[str, int]:
+        """
+        Toma el estado vivo de la red que esta instancia va a reemplazar, justo antes del
+        cambio: los pesos vigentes de los tramos que no cambiaron (mismos extremos, línea
+        y coordenadas) con su clima, los cierres que siguen existiendo y la numeración de
+        versiones de los pesos. Los tramos nuevos se calculan con el clima vigente.
+        """
+        current = previous.pin_weights()
+        weather_conditions = current.weather_conditions
+        previous_eids = {
+            (frozenset((station1, station2)), data['line']): data['eid']
+            for station1, station2, data in previous.metro_graph.edges(data=True)
+        }
+        values = np.empty(self.metro_graph.number_of_edges(), dtype=np.float64)
+        reused = 0
         for station1, station2, data in self.metro_graph.edges(data=True):
-            time = self.calculate_travel_time(station1, station2, data['line'])
-            self.metro_graph[station1][station2]['weight'] = time
+            eid = data['eid']
+            old_eid = previous_eids.get((frozenset((station1, station2)), data['line']))
+            unchanged = old_eid is not None and all(
+                self.get_station_coordinates(station) == previous.get_station_coordinates(station)
+                for station in (station1, station2)
+            ) and self.network.transport_types.get(data['line']) == previous.network.transport_types.get(data['line'])
+            if unchanged:
+                values[eid] = current.values[old_eid]
+                reused += 1
+            else:
+                values[eid] = self.calculate_travel_time(station1, station2, data['line'], weather_conditions)
+
+        self.closed_stations = {station for station in previous.closed_stations if station in self.metro_graph}
+        self.closed_edges = {
+            self.metro_graph[station1][station2]['eid']
+            for station1, station2 in previous.closures()["edges"]
+            if self.metro_graph.has_edge(station1, station2)
+        }
+        values[list(self._closed_eids())] = np.inf
+        self._publish_weights(current.next(values, weather_conditions))
+        self.invalidate_route_cache()
+        return {"edges_reused": reused, "edges_computed": len(values) - reused}
+
+    def _closed_eids(self) -> Set[int]:
+        """Aristas fuera de servicio: las cerradas y las que tocan una estación cerrada"""
+        closed = set(self.closed_edges)
+        for station in self.closed_stations:
+            closed.update(data['eid'] for _, _, data in self.metro_graph.edges(station, data=True))
+        return closed
+
+    def _edge_eid(self, station1: str, station2: str) -> int:
+        if not self.metro_graph.has_edge(station1, station2):
+            raise ValueError(f"No existe conexión entre '{station1}' y '{station2}'")
+        return self.metro_graph[station1][station2]['eid']
+
+    def _station_eids(self, station: str) -> Set[int]:
+        if station not in self.metro_graph:
+            raise ValueError(f"Estación '{station}' no encontrada")
+        return {data['eid'] for _, _, data in self.metro_graph.edges(station, data=True)}
+
+    def _path_eids(self, path: List[str]) -> List[int]:
+        return [self.metro_graph[a][b]['eid'] for a, b in zip(path, path[1:])]
+
+    def close_edge(self, station1: str, station2: str) -> Dict:
+        """Cierra la conexión entre dos estaciones"""
+        eid = self._edge_eid(station1, station2)
+        self.closed_edges.add(eid)
+        return self._apply_closures({eid}, closing=True)
+
+    def reopen_edge(self, station1: str, station2: str) -> Dict:
+        """Reabre la conexión entre dos estaciones"""
+        eid = self._edge_eid(station1, station2)
+        self.closed_edges.discard(eid)
+        return self._apply_closures({eid}, closing=False)
+
+    def close_station(self, station: str) -> Dict:
+        """Cierra una estación: ninguna ruta puede pasar por ella"""
+        eids = self._station_eids(station)
+        self.closed_stations.add(station)
+        return self._apply_closures(eids, closing=True)
+
+    def reopen_station(self, station: str) -> Dict:
+        """Reabre una estación cerrada"""
+        eids = self._station_eids(station)
+        self.closed_stations.discard(station)
+        return self._apply_closures(eids, closing=False)
+
+    def closures(self) -> Dict:
+        """Conexiones y estaciones cerradas actualmente"""
+        edges = {data['eid']: (a, b) for a, b, data in self.metro_graph.edges(data=True)}
+        return {
+            "edges": [list(edges[eid]) for eid in sorted(self.closed_edges)],
+            "stations": sorted(self.closed_stations)
+        }
+
+    def _apply_closures(self, eids: Set[int], closing: bool) -> Dict:
+        """
+        Publica los pesos con las aristas indicadas cerradas o reabiertas y actualiza la
+        caché de rutas de forma incremental: solo se recalculan los pares origen-destino
+        cuyo camino usaba una arista cerrada o que pueden mejorar con una reabierta.
+        """
+        current = self.pin_weights()
+        values = current.values.copy()
+        closed = self._closed_eids()
+        if closing:
+            values[list(eids)] = np.inf
+        else:
+            edges = {data['eid']: (a, b, data['line']) for a, b, data in self.metro_graph.edges(data=True)}
+            for eid in eids - closed:
+                station1, station2, line = edges[eid]
+                values[eid] = self.calculate_travel_time(station1, station2, line, current.weather_conditions)
+        weights = current.next(values)
+
+        cache = self._pinned_route_cache(current)
+        self._publish_weights(weights)
+        if cache is None:
+            self.invalidate_route_cache()
+            kept, affected = 0, []
+        else:
+            # Copia: las búsquedas en curso con los pesos anteriores pueden seguir escribiendo en ella
+            cache = dict(cache)
+            if closing:
+                affected = [pair for pair, route in cache.items()
+                            if eids.intersection(self._path_eids(route["path"]))]
+            else:
+                affected = self._improvable_pairs(cache, eids - closed, weights)
+            affected_set = set(affected)
+            routes = {pair: route for pair, route in cache.items() if pair not in affected_set}
+            self._route_cache = (weights.version, routes)
+            kept = len(routes)
+            if affected:
+                self._prewarm_executor.submit(self._recompute_routes, affected, weights.version)
+
+        logger.info(
+            f"{'Cierre' if closing else 'Reapertura'} de {len(eids)} aristas (versión {weights.version}): "
+            f"{kept} rutas en caché conservadas, {len(affected)} por recalcular"
+        )
+        return {
+            "weights_version": weights.version,
+            "edges_affected": len(eids),
+            "routes_kept": kept,
+            "routes_recomputed": len(affected),
+            **self.closures()
+        }
+
+    def _improvable_pairs(self, cache: Dict[Tuple[str, str], Dict], eids: Set[int],
+                          weights: EdgeWeights) -> List[Tuple[str, str]]:
+        """
+        Pares en caché que pueden mejorar al reabrir aristas: (o, d) mejora si
+        dist(o, u) + w(u, v) + dist(v, d) es menor que el costo de su camino actual.
+        Basta una búsqueda desde cada extremo de las aristas reabiertas.
+        """
+        if not eids or not cache:
+            return []
+        endpoints = {}
+        for station1, station2, data in self.metro_graph.edges(data=True):
+            if data['eid'] in eids:
+                endpoints[data['eid']] = (station1, station2)
+        distances = {}
+        for station in {s for pair in endpoints.values() for s in pair}:
+            distances[station] = nx.single_source_dijkstra_path_length(self.metro_graph, station, weight=weights.weight)
+
+        affected = []
+        for (origin, destination), route in cache.items():
+            cost = float(weights.values[self._path_eids(route["path"])].sum())
+            for eid, (u, v) in endpoints.items():
+                w = weights.values[eid]
+                best = min(
+                    distances[u].get(origin, np.inf) + w + distances[v].get(destination, np.inf),
+                    distances[v].get(origin, np.inf) + w + distances[u].get(destination, np.inf)
+                )
+                if best < cost - 1e-9:
+                    affected.append((origin, destination))
+                    break
+        return affected
+
+    def _recompute_routes(self, pairs: Iterable[Tuple[str, str]], version: int) -> int:
+        """Recalcula en segundo plano las rutas afectadas; se detiene si los pesos cambian"""
+        computed = 0
+        for origin, destination in pairs:
+            if version != self.weights_version:
+                break
+            try:
+                self._compute_route(origin, destination)
+                computed += 1
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                continue
+            except Exception as e:
+                logger.error(f"Error al recalcular la ruta {origin} -> {destination}: {e}", exc_info=True)
+        logger.info(f"Rutas recalculadas tras el cambio de cierres: {computed}")
+        return computed
 
     def _add_transfer_stations(self):
         """Añade conexiones entre estaciones de diferentes líneas (transbordos)"""
         logger.info("Añadiendo conexiones de transbordo entre líneas")
         
         # Añadir conexiones de transbordo desde la configuración
-        for station1, station2 in TRANSFER_CONNECTIONS:
+        for station1, station2 in self.network.transfers:
             if station1 in self.metro_graph and station2 in self.metro_graph:
                 self.metro_graph.add_edge(
                     station1,
@@ -341,8 +1010,8 @@ class MetroSystem:
         Compara el tiempo de viaje con clima actual vs. clima soleado.
         """
         try:
-            # Guardar el clima actual
-            current_weather = self.weather_conditions.copy()
+            # Fijar la versión actual de los pesos para toda la comparación
+            current = self.pin_weights()
             
             # Calcular ruta con clima actual
             route_with_weather = self.find_route(origin, destination)
@@ -351,36 +1020,24 @@ class MetroSystem:
             
             time_with_weather = route_with_weather["estimated_time"]
             
-            # Simular clima soleado para todas las estaciones
+            # Simular clima soleado para todas las estaciones en una versión privada de los pesos
             sunny_weather = {}
-            for station in self.weather_conditions:
+            for station in current.weather_conditions:
                 sunny_weather[station] = {
                     "type": "sunny",
                     "name": "Soleado",
                     "icon": "☀️",
                     "intensity": 1.0
                 }
+            sunny_weights = current.next(self._compute_edge_weights(sunny_weather), sunny_weather)
             
-            # Aplicar clima soleado temporalmente
-            self.weather_conditions = sunny_weather
-            
-            # Recalcular pesos con clima soleado
-            for station1, station2, data in self.metro_graph.edges(data=True):
-                time = self.calculate_travel_time(station1, station2, data['line'])
-                self.metro_graph[station1][station2]['weight'] = time
-            
-            # Calcular ruta con clima soleado
-            route_sunny = self.find_route(origin, destination)
+            # Calcular ruta con clima soleado (sin publicarla ni guardarla en caché)
+            try:
+                route_sunny = self._compute_route(origin, destination, sunny_weights)
+            except nx.NetworkXNoPath:
+                route_sunny = None
             time_sunny = route_sunny["estimated_time"] if route_sunny else 0
             
-            # Restaurar clima original
-            self.weather_conditions = current_weather
-            
-            # Restaurar pesos originales
-            for station1, station2, data in self.metro_graph.edges(data=True):
-                time = self.calculate_travel_time(station1, station2, data['line'])
-                self.metro_graph[station1][station2]['weight'] = time
-            
             # Calcular impacto
             if time_sunny > 0:
                 delay = time_with_weather - time_sunny
@@ -395,8 +1052,8 @@ class MetroSystem:
                     "weather_conditions": [
                         {
                             "station": station,
-                            "weather": self.weather_conditions.get(station, {}).get("name", "Desconocido"),
-                            "type": self.weather_conditions.get(station, {}).get("type", "sunny")
+                            "weather": current.weather_conditions.get(station, {}).get("name", "Desconocido"),
+                            "type": current.weather_conditions.get(station, {}).get("type", "sunny")
                         }
                         for station in route_with_weather["path"]
                     ]
@@ -407,5 +1064,3 @@ class MetroSystem:
         except Exception as e:
             logger.error(f"Error al calcular impacto del clima: {e}", exc_info=True)
             return {"error": str(e)}
-
-metro_system = MetroSystem() 
\ No newline at end of file
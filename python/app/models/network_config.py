@@ -0,0 +1,137 @@
+import importlib.util
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import app.config as config
+from app.utils.snapshot import network_config_hash
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class NetworkConfig:
+    """
+    Definición de la red en servicio: líneas con sus estaciones, conexiones de transbordo,
+    tipo de transporte y servicio (frecuencia, primera y última salida) de cada línea.
+    Cada recarga de la configuración crea una nueva.
+    """
+    lines: Dict[str, Dict]
+    transfers: List[Tuple[str, str]]
+    transport_types: Dict[str, str]
+    services: Dict[str, Dict]
+    config_hash: str
+
+    @classmethod
+    def create(cls, lines: Dict[str, Dict], transfers: List[Tuple[str, str]],
+               transport_types: Dict[str, str], services: Dict[str, Dict]) -> "NetworkConfig":
+        transfers = [tuple(transfer) for transfer in transfers]
+        return cls(lines, transfers, transport_types, services, network_config_hash(lines, transfers))
+
+    @classmethod
+    def from_config(cls, source) -> "NetworkConfig":
+        """
+        Red definida en un módulo de configuración: la del feed GTFS si indica uno
+        (GTFS_FEED_PATH) o, si no, la escrita a mano en sus constantes.
+        """
+        if source.GTFS_FEED_PATH:
+            from app.utils.gtfs import load_gtfs_network
+            network = load_gtfs_network(source.GTFS_FEED_PATH, source.GTFS_CACHE_DIR)
+            return cls.create(
+                network["lines"], network["transfers"], network["transport_types"], network["services"]
+            )
+        return cls.create(
+            source.METRO_LINES, source.TRANSFER_CONNECTIONS, source.LINE_TRANSPORT_TYPES, source.LINE_SERVICE
+        )
+
+    @classmethod
+    def current(cls) -> "NetworkConfig":
+        """Red definida en app.config al importar la aplicación"""
+        return cls.from_config(config)
+
+    @property
+    def stations(self) -> Dict[str, List[float]]:
+        """Coordenadas de cada estación (la primera línea que la define manda)"""
+        stations = {}
+        for line_info in self.lines.values():
+            for station, coords in line_info["stations"].items():
+                stations.setdefault(station, coords)
+        return stations
+
+    def same_network(self, other: "NetworkConfig") -> bool:
+        return (
+            self.config_hash == other.config_hash
+            and self.transport_types == other.transport_types
+            and self.services == other.services
+        )
+
+    def validate(self):
+        """Lanza ValueError si la definición no puede convertirse en una red"""
+        for line_name, line_info in self.lines.items():
+            if "stations" not in line_info or "color" not in line_info:
+                raise ValueError(f"La línea '{line_name}' debe tener 'stations' y 'color'")
+            for station, coords in line_info["stations"].items():
+                if len(coords) != 2:
+                    raise ValueError(f"Coordenadas inválidas para '{station}' en la línea '{line_name}'")
+        if not self.stations:
+            raise ValueError("La red no tiene estaciones")
+        for transfer in self.transfers:
+            if len(transfer) != 2:
+                raise ValueError(f"Transbordo inválido: {transfer}")
+        for line_name, service in self.services.items():
+            missing = {"headway", "first_departure", "last_departure"} - set(service)
+            if missing:
+                raise ValueError(f"Al servicio de la línea '{line_name}' le falta: {', '.join(sorted(missing))}")
+
+
+def load_network_config() -> NetworkConfig:
+    """
+    Vuelve a leer la definición de la red desde el archivo de app.config, sin reimportar
+    el módulo: el resto de la configuración en memoria no cambia.
+    """
+    spec = importlib.util.spec_from_file_location("app._network_config_reload", config.__file__)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+        network = NetworkConfig.from_config(module)
+    except Exception as e:
+        raise ValueError(f"No se pudo leer la configuración de la red: {e}") from e
+    network.validate()
+    return network
+
+
+def _segments(network: NetworkConfig) -> Dict[Tuple[str, str], str]:
+    """Tramos entre estaciones consecutivas de cada línea, con su línea"""
+    segments = {}
+    for line_name, line_info in network.lines.items():
+        stations = list(line_info["stations"])
+        for station1, station2 in zip(stations, stations[1:]):
+            segments[tuple(sorted((station1, station2)))] = line_name
+    return segments
+
+
+def diff_networks(old: NetworkConfig, new: NetworkConfig) -> Dict[str, List]:
+    """Diferencias entre dos definiciones de la red (estaciones, líneas, tramos y transbordos)"""
+    old_stations, new_stations = old.stations, new.stations
+    old_segments, new_segments = _segments(old), _segments(new)
+    old_transfers = {tuple(sorted(transfer)) for transfer in old.transfers}
+    new_transfers = {tuple(sorted(transfer)) for transfer in new.transfers}
+    return {
+        "stations_added": sorted(set(new_stations) - set(old_stations)),
+        "stations_removed": sorted(set(old_stations) - set(new_stations)),
+        "stations_moved": sorted(
+            station for station in set(old_stations) & set(new_stations)
+            if list(old_stations[station]) != list(new_stations[station])
+        ),
+        "lines_added": sorted(set(new.lines) - set(old.lines)),
+        "lines_removed": sorted(set(old.lines) - set(new.lines)),
+        "lines_changed": sorted(
+            line for line in set(old.lines) & set(new.lines)
+            if old.lines[line] != new.lines[line]
+            or old.transport_types.get(line) != new.transport_types.get(line)
+            or old.services.get(line) != new.services.get(line)
+        ),
+        "segments_added": sorted(list(segment) for segment in set(new_segments) - set(old_segments)),
+        "segments_removed": sorted(list(segment) for segment in set(old_segments) - set(new_segments)),
+        "transfers_added": sorted(list(transfer) for transfer in new_transfers - old_transfers),
+        "transfers_removed": sorted(list(transfer) for transfer in old_transfers - new_transfers)
+    }
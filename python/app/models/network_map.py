@@ -0,0 +1,210 @@
+import json
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from app.config import TRANSFER_VISUAL, MAX_CACHED_TILES, MAX_TILE_ZOOM
+from app.utils.mvt import (
+    BUFFER,
+    EXTENT,
+    LINESTRING,
+    POINT,
+    encode_geometry,
+    encode_tile,
+    tile_point,
+    world_position
+)
+
+logger = logging.getLogger(__name__)
+
+# Propiedades del clima que se copian a cada estación del mapa
+WEATHER_PROPERTIES = ("type", "name", "icon", "intensity", "station_id", "status")
+
+
+class NetworkMap:
+    """
+    Mapa de la red para renderizar en el cliente: GeoJSON completo y teselas vectoriales.
+    La geometría (líneas, transbordos y estaciones) se calcula una sola vez por versión
+    de la red; el clima de las estaciones se aplica una vez por época del clima sobre
+    la geometría ya serializada o codificada.
+    """
+
+    def __init__(self, lines: Dict[str, Dict], transfers: List[Tuple[str, str]],
+                 transport_types: Dict[str, str], version: str):
+        self.version = version
+        self._lock = Lock()
+
+        self.stations: Dict[str, List[float]] = {}
+        self.station_lines: Dict[str, List[str]] = {}
+        for line_name, line_info in lines.items():
+            for station, coords in line_info["stations"].items():
+                self.stations.setdefault(station, coords)
+                self.station_lines.setdefault(station, []).append(line_name)
+
+        # Geometrías de líneas y transbordos: (propiedades, coordenadas [lat, lon])
+        self.paths: List[Tuple[Dict, List[List[float]]]] = []
+        for line_name, line_info in lines.items():
+            self.paths.append((
+                {
+                    "kind": "line",
+                    "line": line_name,
+                    "color": line_info["color"],
+                    "transport": transport_types.get(line_name, "metro")
+                },
+                list(line_info["stations"].values())
+            ))
+        for station1, station2 in transfers:
+            if station1 in self.stations and station2 in self.stations:
+                self.paths.append((
+                    {"kind": "transfer", "line": TRANSFER_VISUAL["line"], "color": TRANSFER_VISUAL["color"]},
+                    [self.stations[station1], self.stations[station2]]
+                ))
+
+        # Posiciones Web Mercator (zoom 0) para recortar y codificar teselas
+        self._path_world = [[world_position(lat, lon) for lat, lon in coords] for _, coords in self.paths]
+        self._station_world = {station: world_position(*coords) for station, coords in self.stations.items()}
+
+        # Parte fija del GeoJSON (se serializa una sola vez)
+        self._static_features = [
+            json.dumps({
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": [[lon, lat] for lat, lon in coords]},
+                "properties": properties
+            }, ensure_ascii=False)
+            for properties, coords in self.paths
+        ]
+
+        self._weather_epoch: Optional[int] = None
+        self._station_properties: Dict[str, Dict] = {}
+        self._geojson: Optional[bytes] = None
+        self._tile_geometry: "OrderedDict[Tuple[int, int, int], Dict]" = OrderedDict()
+        self._tiles: "OrderedDict[Tuple[int, int, int], bytes]" = OrderedDict()
+        logger.info(f"Mapa de la red preparado: {len(self.paths)} trazados y {len(self.stations)} estaciones")
+
+    @property
+    def weather_epoch(self) -> Optional[int]:
+        return self._weather_epoch
+
+    def patch_weather(self, epoch: int, conditions: Dict[str, Dict]):
+        """Aplica el clima de una nueva época a las estaciones y descarta lo serializado con el anterior"""
+        with self._lock:
+            if epoch == self._weather_epoch:
+                return
+            properties = {}
+            for station in self.stations:
+                weather = conditions.get(station, {})
+                readings = weather.get("readings", {})
+                properties[station] = {
+                    **{f"weather_{key}": weather.get(key) for key in WEATHER_PROPERTIES},
+                    **{key: readings.get(key) for key in ("temperature", "humidity", "visibility", "pressure")}
+                }
+            self._station_properties = properties
+            self._weather_epoch = epoch
+            self._geojson = None
+            self._tiles.clear()
+
+    def apply_snapshot(self, snapshot):
+        """Suscriptor del pipeline del clima: aplica la nueva instantánea al mapa"""
+        self.patch_weather(snapshot.version, snapshot.conditions)
+
+    def geojson(self) -> bytes:
+        """GeoJSON de la red con el clima de la época actual"""
+        geojson = self._geojson
+        if geojson is not None:
+            return geojson
+
+        with self._lock:
+            station_features = [
+                json.dumps({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [coords[1], coords[0]]},
+                    "properties": {
+                        "kind": "station",
+                        "name": station,
+                        "lines": self.station_lines[station],
+                        "weather": self._station_properties.get(station, {})
+                    }
+                }, ensure_ascii=False)
+                for station, coords in self.stations.items()
+            ]
+            header = json.dumps({
+                "network_version": self.version,
+                "weather_epoch": self._weather_epoch
+            })[1:-1]
+            geojson = (
+                '{"type": "FeatureCollection", ' + header + ', "features": ['
+                + ", ".join(self._static_features + station_features) + "]}"
+            ).encode("utf-8")
+            self._geojson = geojson
+        return geojson
+
+    def tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Tesela vectorial (z, x, y) o None si las coordenadas no son válidas"""
+        if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            return None
+        key = (z, x, y)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+            geometry = self._geometry(key)
+            stations = [
+                (POINT, commands, {"name": station, **self._station_properties.get(station, {})})
+                for station, commands in geometry["stations"]
+            ]
+            tile = encode_tile({"lines": geometry["lines"], "stations": stations})
+            self._remember(self._tiles, key, tile)
+        return tile
+
+    def _geometry(self, key: Tuple[int, int, int]) -> Dict:
+        """Geometría codificada de una tesela (no depende del clima)"""
+        geometry = self._tile_geometry.get(key)
+        if geometry is not None:
+            self._tile_geometry.move_to_end(key)
+            return geometry
+
+        z, x, y = key
+        low, high = -BUFFER, EXTENT + BUFFER
+
+        def inside(point):
+            return low <= point[0] <= high and low <= point[1] <= high
+
+        lines = []
+        for (properties, _), world in zip(self.paths, self._path_world):
+            points = [tile_point(position, z, x, y) for position in world]
+            # Conservar los tramos cuyo rectángulo toca la tesela, agrupados en partes continuas
+            parts, current = [], []
+            for a, b in zip(points, points[1:]):
+                touches = (min(a[0], b[0]) <= high and max(a[0], b[0]) >= low
+                           and min(a[1], b[1]) <= high and max(a[1], b[1]) >= low)
+                if touches:
+                    if not current:
+                        current = [a]
+                    if b != current[-1]:
+                        current.append(b)
+                elif current:
+                    parts.append(current)
+                    current = []
+            if current:
+                parts.append(current)
+            parts = [part for part in parts if len(part) > 1]
+            if parts:
+                lines.append((LINESTRING, encode_geometry(LINESTRING, parts), properties))
+
+        stations = []
+        for station, position in self._station_world.items():
+            point = tile_point(position, z, x, y)
+            if inside(point):
+                stations.append((station, encode_geometry(POINT, [[point]])))
+
+        geometry = {"lines": lines, "stations": stations}
+        self._remember(self._tile_geometry, key, geometry)
+        return geometry
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value):
+        cache[key] = value
+        if len(cache) > MAX_CACHED_TILES:
+            cache.popitem(last=False)
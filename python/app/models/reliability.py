@@ -0,0 +1,62 @@
+"""
+Confiabilidad de los tiempos de viaje por simulación de Monte Carlo.
+Cada muestra es un futuro del clima sacado de la cadena de Markov de WEATHER_STATES;
+los pesos de todas las aristas se reevalúan por lotes (una fila por muestra) y en cada
+muestra se busca la mejor ruta.
+Las funciones solo reciben arreglos para poder ejecutarse en otros procesos.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from app.models.travel_times import batch_travel_times
+from app.utils.routing import csr_shortest_path
+
+
+@dataclass(frozen=True)
+class ReliabilityModel:
+    """Red, clima pronosticado y par origen-destino de una simulación"""
+    indptr: np.ndarray          # Adyacencia CSR por nodo
+    neighbors: np.ndarray
+    edge_ids: np.ndarray
+    endpoint_cells: np.ndarray  # Celda de clima de los dos extremos de cada arista (-1 sin clima)
+    base_time: np.ndarray       # Minutos sin clima (NaN si faltan coordenadas)
+    penalties: np.ndarray       # Penalización de cada arista por estado del clima
+    closed: np.ndarray          # Aristas fuera de servicio
+    forecast: np.ndarray        # Distribución acumulada del estado futuro de cada celda
+    intensity_range: Tuple[float, float]
+    sunny: int                  # Índice del estado soleado
+    source: int
+    target: int
+
+
+def sample_edge_weights(model: ReliabilityModel, samples: int, rng: np.random.Generator) -> np.ndarray:
+    """Pesos de todas las aristas en `samples` futuros del clima (una fila por muestra)"""
+    cells, num_states = model.forecast.shape
+
+    # Muestreo inverso del estado futuro de cada celda en todas las muestras a la vez
+    draws = rng.random((samples, cells))
+    states = (model.forecast[None, :, :] <= draws[:, :, None]).sum(axis=2)
+    np.minimum(states, num_states - 1, out=states)
+    intensity = rng.uniform(*model.intensity_range, size=(samples, cells))
+
+    times = batch_travel_times(
+        model.base_time, model.penalties, model.endpoint_cells, states, intensity, model.sunny, rng
+    )
+    times[:, model.closed] = np.inf
+    return times
+
+
+def simulate(model: ReliabilityModel, samples: int, seed) -> Tuple[np.ndarray, List[Optional[Tuple[int, ...]]]]:
+    """
+    Costo (minutos según los pesos) y camino (índices de nodos) de la mejor ruta
+    en cada muestra; inf y None en las muestras sin ruta.
+    """
+    rng = np.random.default_rng(seed)
+    weights = sample_edge_weights(model, samples, rng)
+    indptr, neighbors, edge_ids = model.indptr.tolist(), model.neighbors.tolist(), model.edge_ids.tolist()
+    costs = np.empty(samples)
+    paths = []
+    for i, row in enumerate(weights.tolist()):
+        costs[i], path = csr_shortest_path(indptr, neighbors, edge_ids, row, model.source, model.target)
+        paths.append(tuple(path) if path is not None else None)
+    return costs, paths
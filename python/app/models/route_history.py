@@ -0,0 +1,122 @@
+import json
+import os
+import logging
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from app.config import MAX_HISTORY_SIZE, ROUTE_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Campos que no se guardan en el registro en disco: el clima de toda la red
+# se repetiría en cada línea y ya se puede consultar por separado
+LOG_EXCLUDED_FIELDS = ("weather_conditions",)
+
+
+class RouteHistory:
+    """
+    Historial de rutas.
+    Mantiene las últimas rutas en un buffer circular de tamaño fijo y anexa
+    cada ruta a un registro en disco (JSON por línea) para consultas completas.
+    """
+
+    def __init__(self, capacity: int = MAX_HISTORY_SIZE, log_path: Optional[str] = ROUTE_LOG_PATH):
+        self.capacity = capacity
+        self._buffer: List[Optional[Dict]] = [None] * capacity
+        self._size = 0
+        self._head = 0  # Posición donde se escribirá la próxima ruta
+        self.log_path = log_path
+        self._log_file = None
+        self._lock = Lock()  # Las rutas pueden calcularse en varios hilos
+        self._next_id = self._last_logged_id() + 1
+
+    def _last_logged_id(self) -> int:
+        """Último id escrito en el registro, para que los ids sigan creciendo tras reiniciar"""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return -1
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                f.seek(max(0, end - 64 * 1024))
+                lines = f.read().splitlines()
+            for line in reversed(lines):
+                try:
+                    return int(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    continue
+        except OSError as e:
+            logger.warning(f"No se pudo leer el registro de rutas {self.log_path}: {e}")
+        return -1
+
+    def add(self, route: Dict) -> Dict:
+        """Agrega una ruta con un id monótono y la anexa al registro en disco"""
+        with self._lock:
+            route_with_id = {
+                **route,
+                "id": self._next_id,
+                "timestamp": datetime.now().isoformat()
+            }
+            self._next_id += 1
+
+            self._buffer[self._head] = route_with_id
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+            self._append_to_log(route_with_id)
+        return route_with_id
+
+    def recent(self) -> List[Dict]:
+        """Rutas en memoria ordenadas de la más reciente a la más antigua"""
+        with self._lock:
+            return [
+                self._buffer[(self._head - 1 - i) % self.capacity]
+                for i in range(self._size)
+            ]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _append_to_log(self, route: Dict):
+        if not self.log_path:
+            return
+        try:
+            if self._log_file is None:
+                self._log_file = open(self.log_path, "ab")
+            entry = {key: value for key, value in route.items() if key not in LOG_EXCLUDED_FIELDS}
+            self._log_file.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._log_file.flush()
+        except OSError as e:
+            logger.error(f"Error al escribir en el registro de rutas: {e}")
+
+    def read_log(self, cursor: int = 0, limit: int = 100) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Lee hasta `limit` rutas del registro desde la posición `cursor` (en bytes),
+        de la más antigua a la más reciente. Devuelve las rutas y el cursor
+        de la siguiente página (None si se llegó al final).
+        """
+        if not self.log_path or not os.path.exists(self.log_path):
+            return [], None
+
+        routes = []
+        with open(self.log_path, "rb") as f:
+            f.seek(cursor)
+            while len(routes) < limit:
+                line = f.readline()
+                if not line:
+                    return routes, None
+                if not line.endswith(b"\n"):
+                    # Línea aún en escritura: se leerá en la próxima página
+                    return routes, cursor
+                cursor += len(line)
+                try:
+                    routes.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Línea inválida en el registro de rutas (posición {cursor - len(line)})")
+            next_cursor = cursor if f.readline() else None
+        return routes, next_cursor
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
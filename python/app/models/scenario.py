@@ -0,0 +1,136 @@
+"""
+Escenarios del clima para toda la red, sin servidor: se simula la cadena de Markov de
+WEATHER_STATES durante muchas actualizaciones y se evalúan los tiempos de todas las
+aristas por lotes de actualizaciones con el mismo modelo de tiempos de viaje.
+Por actualización se obtiene el retraso promedio y máximo, los tramos más afectados y la
+conectividad de la red; por tramo, el retraso acumulado del escenario.
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+from app.models.travel_times import batch_travel_times, edge_penalties
+from app.models.weather_simulator import WeatherSimulator
+
+
+def _components(num_nodes: int, endpoints: List[Tuple[int, int]], open_edges: np.ndarray) -> np.ndarray:
+    """Tamaño de cada componente conexa usando solo las aristas abiertas (unión-búsqueda)"""
+    parent = list(range(num_nodes))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for eid in np.flatnonzero(open_edges).tolist():
+        a, b = find(endpoints[eid][0]), find(endpoints[eid][1])
+        if a != b:
+            parent[a] = b
+    roots = np.array([find(node) for node in range(num_nodes)])
+    return np.bincount(roots)[np.unique(roots)]
+
+
+def run_scenario(network: Dict, endpoint_cells: np.ndarray, simulator: WeatherSimulator, ticks: int,
+                 worst_segments: int, suspension_penalty: float, block_ticks: int,
+                 rng: np.random.Generator) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Simula `ticks` actualizaciones del clima desde el estado actual del simulador.
+    `network` son los arreglos de MetroSystem.edge_cost_model() y `endpoint_cells` la
+    celda de clima de los extremos de cada arista. Un tramo cuya penalización llega a
+    `suspension_penalty` se considera suspendido para la conectividad.
+    Devuelve dos tablas por columnas: una fila por actualización y una fila por tramo.
+    """
+    base_time, penalties = network["base_time"], network["penalties"]
+    num_nodes = len(network["nodes"])
+    num_edges = len(base_time)
+    endpoints = network["endpoints"].tolist()
+    sunny = simulator.state_index["sunny"]
+    worst_segments = min(worst_segments, num_edges)
+
+    # Tiempo de referencia: todo soleado, intensidad 1 y sin variabilidad
+    cells = simulator.size
+    reference = batch_travel_times(
+        base_time, penalties, endpoint_cells,
+        np.full((1, cells), sunny, dtype=np.int8), np.ones((1, cells)), sunny
+    )[0]
+
+    mean_delay = np.empty(ticks)
+    max_delay = np.empty(ticks)
+    delayed = np.empty(ticks, dtype=np.int32)
+    suspended = np.empty(ticks, dtype=np.int32)
+    components = np.empty(ticks, dtype=np.int32)
+    connected_pairs = np.empty(ticks)
+    worst_ids = np.empty((ticks, worst_segments), dtype=np.int32)
+    worst_delays = np.empty((ticks, worst_segments))
+
+    segment_total = np.zeros(num_edges)
+    segment_max = np.zeros(num_edges)
+    segment_suspended = np.zeros(num_edges, dtype=np.int64)
+    segment_worst = np.zeros(num_edges, dtype=np.int64)
+    connectivity: Dict[bytes, Tuple[int, float]] = {}
+    total_pairs = max(num_nodes * (num_nodes - 1), 1)
+
+    for start in range(0, ticks, block_ticks):
+        size = min(block_ticks, ticks - start)
+        block = slice(start, start + size)
+        states, intensity = simulator.trajectory(size)
+        simulator.states = states[-1]
+        simulator.intensity = intensity[-1]
+
+        delay = batch_travel_times(base_time, penalties, endpoint_cells, states, intensity, sunny, rng) - reference
+        mean_delay[block] = delay.mean(axis=1)
+        max_delay[block] = delay.max(axis=1)
+        delayed[block] = (delay > 0).sum(axis=1)
+        segment_total += delay.sum(axis=0)
+        np.maximum(segment_max, delay.max(axis=0), out=segment_max)
+
+        # Tramos más afectados de cada actualización, de mayor a menor retraso
+        top = np.argpartition(-delay, worst_segments - 1, axis=1)[:, :worst_segments]
+        top_delay = np.take_along_axis(delay, top, axis=1)
+        order = np.argsort(-top_delay, axis=1)
+        worst_ids[block] = np.take_along_axis(top, order, axis=1)
+        worst_delays[block] = np.take_along_axis(top_delay, order, axis=1)
+        segment_worst += np.bincount(worst_ids[block].ravel(), minlength=num_edges)
+
+        # Conectividad: las combinaciones de tramos suspendidos se repiten mucho entre
+        # actualizaciones, así que se calcula una vez por combinación distinta
+        closed = edge_penalties(penalties, endpoint_cells, states, sunny) >= suspension_penalty
+        suspended[block] = closed.sum(axis=1)
+        segment_suspended += closed.sum(axis=0)
+        masks, inverse = np.unique(np.packbits(closed, axis=1), axis=0, return_inverse=True)
+        block_components = np.empty(len(masks), dtype=np.int32)
+        block_pairs = np.empty(len(masks))
+        for i, mask in enumerate(masks):
+            key = mask.tobytes()
+            if key not in connectivity:
+                sizes = _components(num_nodes, endpoints, ~np.unpackbits(mask, count=num_edges).astype(bool))
+                connectivity[key] = (len(sizes), float((sizes * (sizes - 1)).sum() / total_pairs))
+            block_components[i], block_pairs[i] = connectivity[key]
+        components[block] = block_components[inverse.ravel()]
+        connected_pairs[block] = block_pairs[inverse.ravel()]
+
+    tick_columns = {
+        "tick": np.arange(ticks, dtype=np.int32),
+        "mean_delay": mean_delay,
+        "max_delay": max_delay,
+        "delayed_segments": delayed,
+        "suspended_segments": suspended,
+        "components": components,
+        "connected_pairs": connected_pairs
+    }
+    for k in range(worst_segments):
+        tick_columns[f"worst_segment_{k + 1}"] = worst_ids[:, k]
+        tick_columns[f"worst_delay_{k + 1}"] = worst_delays[:, k]
+
+    nodes = network["nodes"]
+    segment_columns = {
+        "eid": np.arange(num_edges, dtype=np.int32),
+        "station1": np.array([nodes[a] for a, _ in endpoints]),
+        "station2": np.array([nodes[b] for _, b in endpoints]),
+        "line": np.array(network["lines"]),
+        "reference_time": reference,
+        "mean_delay": segment_total / ticks,
+        "max_delay": segment_max,
+        "suspended_fraction": segment_suspended / ticks,
+        "worst_ticks": segment_worst
+    }
+    return tick_columns, segment_columns
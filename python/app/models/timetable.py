@@ -0,0 +1,319 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import networkx as nx
+import numpy as np
+from app.config import DEFAULT_LINE_SERVICE, TRANSFER_VISUAL
+from app.models.edge_weights import EdgeWeights
+
+logger = logging.getLogger(__name__)
+
+INFINITY = float('inf')
+
+
+def parse_clock(value: str) -> float:
+    """Convierte una hora 'HH:MM' a minutos desde la medianoche"""
+    hours, minutes = value.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Hora inválida: {value}")
+    return hours * 60.0 + minutes
+
+
+def format_clock(minutes: float) -> str:
+    """Convierte minutos desde la medianoche a 'HH:MM'"""
+    total = int(round(minutes)) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+@dataclass(frozen=True)
+class TimetableTimes:
+    """Tiempos de recorrido de todas las rutas calculados con una versión de los pesos"""
+    version: int
+    route_times: np.ndarray      # minutos desde la terminal hasta cada parada de la ruta
+    closed: np.ndarray           # True si el tramo que llega a la parada está cerrado
+    footpath_times: np.ndarray   # minutos de cada conexión de transbordo
+
+
+class Timetable:
+    """
+    Horario de la red para el algoritmo RAPTOR.
+    Cada línea genera dos rutas (una por sentido) con salidas desde la terminal cada
+    `headway` minutos entre la primera y la última salida. Las rutas, sus paradas y
+    los transbordos se guardan en arreglos planos; el tiempo entre paradas sale de los
+    pesos de las aristas, así que el horario refleja el clima de la versión publicada.
+    """
+
+    def __init__(self, graph: nx.Graph, lines: Dict[str, Dict], services: Dict[str, Dict]):
+        self.stops: List[str] = list(graph.nodes())
+        self.stop_index: Dict[str, int] = {station: i for i, station in enumerate(self.stops)}
+
+        route_lines, route_start, route_stops, segment_eids = [], [0], [], []
+        headways, first_departures, trip_counts = [], [], []
+        for line_name, line_info in lines.items():
+            stations = [station for station in line_info["stations"] if station in self.stop_index]
+            if len(stations) < 2:
+                continue
+            service = services.get(line_name, DEFAULT_LINE_SERVICE)
+            first = parse_clock(service["first_departure"])
+            last = parse_clock(service["last_departure"])
+            headway = float(service["headway"])
+            for direction in (stations, stations[::-1]):
+                route_lines.append(line_name)
+                route_stops.extend(self.stop_index[station] for station in direction)
+                # El tramo que llega a la primera parada no existe (-1)
+                segment_eids.append(-1)
+                segment_eids.extend(graph[a][b]['eid'] for a, b in zip(direction, direction[1:]))
+                route_start.append(len(route_stops))
+                headways.append(headway)
+                first_departures.append(first)
+                trip_counts.append(int((last - first) // headway) + 1)
+
+        self.route_lines = route_lines
+        self.route_start = np.array(route_start, dtype=np.int64)
+        self.route_stops = np.array(route_stops, dtype=np.int64)
+        self.segment_eids = np.array(segment_eids, dtype=np.int64)
+        self.headway = np.array(headways, dtype=np.float64)
+        self.first_departure = np.array(first_departures, dtype=np.float64)
+        self.trip_count = np.array(trip_counts, dtype=np.float64)
+
+        # Rutas que pasan por cada parada (formato CSR): ruta y posición dentro de ella
+        stop_routes: List[List[Tuple[int, int]]] = [[] for _ in self.stops]
+        for route in range(len(route_lines)):
+            for position, stop in enumerate(self.route_stops[self.route_start[route]:self.route_start[route + 1]].tolist()):
+                stop_routes[stop].append((route, position))
+        self.stop_routes_start = np.cumsum([0] + [len(entries) for entries in stop_routes])
+        self.stop_routes = [entry for entries in stop_routes for entry in entries]
+
+        # Conexiones de transbordo a pie (formato CSR, en ambos sentidos)
+        footpaths: List[List[Tuple[int, int]]] = [[] for _ in self.stops]
+        for station1, station2, data in graph.edges(data=True):
+            if data.get('line') == TRANSFER_VISUAL["line"]:
+                footpaths[self.stop_index[station1]].append((self.stop_index[station2], data['eid']))
+                footpaths[self.stop_index[station2]].append((self.stop_index[station1], data['eid']))
+        self.footpaths_start = np.cumsum([0] + [len(entries) for entries in footpaths])
+        self.footpath_targets = np.array([q for entries in footpaths for q, _ in entries], dtype=np.int64)
+        self.footpath_eids = np.array([eid for entries in footpaths for _, eid in entries], dtype=np.int64)
+
+        self._times: Optional[TimetableTimes] = None
+        logger.info(f"Horario inicializado con {len(route_lines)} rutas y {len(self.footpath_targets)} transbordos")
+
+    def times(self, weights: EdgeWeights) -> TimetableTimes:
+        """Tiempos de recorrido para una versión de los pesos (se recalculan solo si cambia la versión)"""
+        times = self._times
+        if times is not None and times.version == weights.version:
+            return times
+
+        segments = np.where(self.segment_eids >= 0, weights.values[self.segment_eids], 0.0)
+        # Un tramo cerrado (peso infinito) corta la ruta: los vehículos no lo cruzan, pero
+        # el horario del resto de la ruta se mantiene
+        closed = np.isinf(segments)
+        segments[closed] = 0.0
+        cumulative = np.cumsum(segments)
+        lengths = np.diff(self.route_start)
+        route_times = cumulative - np.repeat(cumulative[self.route_start[:-1]], lengths)
+        times = TimetableTimes(weights.version, route_times, closed, weights.values[self.footpath_eids])
+        if self._times is None or weights.version > self._times.version:
+            self._times = times
+        return times
+
+    def journeys(self, origin: str, destination: str, depart_at: float,
+                 weights: EdgeWeights, max_transfers: int) -> List[Dict]:
+        """
+        Búsqueda RAPTOR por rondas: la ronda k encuentra las llegadas más tempranas
+        usando k vehículos. Devuelve los viajes del frente de Pareto (llegada, transbordos),
+        del que usa menos vehículos al que llega más temprano.
+        """
+        times = self.times(weights)
+        origin_stop = self.stop_index[origin]
+        target = self.stop_index[destination]
+        n_stops = len(self.stops)
+
+        best = np.full(n_stops, INFINITY)
+        arrivals = [np.full(n_stops, INFINITY)]
+        parents = [self._empty_parents(n_stops)]
+        arrivals[0][origin_stop] = best[origin_stop] = depart_at
+        marked = self._relax_footpaths(np.array([origin_stop]), arrivals[0], best, target, times, parents[0])
+        marked.add(origin_stop)
+
+        for _ in range(max_transfers + 1):
+            previous = arrivals[-1]
+            current = previous.copy()
+            round_parents = self._empty_parents(n_stops)
+
+            # Rutas a recorrer y la primera posición marcada en cada una
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for route, position in self.stop_routes[self.stop_routes_start[stop]:self.stop_routes_start[stop + 1]]:
+                    if position < queue.get(route, INFINITY):
+                        queue[route] = position
+
+            improved = []
+            for route, position in queue.items():
+                improved.extend(self._scan_route(route, position, previous, current, best, target, times, round_parents))
+            if not improved:
+                break
+
+            marked = set(improved)
+            marked.update(self._relax_footpaths(np.array(improved), current, best, target, times, round_parents))
+            arrivals.append(current)
+            parents.append(round_parents)
+
+        # La ronda 0 es el viaje solo a pie por transbordos, si llega al destino
+        journeys = []
+        for rounds in range(len(arrivals)):
+            previous_arrival = arrivals[rounds - 1][target] if rounds else INFINITY
+            if target != origin_stop and arrivals[rounds][target] < previous_arrival:
+                journeys.append(self._journey(rounds, target, depart_at, arrivals, parents, times))
+        return journeys
+
+    @staticmethod
+    def _empty_parents(n_stops: int) -> Dict[str, np.ndarray]:
+        return {
+            "route": np.full(n_stops, -1, dtype=np.int64),
+            "board": np.full(n_stops, -1, dtype=np.int64),
+            "alight": np.full(n_stops, -1, dtype=np.int64),
+            "trip": np.full(n_stops, -1, dtype=np.int64),
+            "walk": np.full(n_stops, -1, dtype=np.int64)
+        }
+
+    def _scan_route(self, route: int, position: int, previous: np.ndarray, current: np.ndarray,
+                    best: np.ndarray, target: int, times: TimetableTimes, parents: Dict[str, np.ndarray]) -> List[int]:
+        """
+        Recorre una ruta desde `position`; los tramos cerrados la dividen en bloques
+        que se recorren por separado.
+        """
+        start = self.route_start[route] + position
+        end = self.route_start[route + 1]
+        cuts = (np.flatnonzero(times.closed[start + 1:end]) + 1).tolist()
+        improved = []
+        for block_start, block_end in zip([0] + cuts, cuts + [end - start]):
+            improved.extend(self._scan_block(route, position + block_start, start + block_start,
+                                             start + block_end, previous, current, best, target, times, parents))
+        return improved
+
+    def _scan_block(self, route: int, position: int, start: int, end: int, previous: np.ndarray,
+                    current: np.ndarray, best: np.ndarray, target: int, times: TimetableTimes,
+                    parents: Dict[str, np.ndarray]) -> List[int]:
+        """
+        Recorre de forma vectorizada un tramo abierto de una ruta: en cada parada se puede
+        tomar el primer vehículo que pase después de la llegada de la ronda anterior y
+        se conserva el más temprano abordado hasta ese punto.
+        """
+        stops = self.route_stops[start:end]
+        offsets = times.route_times[start:end]
+        first = self.first_departure[route]
+        headway = self.headway[route]
+
+        ready = previous[stops]
+        with np.errstate(invalid='ignore'):
+            trips = np.maximum(np.ceil((ready - first - offsets) / headway - 1e-9), 0.0)
+        trips[~np.isfinite(ready) | (trips >= self.trip_count[route])] = INFINITY
+
+        # Vehículo a bordo al llegar a cada parada (abordado en una parada anterior)
+        earliest = np.minimum.accumulate(trips)
+        on_board = np.concatenate(([INFINITY], earliest[:-1]))
+        positions = np.arange(len(stops))
+        boarded_at = np.maximum.accumulate(np.where(trips < on_board, positions, -1))
+        boarded_before = np.concatenate(([-1], boarded_at[:-1]))
+
+        arrival = first + on_board * headway + offsets
+        better = np.flatnonzero(arrival < np.minimum(best[stops], best[target]))
+        if better.size == 0:
+            return []
+
+        improved = stops[better]
+        current[improved] = best[improved] = arrival[better]
+        parents["route"][improved] = route
+        parents["board"][improved] = position + boarded_before[better]
+        parents["alight"][improved] = position + better
+        parents["trip"][improved] = on_board[better]
+        parents["walk"][improved] = -1
+        return improved.tolist()
+
+    def _relax_footpaths(self, stops: np.ndarray, arrival: np.ndarray, best: np.ndarray, target: int,
+                         times: TimetableTimes, parents: Dict[str, np.ndarray]) -> set:
+        """
+        Aplica los transbordos a pie desde las paradas mejoradas en la ronda. Los transbordos
+        se encadenan (Dijkstra sobre las conexiones a pie), así que una parada alcanzable
+        caminando por varias conexiones seguidas mejora en la misma ronda.
+        """
+        marked = set()
+        heap = [(arrival[stop], stop) for stop in stops.tolist()]
+        heapq.heapify(heap)
+        while heap:
+            time, stop = heapq.heappop(heap)
+            if time > arrival[stop]:
+                continue
+            for i in range(self.footpaths_start[stop], self.footpaths_start[stop + 1]):
+                neighbor = int(self.footpath_targets[i])
+                neighbor_time = time + times.footpath_times[i]
+                if neighbor_time < min(best[neighbor], best[target]):
+                    arrival[neighbor] = best[neighbor] = neighbor_time
+                    parents["route"][neighbor] = -1
+                    parents["walk"][neighbor] = stop
+                    marked.add(neighbor)
+                    heapq.heappush(heap, (neighbor_time, neighbor))
+        return marked
+
+    def _journey(self, rounds: int, target: int, depart_at: float, arrivals: List[np.ndarray],
+                 parents: List[Dict[str, np.ndarray]], times: TimetableTimes) -> Dict:
+        """Reconstruye el viaje que llega a `target` en la ronda `rounds`"""
+        legs = []
+        stop, k = target, rounds
+        while True:
+            round_parents = parents[k]
+            walk_from = round_parents["walk"][stop]
+            if walk_from >= 0:
+                legs.append({
+                    "type": "transfer",
+                    "from": self.stops[walk_from],
+                    "to": self.stops[stop],
+                    "duration": round(float(arrivals[k][stop] - arrivals[k][walk_from]), 1)
+                })
+                stop = walk_from
+                continue
+            if k == 0:
+                break
+
+            route = round_parents["route"][stop]
+            if route < 0:
+                # La parada no mejoró en esta ronda: su llegada viene de una ronda anterior
+                k -= 1
+                continue
+            start = self.route_start[route]
+            board, alight = round_parents["board"][stop], round_parents["alight"][stop]
+            trip_departure = self.first_departure[route] + round_parents["trip"][stop] * self.headway[route]
+            departure = trip_departure + times.route_times[start + board]
+            board_stop = self.route_stops[start + board]
+            legs.append({
+                "type": "ride",
+                "line": self.route_lines[route],
+                "from": self.stops[board_stop],
+                "to": self.stops[stop],
+                "departure": format_clock(departure),
+                "arrival": format_clock(arrivals[k][stop]),
+                "wait": round(float(departure - arrivals[k - 1][board_stop]), 1),
+                "stops": [self.stops[s] for s in self.route_stops[start + board:start + alight + 1].tolist()]
+            })
+            stop, k = board_stop, k - 1
+        legs.reverse()
+
+        path = [legs[0]["from"]]
+        for leg in legs:
+            path.extend(leg["stops"][1:] if leg["type"] == "ride" else [leg["to"]])
+        lines = []
+        for leg in legs:
+            if leg["type"] == "ride" and leg["line"] not in lines:
+                lines.append(leg["line"])
+        arrival = arrivals[rounds][target]
+        return {
+            "departure": format_clock(depart_at),
+            "arrival": format_clock(arrival),
+            "duration": round(float(arrival - depart_at), 1),
+            "transfers": max(rounds - 1, 0),
+            "lines": lines,
+            "path": path,
+            "legs": legs
+        }
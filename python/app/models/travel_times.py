@@ -0,0 +1,55 @@
+"""
+Evaluación por lotes de los tiempos de viaje de todas las aristas, con las mismas
+reglas que MetroSystem.calculate_travel_time: penalización del clima más severo entre
+los extremos según el tipo de transporte, intensidad, retraso de seguridad en climas
+severos, variabilidad aleatoria y tiempo mínimo.
+"""
+import numpy as np
+from app.models.metro import (
+    MIN_TRAVEL_TIME,
+    SAFETY_DELAY_FACTOR,
+    SEVERE_WEATHER_PENALTY,
+    TRAVEL_TIME_VARIABILITY
+)
+
+
+def _with_default_cell(states: np.ndarray, intensity: np.ndarray, sunny: int):
+    """Agrega la columna final para las estaciones sin clima (celda -1): soleado con intensidad 1"""
+    rows = states.shape[0]
+    states = np.hstack([states, np.full((rows, 1), sunny, dtype=states.dtype)])
+    if intensity is not None:
+        intensity = np.hstack([intensity, np.ones((rows, 1))])
+    return states, intensity
+
+
+def edge_penalties(penalties: np.ndarray, endpoint_cells: np.ndarray, states: np.ndarray, sunny: int) -> np.ndarray:
+    """Penalización del clima más severo entre los extremos de cada arista, una fila por clima"""
+    states, _ = _with_default_cell(states, None, sunny)
+    edges = np.arange(len(penalties))
+    return np.maximum(
+        penalties[edges, states[:, endpoint_cells[:, 0]]],
+        penalties[edges, states[:, endpoint_cells[:, 1]]]
+    )
+
+
+def batch_travel_times(base_time: np.ndarray, penalties: np.ndarray, endpoint_cells: np.ndarray,
+                       states: np.ndarray, intensity: np.ndarray, sunny: int,
+                       rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Tiempos (minutos) de todas las aristas para varios climas a la vez.
+    `states` e `intensity` tienen una fila por clima y una columna por celda de la grilla;
+    `endpoint_cells` da la celda de los dos extremos de cada arista (-1 = sin clima, que
+    cuenta como soleado con intensidad 1). Sin `rng` no se aplica la variabilidad aleatoria.
+    Devuelve una fila por clima y una columna por arista (en el orden de `eid`).
+    """
+    penalty = edge_penalties(penalties, endpoint_cells, states, sunny)
+    _, intensity = _with_default_cell(states, intensity, sunny)
+    weather_intensity = np.maximum(intensity[:, endpoint_cells[:, 0]], intensity[:, endpoint_cells[:, 1]])
+
+    times = base_time * penalty * weather_intensity
+    times += np.where(penalty > SEVERE_WEATHER_PENALTY, base_time * SAFETY_DELAY_FACTOR, 0.0)
+    if rng is not None:
+        times *= rng.uniform(*TRAVEL_TIME_VARIABILITY, size=times.shape)
+    np.maximum(times, MIN_TRAVEL_TIME, out=times)
+    times[:, np.isnan(base_time)] = MIN_TRAVEL_TIME
+    return times
@@ -0,0 +1,88 @@
+from threading import Lock
+from typing import Dict, Optional
+import numpy as np
+from app.models.weather_simulator import READING_FIELDS
+
+
+class WeatherHistory:
+    """
+    Historial del clima por columnas con memoria fija.
+    Guarda las últimas `capacity` actualizaciones en buffers circulares de NumPy, uno por
+    variable (estado, intensidad y cada lectura) con una fila por actualización y una
+    columna por celda de la grilla; las estaciones leen la columna de su celda.
+    Agregar una actualización solo copia arreglos: no crea diccionarios por estación.
+    """
+
+    def __init__(self, capacity: int, cells: int):
+        self.capacity = capacity
+        self.cells = cells
+        self.versions = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)  # Segundos Unix
+        self.states = np.zeros((capacity, cells), dtype=np.int8)
+        self.intensity = np.zeros((capacity, cells), dtype=np.float32)
+        self.readings = {name: np.zeros((capacity, cells), dtype=np.float32) for name in READING_FIELDS}
+        # Primera versión registrada de cada celda (las celdas agregadas al recargar la red empiezan después)
+        self.first_versions = np.zeros(cells, dtype=np.int64)
+        self._size = 0
+        self._head = 0  # Fila donde se escribirá la próxima actualización
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, version: int, timestamp: float, states: np.ndarray, intensity: np.ndarray,
+               readings: np.ndarray):
+        """Agrega una actualización (arreglos por celda; lecturas en el orden de READING_FIELDS)"""
+        with self._lock:
+            row = self._head
+            self.versions[row] = version
+            self.timestamps[row] = timestamp
+            self.states[row] = states
+            self.intensity[row] = intensity
+            for i, name in enumerate(READING_FIELDS):
+                self.readings[name][row] = readings[:, i]
+            self._head = (row + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def append_snapshot(self, snapshot):
+        """Suscriptor del pipeline del clima: agrega la nueva instantánea al historial"""
+        if self._size and snapshot.version == self.versions[(self._head - 1) % self.capacity]:
+            return
+        self.append(snapshot.version, snapshot.timestamp.timestamp(), snapshot.states,
+                    snapshot.intensity, snapshot.readings)
+
+    def remap(self, source: np.ndarray, first_version: int):
+        """
+        Adapta el historial a una nueva grilla de clima: la columna i pasa a ser la de la
+        celda anterior `source[i]`; las celdas nuevas (-1) solo tienen historial desde
+        `first_version`.
+        """
+        source = np.asarray(source, dtype=np.intp)
+        added = source < 0
+        columns = np.where(added, 0, source)
+        with self._lock:
+            self.states = self.states[:, columns]
+            self.intensity = self.intensity[:, columns]
+            self.readings = {name: values[:, columns] for name, values in self.readings.items()}
+            self.first_versions = np.where(added, first_version, self.first_versions[columns])
+            self.cells = len(source)
+
+    def cell_series(self, cell: int, since: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Serie de una celda en orden cronológico, desde la marca de tiempo `since`
+        (segundos Unix, inclusive) o completa. Devuelve copias: una columna por variable.
+        """
+        with self._lock:
+            order = (np.arange(self._size) + self._head - self._size) % self.capacity
+            if since is not None:
+                order = order[np.searchsorted(self.timestamps[order], since, side="left"):]
+            order = order[self.versions[order] >= self.first_versions[cell]]
+            series = {
+                "version": self.versions[order],
+                "timestamp": self.timestamps[order],
+                "state": self.states[order, cell],
+                "intensity": self.intensity[order, cell]
+            }
+            for name in READING_FIELDS:
+                series[name] = self.readings[name][order, cell]
+        return series
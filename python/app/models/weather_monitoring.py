@@ -1,8 +1,22 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict, Tuple, List
+from typing import Awaitable, Callable, Dict, Optional, Tuple, List
+import inspect
 import random
-from app.config import METRO_LINES, WEATHER_STATES, WEATHER_UPDATE_INTERVAL
+import time
+import zlib
+import numpy as np
+from app.config import (
+    WEATHER_STATES,
+    WEATHER_GRID_CELL_SIZE,
+    WEATHER_HISTORY_SIZE,
+    WEATHER_SPEED_FACTORS
+)
+from app.models.network_config import NetworkConfig
+from app.models.weather_simulator import WeatherSimulator, READING_FIELDS
+from app.models.weather_history import WeatherHistory
+from app.models.weather_snapshot import WeatherSnapshot
+from app.utils.spatial_index import Cell, GridIndex
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,8 +26,6 @@ class WeatherStation:
     station_id: str
     location: List[float]
     sensor_type: str = "METRO-AWS-2000"
-    last_updated: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    weather_data: Dict = field(default_factory=dict)
     status: str = "operational"
 
     def generate_readings(self, weather_state: dict) -> Dict:
@@ -24,179 +36,304 @@ class WeatherStation:
             "pressure": round(random.uniform(1008, 1020), 1)
         }
 
+@dataclass(frozen=True)
+class WeatherLayout:
+    """Estaciones meteorológicas de una versión de la red y su celda de la grilla de clima"""
+    stations: Dict[str, WeatherStation]
+    station_names: List[str]
+    grid: GridIndex
+    grid_cells: List[Cell]
+    station_cells: np.ndarray
+
+
 class WeatherMonitoringSystem:
-    def __init__(self):
+    def __init__(self, network: NetworkConfig):
         self.stations: Dict[str, WeatherStation] = {}
-        self.initialize_stations()
-        self._cache = {}
-        self._last_update = None
+        self.initialize_stations(network)
+        self._station_names = list(self.stations.keys())
+        self.initialize_grid()
+        self.simulator = WeatherSimulator(len(self.grid_cells))
+        self.history = WeatherHistory(WEATHER_HISTORY_SIZE, len(self.grid_cells))
+        self.snapshot: Optional[WeatherSnapshot] = None  # Última instantánea publicada
+        self.epoch = 0  # Número de actualizaciones del clima generadas
         self.connected_clients = set()
         self.metro_system = None  # Se establecerá después para evitar dependencia circular
+        self._subscribers: List[Tuple[str, Callable]] = []
+        self.subscriber_stats: Dict[str, Dict] = {}
 
     def set_metro_system(self, metro_system):
-        """Establece la referencia al sistema de metro para actualizar pesos"""
+        """Establece la referencia al sistema de metro"""
         self.metro_system = metro_system
         logger.info("Referencia al sistema de metro establecida en WeatherMonitoringSystem")
 
-    def get_all_stations(self) -> Dict[str, List[float]]:
-        """Obtiene todas las estaciones y sus coordenadas de METRO_LINES"""
+    @staticmethod
+    def get_all_stations(network: NetworkConfig) -> Dict[str, List[float]]:
+        """Obtiene todas las estaciones y sus coordenadas de las líneas de la red"""
         all_stations = {}
-        for line_info in METRO_LINES.values():
+        for line_info in network.lines.values():
             all_stations.update(line_info["stations"])
         return all_stations
 
-    def initialize_stations(self):
-        stations_coords = self.get_all_stations()
+    def initialize_stations(self, network: NetworkConfig):
+        stations_coords = self.get_all_stations(network)
         for station_name, coords in stations_coords.items():
-            station_id = f"MDE-{abs(hash(station_name)) % 1000:03d}"
-            self.stations[station_name] = WeatherStation(
-                station_id=station_id,
-                location=coords
-            )
+            self.stations[station_name] = self._create_station(station_name, coords)
 
-    def update_weather(self) -> Dict[str, Dict]:
-        current_time = datetime.now(timezone.utc)
-        force_update = False
-        
-        # Si han pasado más de WEATHER_UPDATE_INTERVAL segundos, forzar actualización
-        if (self._last_update and 
-            (current_time - self._last_update).total_seconds() >= WEATHER_UPDATE_INTERVAL):
-            force_update = True
-            logger.info(f"Forzando actualización del clima después de {WEATHER_UPDATE_INTERVAL} segundos")
-        
-        if not force_update and self._cache:
-            return self._cache
+    @staticmethod
+    def _create_station(station_name: str, coords: List[float]) -> WeatherStation:
+        # crc32 es estable entre procesos, a diferencia de hash() con PYTHONHASHSEED aleatorio
+        station_id = f"MDE-{zlib.crc32(station_name.encode('utf-8')) % 1000:03d}"
+        return WeatherStation(
+            station_id=station_id,
+            location=coords
+        )
+
+    @staticmethod
+    def _build_grid(stations: Dict[str, WeatherStation]) -> Tuple[GridIndex, List[Cell], np.ndarray]:
+        """Grilla de clima de un conjunto de estaciones y la celda (posición) de cada estación"""
+        grid = GridIndex.build(
+            {name: station.location for name, station in stations.items()},
+            WEATHER_GRID_CELL_SIZE
+        )
+        grid_cells = list(grid.cells.keys())
+        cell_positions = {cell: i for i, cell in enumerate(grid_cells)}
+        station_cells = np.array(
+            [cell_positions[grid.cell_of(*station.location)] for station in stations.values()],
+            dtype=np.intp
+        )
+        return grid, grid_cells, station_cells
+
+    def initialize_grid(self):
+        """
+        Asigna cada estación a una celda de la grilla de clima una sola vez.
+        La simulación avanza por celdas y las estaciones leen el estado de su celda.
+        """
+        self.grid, self.grid_cells, self._station_cells = self._build_grid(self.stations)
+        logger.info(f"Grilla de clima: {len(self.grid_cells)} celdas para {len(self._station_names)} estaciones")
+
+    def prepare_network(self, network: NetworkConfig) -> WeatherLayout:
+        """
+        Prepara aparte (sin tocar el estado vivo) las estaciones y la grilla de otra versión
+        de la red. Las estaciones que no cambiaron conservan su estación meteorológica.
+        """
+        stations_coords = self.get_all_stations(network)
+        stations = {
+            name: self.stations[name] if name in self.stations and self.stations[name].location == coords
+            else self._create_station(name, coords)
+            for name, coords in stations_coords.items()
+        }
+        grid, grid_cells, station_cells = self._build_grid(stations)
+        return WeatherLayout(stations, list(stations), grid, grid_cells, station_cells)
+
+    def apply_network(self, layout: WeatherLayout) -> WeatherSnapshot:
+        """
+        Cambia a las estaciones y la grilla preparadas con prepare_network. Las celdas que
+        siguen existiendo conservan su estado e historial; las nuevas comienzan soleadas.
+        Publica (sin notificar a los suscriptores) la instantánea de la misma época con
+        las condiciones de las nuevas estaciones.
+        """
+        positions = {cell: i for i, cell in enumerate(self.grid_cells)}
+        source = np.array([positions.get(cell, -1) for cell in layout.grid_cells], dtype=np.intp)
+        self.simulator.remap(source)
+        self.history.remap(source, self.epoch + 1)
+        self.stations = layout.stations
+        self._station_names = layout.station_names
+        self.grid, self.grid_cells, self._station_cells = layout.grid, layout.grid_cells, layout.station_cells
+        kept = int((source >= 0).sum())
+        logger.info(
+            f"Grilla de clima: {len(self.grid_cells)} celdas ({kept} conservadas) "
+            f"para {len(self._station_names)} estaciones"
+        )
+        timestamp = self.snapshot.timestamp if self.snapshot else datetime.now(timezone.utc)
+        return self._publish_snapshot(self.simulator.states, timestamp)
+
+    def _build_conditions(self, previous_states, current_time: datetime) -> Tuple[Dict[str, Dict], List[Dict]]:
+        """Convierte el estado de las celdas del simulador al formato de salida por estación"""
+        state_names = self.simulator.state_names
+        cells = self._station_cells
+        states = self.simulator.states[cells].tolist()
+        previous = previous_states[cells].tolist()
+        intensities = self.simulator.intensity[cells].tolist()
+        readings = self.simulator.readings[cells].tolist()
+        last_updated = current_time.isoformat()
 
         updated_conditions = {}
-        weather_changes = []  # Para rastrear cambios en el clima
-        
-        for station_name, station in self.stations.items():
-            current = station.weather_data.get("type", "sunny")
-            weather_state = WEATHER_STATES[current]
-            
-            # Determinar siguiente estado del clima con mayor variabilidad
-            transitions = weather_state["transitions"]
-            
-            # Aumentar la probabilidad de cambio para pruebas
-            if force_update:
-                # Reducir la probabilidad de quedarse en el mismo estado
-                adjusted_transitions = transitions.copy()
-                if current in adjusted_transitions and adjusted_transitions[current] > 0.3:
-                    adjusted_transitions[current] = 0.3
-                    # Redistribuir el resto de probabilidad
-                    remaining = 1.0 - adjusted_transitions[current]
-                    other_states = [s for s in adjusted_transitions if s != current]
-                    for state in other_states:
-                        adjusted_transitions[state] = remaining / len(other_states)
-                transitions = adjusted_transitions
-            
-            next_state = random.choices(
-                list(transitions.keys()),
-                weights=list(transitions.values())
-            )[0]
-            
+        weather_changes = []
+        for i, station_name in enumerate(self._station_names):
+            station = self.stations[station_name]
+            next_state = state_names[states[i]]
+            new_state = WEATHER_STATES[next_state]
+            station_readings = dict(zip(READING_FIELDS, readings[i]))
+
             # Registrar cambio si ocurrió
-            if next_state != current:
+            if states[i] != previous[i]:
                 weather_changes.append({
                     "station": station_name,
-                    "from": current,
+                    "from": state_names[previous[i]],
                     "to": next_state
                 })
-            
-            new_state = WEATHER_STATES[next_state]
-            readings = station.generate_readings(new_state)
-            
-            station.weather_data = {
-                "type": next_state,
-                "intensity": random.uniform(0.8, 1.0),
-                "readings": readings
-            }
-            station.last_updated = current_time
-            
+
             updated_conditions[station_name] = {
                 "station_id": station.station_id,
                 "type": next_state,
                 "name": new_state["name"],
                 "icon": new_state["icon"],
-                "intensity": station.weather_data["intensity"],
+                "intensity": intensities[i],
                 "location": station.location,
-                "readings": readings,
-                "last_updated": current_time.isoformat(),
+                "readings": station_readings,
+                "last_updated": last_updated,
                 "status": station.status
             }
 
+        return updated_conditions, weather_changes
+
+    def subscribe(self, name: str, callback: Callable[[WeatherSnapshot], Optional[Awaitable]]):
+        """
+        Registra un suscriptor del pipeline del clima.
+        Cada suscriptor se invoca una sola vez por actualización, en el orden de registro,
+        con la nueva instantánea; puede ser una función o una corrutina.
+        """
+        self._subscribers.append((name, callback))
+        self.subscriber_stats.setdefault(
+            name, {"calls": 0, "errors": 0, "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0}
+        )
+
+    def clear_subscribers(self):
+        """Quita todos los suscriptores (sus estadísticas se conservan si se vuelven a registrar)"""
+        self._subscribers = []
+
+    def replace_subscriber(self, name: str, callback: Callable[[WeatherSnapshot], Optional[Awaitable]]):
+        """Cambia la función de un suscriptor registrado conservando su posición y estadísticas"""
+        self._subscribers = [
+            (subscriber, callback if subscriber == name else current)
+            for subscriber, current in self._subscribers
+        ]
+
+    @property
+    def last_update(self) -> Optional[datetime]:
+        return self.snapshot.timestamp if self.snapshot else None
+
+    def _publish_snapshot(self, previous_states: np.ndarray, current_time: datetime) -> WeatherSnapshot:
+        """Construye y publica la instantánea inmutable del estado actual del simulador"""
+        conditions, changes = self._build_conditions(previous_states, current_time)
+        self.snapshot = WeatherSnapshot.create(
+            version=self.epoch,
+            timestamp=current_time,
+            conditions=conditions,
+            changes=changes,
+            states=self.simulator.states,
+            intensity=self.simulator.intensity,
+            readings=self.simulator.readings
+        )
+        return self.snapshot
+
+    def advance(self) -> WeatherSnapshot:
+        """Avanza la simulación de todas las celdas un paso y publica una nueva instantánea"""
+        current_time = datetime.now(timezone.utc)
+        # Las actualizaciones periódicas usan las transiciones sin ajustar, como el servicio
+        # original; la simulación de escenarios y el pronóstico usan las mismas
+        previous_states = self.simulator.step()
+        self.epoch += 1
+        snapshot = self._publish_snapshot(previous_states, current_time)
+
         # Registrar cambios en el clima
-        if weather_changes:
-            logger.info(f"Cambios en el clima detectados en {len(weather_changes)} estaciones:")
-            for change in weather_changes:
-                logger.info(f"  {change['station']}: {change['from']} → {change['to']}")
-
-        self._cache = updated_conditions
-        self._last_update = current_time
-        
-        # Actualizar los pesos del grafo basados en el nuevo clima
-        if self.metro_system:
-            self._update_graph_weights()
-        else:
-            logger.warning("No se pueden actualizar los pesos: metro_system no está establecido")
-        
-        return updated_conditions
-    
-    def _update_graph_weights(self):
-        """Actualiza los pesos de las aristas en el grafo del metro basados en el clima actual"""
-        if not self.metro_system:
-            logger.warning("No se pueden actualizar los pesos del grafo: metro_system no está establecido")
-            return
-            
-        logger.info("Actualizando pesos del grafo basados en condiciones climáticas actuales")
-        
-        # Contador para cambios significativos
-        significant_changes = 0
-        total_edges = 0
-        
-        # Guardar los pesos actuales para comparación
-        old_weights = {}
-        for station1, station2, data in self.metro_system.metro_graph.edges(data=True):
-            old_weights[(station1, station2)] = data.get('weight', 0)
-        
-        # Actualizar el clima en el sistema de metro
-        self.metro_system.weather_conditions = {
-            station: {
-                "type": data.get("type", "sunny"),
-                "name": data.get("name", "Soleado"),
-                "icon": data.get("icon", "☀️"),
-                "intensity": data.get("intensity", 1.0)
-            }
-            for station, data in self._cache.items()
+        if snapshot.changes:
+            logger.info(f"Cambios en el clima detectados en {len(snapshot.changes)} estaciones (versión {snapshot.version}):")
+            for change in snapshot.changes:
+                impact = round((1 - WEATHER_SPEED_FACTORS.get(change['to'], 1.0)) * 100)
+                logger.info(f"  {change['station']}: {change['from']} → {change['to']} (impacto: {impact}%)")
+
+        return snapshot
+
+    async def notify_subscribers(self, snapshot: WeatherSnapshot):
+        """Invoca a cada suscriptor exactamente una vez con la instantánea y mide su duración"""
+        for name, callback in self._subscribers:
+            stats = self.subscriber_stats[name]
+            start = time.perf_counter()
+            try:
+                result = callback(snapshot)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Error en el suscriptor del clima '{name}': {e}", exc_info=True)
+            elapsed = (time.perf_counter() - start) * 1000
+            stats["calls"] += 1
+            stats["last_ms"] = elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            stats["total_ms"] += elapsed
+            logger.debug(f"Suscriptor '{name}' procesó la versión {snapshot.version} en {elapsed:.1f} ms")
+
+    async def tick(self) -> Optional[WeatherSnapshot]:
+        """Genera una actualización del clima y la entrega a todos los suscriptores"""
+        snapshot = self.advance()
+        await self.notify_subscribers(snapshot)
+        return snapshot
+
+    def current_conditions(self) -> Dict[str, Dict]:
+        """
+        Condiciones de la última instantánea publicada.
+        Es de solo lectura: nunca genera una actualización, así que es segura en las solicitudes.
+        """
+        return self.snapshot.conditions if self.snapshot else {}
+
+    def station_cells(self, stations: List[str]) -> np.ndarray:
+        """Celda de la grilla de clima de cada estación (-1 si no tiene estación meteorológica)"""
+        positions = {name: i for i, name in enumerate(self._station_names)}
+        return np.array(
+            [self._station_cells[positions[name]] if name in positions else -1 for name in stations],
+            dtype=np.intp
+        )
+
+    def forecast(self, steps: int) -> np.ndarray:
+        """Distribución acumulada del estado de cada celda dentro de `steps` actualizaciones del clima"""
+        states = self.snapshot.states if self.snapshot else None
+        return self.simulator.forecast(steps, states)
+
+    def station_history(self, station: str, since: Optional[float] = None) -> Dict:
+        """
+        Historial del clima de una estación (por columnas, en orden cronológico) desde
+        la marca de tiempo `since` en segundos Unix, o todo el historial retenido.
+        """
+        if station not in self.stations:
+            raise ValueError(f"Estación '{station}' no encontrada")
+        series = self.history.cell_series(int(self.station_cells([station])[0]), since)
+        state_names = self.simulator.state_names
+        return {
+            "station": station,
+            "station_id": self.stations[station].station_id,
+            "versions": series["version"].tolist(),
+            "timestamps": [
+                datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+                for timestamp in series["timestamp"].tolist()
+            ],
+            "states": [state_names[state] for state in series["state"].tolist()],
+            # Los buffers son float32: se redondea en float64 para devolver los valores grabados
+            "intensity": np.round(series["intensity"].astype(np.float64), 3).tolist(),
+            **{name: np.round(series[name].astype(np.float64), 1).tolist() for name in READING_FIELDS}
         }
-        
-        # Iterar sobre todas las aristas del grafo
-        for station1, station2, data in self.metro_system.metro_graph.edges(data=True):
-            total_edges += 1
-            
-            # Calcular el nuevo tiempo de viaje basado en el clima actual
-            time = self.metro_system.calculate_travel_time(station1, station2, data['line'])
-            
-            # Verificar si hay un cambio significativo
-            old_weight = old_weights.get((station1, station2), time)
-            if abs(old_weight - time) > 0.2:  # Cambio de más de 12 segundos
-                significant_changes += 1
-                
-                # Obtener información del clima para ambas estaciones
-                weather1 = self._cache.get(station1, {}).get('type', 'sunny')
-                weather2 = self._cache.get(station2, {}).get('type', 'sunny')
-                
-                logger.info(
-                    f"Peso actualizado: {station1} → {station2} | "
-                    f"Línea: {data['line']} | "
-                    f"Tiempo: {old_weight:.1f}min → {time:.1f}min | "
-                    f"Clima: {weather1}/{weather2}"
-                )
-            
-            # Actualizar el peso de la arista
-            self.metro_system.metro_graph[station1][station2]['weight'] = time
-        
-        if significant_changes > 0:
-            logger.info(f"Pesos actualizados: {significant_changes} de {total_edges} aristas modificadas debido a cambios en el clima")
-        else:
-            logger.info("Pesos del grafo actualizados (sin cambios significativos)") 
\ No newline at end of file
+
+    def export_state(self) -> Dict[str, np.ndarray]:
+        """Exporta el estado de la simulación para guardarlo en una instantánea"""
+        return {
+            "weather_states": self.simulator.states,
+            "weather_intensity": self.simulator.intensity,
+            "weather_readings": self.simulator.readings,
+            "epoch": np.array(self.epoch, dtype=np.int64),
+            "last_update": np.array(self.last_update.timestamp() if self.last_update else 0.0)
+        }
+
+    def restore_state(self, state: Dict[str, np.ndarray]) -> WeatherSnapshot:
+        """Restaura el estado de la simulación y publica su instantánea (sin notificar a los suscriptores)"""
+        states = state["weather_states"]
+        if states.shape != self.simulator.states.shape:
+            raise ValueError(f"La instantánea tiene {states.shape[0]} celdas y la grilla {self.simulator.size}")
+
+        self.simulator.states = states.astype(np.int8)
+        self.simulator.intensity = state["weather_intensity"].astype(np.float64)
+        self.simulator.readings = state["weather_readings"].astype(np.float64)
+        self.epoch = int(state["epoch"])
+
+        last_update = float(state["last_update"])
+        timestamp = datetime.fromtimestamp(last_update, timezone.utc) if last_update else datetime.now(timezone.utc)
+        return self._publish_snapshot(self.simulator.states, timestamp)
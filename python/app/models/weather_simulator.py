@@ -0,0 +1,134 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from app.config import WEATHER_STATES
+
+# Orden de las lecturas en la matriz de sensores
+READING_FIELDS = ("temperature", "humidity", "visibility", "pressure")
+PRESSURE_RANGE = (1008, 1020)
+INTENSITY_RANGE = (0.8, 1.0)
+
+# Probabilidad máxima de permanecer en el mismo estado en una actualización forzada
+FORCED_STAY_PROBABILITY = 0.3
+
+
+class WeatherSimulator:
+    """
+    Simulador de Markov vectorizado del clima.
+    Muestrea el siguiente estado y las lecturas de todos los sensores en un solo paso.
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.state_names: List[str] = list(WEATHER_STATES.keys())
+        self.state_index = {name: i for i, name in enumerate(self.state_names)}
+
+        # Matrices de transición precalculadas (normal y forzada) en forma acumulada
+        self.transition_matrix = self._build_transition_matrix(forced=False)
+        self.forced_transition_matrix = self._build_transition_matrix(forced=True)
+        self._cumulative = np.cumsum(self.transition_matrix, axis=1)
+        self._forced_cumulative = np.cumsum(self.forced_transition_matrix, axis=1)
+
+        # Rangos de lecturas por estado: columnas en el orden de READING_FIELDS
+        lows, highs = [], []
+        for name in self.state_names:
+            state = WEATHER_STATES[name]
+            lows.append([state["temp_range"][0], state["humidity_range"][0],
+                         state["visibility_range"][0], PRESSURE_RANGE[0]])
+            highs.append([state["temp_range"][1], state["humidity_range"][1],
+                          state["visibility_range"][1], PRESSURE_RANGE[1]])
+        self._reading_low = np.array(lows, dtype=np.float64)
+        self._reading_span = np.array(highs, dtype=np.float64) - self._reading_low
+
+        # Estado actual de todos los sensores (todos comienzan soleados)
+        self.states = np.full(size, self.state_index["sunny"], dtype=np.int8)
+        self.intensity = np.ones(size, dtype=np.float64)
+        self.readings = np.zeros((size, len(READING_FIELDS)), dtype=np.float64)
+
+    def _build_transition_matrix(self, forced: bool) -> np.ndarray:
+        """Construye la matriz de transición a partir de WEATHER_STATES"""
+        n = len(self.state_names)
+        matrix = np.zeros((n, n), dtype=np.float64)
+        for i, name in enumerate(self.state_names):
+            transitions = WEATHER_STATES[name]["transitions"]
+            for j, target in enumerate(self.state_names):
+                matrix[i, j] = transitions.get(target, 0.0)
+
+            # En una actualización forzada se reduce la probabilidad de quedarse
+            # en el mismo estado y se reparte el resto entre los demás estados
+            if forced and matrix[i, i] > FORCED_STAY_PROBABILITY:
+                remaining = 1.0 - FORCED_STAY_PROBABILITY
+                matrix[i, :] = remaining / (n - 1)
+                matrix[i, i] = FORCED_STAY_PROBABILITY
+
+        return matrix / matrix.sum(axis=1, keepdims=True)
+
+    def remap(self, source: np.ndarray):
+        """
+        Adapta el simulador a una nueva grilla: el sensor i continúa el estado del sensor
+        anterior `source[i]`; los sensores nuevos (-1) comienzan soleados.
+        """
+        source = np.asarray(source, dtype=np.intp)
+        kept = source >= 0
+        size = len(source)
+        sunny = self.state_index["sunny"]
+        states = np.full(size, sunny, dtype=np.int8)
+        intensity = np.ones(size, dtype=np.float64)
+        noise = self.rng.random((size, len(READING_FIELDS)))
+        readings = np.round(self._reading_low[sunny] + noise * self._reading_span[sunny], 1)
+        states[kept] = self.states[source[kept]]
+        intensity[kept] = self.intensity[source[kept]]
+        readings[kept] = self.readings[source[kept]]
+        self.size = size
+        self.states, self.intensity, self.readings = states, intensity, readings
+
+    def step(self, forced: bool = False) -> np.ndarray:
+        """
+        Avanza un paso la cadena de Markov para todos los sensores.
+        Devuelve los estados anteriores para poder detectar cambios.
+        """
+        cumulative = self._forced_cumulative if forced else self._cumulative
+        previous = self.states
+
+        # Muestreo inverso sobre la fila acumulada del estado actual de cada sensor
+        draws = self.rng.random(self.size)
+        next_states = (cumulative[previous] <= draws[:, None]).sum(axis=1)
+        np.minimum(next_states, len(self.state_names) - 1, out=next_states)
+        self.states = next_states.astype(np.int8)
+
+        self.intensity = self.rng.uniform(*INTENSITY_RANGE, size=self.size)
+        noise = self.rng.random((self.size, len(READING_FIELDS)))
+        self.readings = np.round(
+            self._reading_low[self.states] + noise * self._reading_span[self.states], 1
+        )
+        return previous
+
+    def trajectory(self, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Simula `steps` pasos de la cadena para todos los sensores desde el estado actual,
+        sin modificarlo (y sin generar lecturas), con las mismas transiciones que las
+        actualizaciones periódicas (step()). Los números aleatorios de todos los pasos
+        se generan de una vez; solo la recurrencia de la cadena se recorre paso a paso.
+        Devuelve los estados e intensidades con una fila por paso.
+        """
+        draws = self.rng.random((steps, self.size))
+        intensity = self.rng.uniform(*INTENSITY_RANGE, size=(steps, self.size))
+        states = np.empty((steps, self.size), dtype=np.int8)
+        current = self.states
+        last_state = len(self.state_names) - 1
+        for t in range(steps):
+            current = np.minimum((self._cumulative[current] <= draws[t][:, None]).sum(axis=1), last_state)
+            states[t] = current
+        return states, intensity
+
+    def forecast(self, steps: int, states: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Distribución acumulada del estado de cada sensor dentro de `steps` pasos:
+        filas de la matriz de transición de las actualizaciones periódicas (la de step())
+        elevada a `steps` para el estado de cada sensor (el actual del simulador si no se
+        indica).
+        """
+        if states is None:
+            states = self.states
+        matrix = np.linalg.matrix_power(self.transition_matrix, max(int(steps), 0))
+        return np.cumsum(matrix, axis=1)[states]
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Tuple
+import numpy as np
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    """Copia de solo lectura de un arreglo"""
+    copy = np.array(array, copy=True)
+    copy.flags.writeable = False
+    return copy
+
+
+@dataclass(frozen=True)
+class WeatherSnapshot:
+    """
+    Estado del clima publicado en una actualización.
+    Es inmutable: cada actualización publica una instantánea nueva con una versión mayor.
+    `conditions` no debe modificarse; se comparte entre todos los suscriptores.
+    """
+    version: int
+    timestamp: datetime
+    conditions: Dict[str, Dict]
+    changes: Tuple[Dict, ...]
+    states: np.ndarray
+    intensity: np.ndarray
+    readings: np.ndarray
+
+    @classmethod
+    def create(cls, version: int, timestamp: datetime, conditions: Dict[str, Dict], changes,
+               states: np.ndarray, intensity: np.ndarray, readings: np.ndarray) -> "WeatherSnapshot":
+        return cls(
+            version=version,
+            timestamp=timestamp,
+            conditions=conditions,
+            changes=tuple(changes),
+            states=_frozen(states),
+            intensity=_frozen(intensity),
+            readings=_frozen(readings)
+        )
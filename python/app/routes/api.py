@@ -1,80 +1,213 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+import io
 import json
 import logging
-from app.services.weather_service import weather_monitoring_system
-from app.services.metro_service import metro_system
+import math
+from app.services import get_metro_system, get_weather_monitoring_system, get_network_map
+from app.services.connection_service import ClientConnection, resolve_subscription
+from app.services.route_service import find_route, coalescing_stats
 from app.utils.graph_utils import generate_graph_visualization
-from app.config import METRO_LINES
+from app.config import (
+    NEAREST_STATIONS_K,
+    MAX_NEAREST_STATIONS,
+    ROUTE_LOG_PAGE_SIZE,
+    MAX_ROUTE_LOG_PAGE_SIZE,
+    TIMETABLE_CRITERIA,
+    MATRIX_FORMATS,
+    MATRIX_METRICS,
+    RELIABILITY_SAMPLES,
+    RECORD_PATH,
+    STATION_SEARCH_LIMIT,
+    MAX_STATION_SEARCH_LIMIT
+)
 from datetime import datetime, timezone
+from typing import Optional
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _tagged(message: dict, request_id) -> dict:
+    """Agrega el id de la consulta a la respuesta, si el cliente lo envió"""
+    if request_id is not None:
+        message["id"] = request_id
+    return message
+
+def _resolve_stations(*names: str):
+    """
+    Resuelve nombres de estación escritos por el usuario (sin tildes, abreviados o con
+    errores) a estaciones de la red. Devuelve los nombres resueltos y None, o None y el
+    error con sugerencias si algún nombre no corresponde a una estación sin ambigüedad.
+    """
+    metro_system = get_metro_system()
+    resolved = []
+    for name in names:
+        station, suggestions = metro_system.resolve_station(name)
+        if station is None:
+            return None, {
+                "message": f"Estación no encontrada: {name}",
+                "suggestions": [suggestion["station"] for suggestion in suggestions]
+            }
+        resolved.append(station)
+    return resolved, None
+
+def _coordinates_error(*coordinates) -> Optional[str]:
+    """Mensaje de error si alguna coordenada (lat, lon) no es finita o está fuera de rango"""
+    for lat, lon in coordinates:
+        if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+            return f"Coordenada inválida: ({lat}, {lon}); use latitud entre -90 y 90 y longitud entre -180 y 180"
+    return None
+
+async def _handle_route_request(connection: ClientConnection, request_id, origin: str, destination: str):
+    """Calcula una ruta en un hilo aparte y la difunde; la respuesta a quien la pidió lleva el id de la consulta"""
+    metro_system = get_metro_system()
+    route = await find_route(metro_system, origin, destination)
+    if route:
+        # Enviar la nueva ruta a quien la pidió (con el id de su consulta) y a los clientes
+        # suscritos a sus estaciones (sin id: no es respuesta a una consulta suya)
+        route_update = {
+            "type": "route_update",
+            "data": {
+                "new_route": route,
+                "route_history": metro_system.route_history
+            }
+        }
+        await broadcast_to_clients(route_update, route["path"], connection, request_id)
+    else:
+        await connection.send_json(_tagged({
+            "type": "error",
+            "message": "No se encontró una ruta disponible"
+        }, request_id))
+
+async def _handle_subscription(connection: ClientConnection, request_id, data: dict):
+    """
+    Suscribe el cliente a líneas, estaciones o un rectángulo ("bbox") y decide si recibe
+    las rutas de otros usuarios ("others_routes"). Sin filtros recibe toda la red;
+    "unsubscribe" vuelve a la suscripción por defecto.
+    """
+    weather_monitoring_system = get_weather_monitoring_system()
+    if data["type"] == "unsubscribe":
+        stations, others_routes = None, True
+    else:
+        try:
+            lines = data.get("lines") or []
+            station_names = data.get("stations") or []
+            bbox = data.get("bbox")
+            stations = None
+            if lines or station_names or bbox is not None:
+                stations = resolve_subscription(get_metro_system().network.lines, lines, station_names, bbox)
+            others_routes = bool(data.get("others_routes", True))
+        except (ValueError, TypeError) as e:
+            await connection.send_json(_tagged({"type": "error", "message": str(e)}, request_id))
+            return
+    
+    weather_monitoring_system.connected_clients.subscribe(connection, stations, others_routes)
+    await connection.send_json(_tagged({
+        "type": "subscribed",
+        "stations": sorted(stations) if stations is not None else None,
+        "others_routes": others_routes
+    }, request_id))
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Consultas de rutas por WebSocket. Cada mensaje puede llevar un "id"; varias consultas
+    de un mismo cliente se procesan a la vez y cada respuesta repite el id de su consulta,
+    por lo que pueden llegar en otro orden. Los mensajes "subscribe"/"unsubscribe"
+    limitan qué rutas y qué clima recibe el cliente.
+    """
+    metro_system = get_metro_system()
+    weather_monitoring_system = get_weather_monitoring_system()
+    if RECORD_PATH:
+        from app.services.recording_service import record_websocket
     await websocket.accept()
-    weather_monitoring_system.connected_clients.add(websocket)
+    connection = ClientConnection(websocket)
+    weather_monitoring_system.connected_clients.add(connection)
     
     try:
         # Enviar datos iniciales
         initial_data = {
             "type": "initial_data",
             "data": {
-                "weather_conditions": weather_monitoring_system.update_weather(),
+                "weather_conditions": weather_monitoring_system.current_conditions(),
                 "route_history": metro_system.route_history
             }
         }
-        await websocket.send_json(initial_data)
+        await connection.send_json(initial_data)
         
         while True:
             try:
                 data = await websocket.receive_json()
-                origin = data.get("origin")
-                destination = data.get("destination")
-                
-                if not origin or not destination:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Origen y destino son requeridos"
-                    })
-                    continue
-                
-                route = metro_system.find_route(origin, destination)
-                if route:
-                    # Enviar la nueva ruta a todos los clientes conectados
-                    route_update = {
-                        "type": "route_update",
-                        "data": {
-                            "new_route": route,
-                            "route_history": metro_system.route_history
-                        }
-                    }
-                    await broadcast_to_clients(route_update)
-                else:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "No se encontró una ruta disponible"
-                    })
-                    
             except json.JSONDecodeError:
-                await websocket.send_json({
+                await connection.send_json({
                     "type": "error",
                     "message": "Formato de mensaje inválido"
                 })
+                continue
+            
+            if not isinstance(data, dict):
+                await connection.send_json({
+                    "type": "error",
+                    "message": "Formato de mensaje inválido"
+                })
+                continue
+            
+            if RECORD_PATH:
+                record_websocket(connection, data)
+            
+            request_id = data.get("id")
+            
+            if data.get("type") in ("subscribe", "unsubscribe"):
+                await _handle_subscription(connection, request_id, data)
+                continue
+            
+            origin = data.get("origin")
+            destination = data.get("destination")
+            
+            if not origin or not destination:
+                await connection.send_json(_tagged({
+                    "type": "error",
+                    "message": "Origen y destino son requeridos"
+                }, request_id))
+                continue
+            
+            stations, error = _resolve_stations(origin, destination)
+            if error:
+                await connection.send_json(_tagged({"type": "error", **error}, request_id))
+                continue
+            origin, destination = stations
+            
+            rejection = connection.admit()
+            if rejection:
+                await connection.send_json(_tagged({"type": "error", **rejection}, request_id))
+                continue
+            
+            connection.start(_handle_route_request(connection, request_id, origin, destination))
                 
     except WebSocketDisconnect:
-        weather_monitoring_system.connected_clients.remove(websocket)
+        pass
     except Exception as e:
         logger.error(f"Error en websocket: {e}")
-        weather_monitoring_system.connected_clients.remove(websocket)
+    finally:
+        connection.cancel_pending()
+        weather_monitoring_system.connected_clients.discard(connection)
 
-async def broadcast_to_clients(message):
-    """Envía un mensaje a todos los clientes conectados"""
+async def broadcast_to_clients(message, path=None, requester: Optional[ClientConnection] = None,
+                               request_id=None):
+    """
+    Envía un mensaje a los clientes conectados. Si se indica el camino de una ruta,
+    solo lo reciben quien la pidió y los clientes suscritos a alguna de sus estaciones.
+    Solo quien la pidió recibe el mensaje con el id de su consulta.
+    """
+    weather_monitoring_system = get_weather_monitoring_system()
+    clients = weather_monitoring_system.connected_clients
+    recipients = clients if path is None else clients.route_recipients(path, requester)
     disconnected_clients = set()
-    for client in weather_monitoring_system.connected_clients:
+    requester_message = _tagged(dict(message), request_id)
+    for client in recipients:
         try:
-            await client.send_json(message)
+            await client.send_json(requester_message if client is requester else message)
         except Exception as e:
             logger.error(f"Error al enviar mensaje: {e}")
             disconnected_clients.add(client)
@@ -84,24 +217,56 @@ async def broadcast_to_clients(message):
 @router.get("/stations")
 async def get_stations():
     """Obtener lista de todas las estaciones"""
+    metro_system = get_metro_system()
     return {"stations": list(metro_system.metro_graph.nodes())}
 
+@router.get("/stations/search")
+async def search_stations(q: str, limit: int = STATION_SEARCH_LIMIT):
+    """
+    Buscar estaciones por nombre para autocompletar, sin distinguir tildes ni mayúsculas:
+    coincidencias exactas, por prefijo del nombre o de una palabra y, con errores de
+    escritura, por parecido. Cada resultado trae su puntaje (0 a 1) y el tipo de coincidencia.
+    """
+    metro_system = get_metro_system()
+    limit = max(1, min(limit, MAX_STATION_SEARCH_LIMIT))
+    return {
+        "status": "success",
+        "query": q,
+        "results": metro_system.search_stations(q, limit)
+    }
+
 @router.get("/coordinates")
 async def get_coordinates():
     """Obtener coordenadas de todas las estaciones"""
     all_stations = {}
-    for line_info in METRO_LINES.values():
+    for line_info in get_metro_system().network.lines.values():
         all_stations.update(line_info["stations"])
     return {"coordinates": all_stations}
 
 @router.get("/lines")
 async def get_lines():
     """Obtener información de todas las líneas del metro"""
-    return {"lines": METRO_LINES}
+    return {"lines": get_metro_system().network.lines}
 
 @router.get("/routes/history")
-async def get_route_history():
-    """Obtener historial de rutas ordenado por más reciente"""
+async def get_route_history(cursor: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Obtener historial de rutas ordenado por más reciente.
+    Con `cursor` o `limit` pagina el registro completo en disco, de la ruta más antigua a la más reciente.
+    """
+    metro_system = get_metro_system()
+    if cursor is not None or limit is not None:
+        limit = max(1, min(limit or ROUTE_LOG_PAGE_SIZE, MAX_ROUTE_LOG_PAGE_SIZE))
+        routes, next_cursor = metro_system.history.read_log(max(0, cursor or 0), limit)
+        return {
+            "routes": routes,
+            "next_cursor": next_cursor,
+            "metadata": {
+                "returned_routes": len(routes),
+                "limit": limit
+            }
+        }
+    
     return {
         "routes": metro_system.route_history,
         "metadata": {
@@ -113,23 +278,80 @@ async def get_route_history():
 @router.get("/weather/current")
 async def get_current_weather():
     """Obtener condiciones climáticas actuales de todas las estaciones"""
+    weather_monitoring_system = get_weather_monitoring_system()
     return {
-        "weather_conditions": weather_monitoring_system.update_weather(),
+        "weather_conditions": weather_monitoring_system.current_conditions(),
         "metadata": {
             "stations_reporting": len(weather_monitoring_system.stations),
-            "last_updated": weather_monitoring_system._last_update.isoformat() if weather_monitoring_system._last_update else None
+            "last_updated": weather_monitoring_system.last_update.isoformat() if weather_monitoring_system.last_update else None
         }
     }
 
+@router.get("/weather/history")
+async def get_weather_history(station: str, since: Optional[str] = None):
+    """
+    Historial del clima de una estación por columnas (una lista por variable, en orden
+    cronológico) desde `since` (fecha ISO 8601 o segundos Unix), o todo el historial retenido.
+    """
+    weather_monitoring_system = get_weather_monitoring_system()
+    since_timestamp = None
+    if since:
+        try:
+            since_timestamp = float(since)
+        except ValueError:
+            try:
+                since_time = datetime.fromisoformat(since)
+            except ValueError:
+                return {"status": "error", "message": "`since` debe ser una fecha ISO 8601 o segundos Unix"}
+            if since_time.tzinfo is None:
+                since_time = since_time.replace(tzinfo=timezone.utc)
+            since_timestamp = since_time.timestamp()
+    
+    try:
+        history = weather_monitoring_system.station_history(station, since_timestamp)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    
+    return {
+        "status": "success",
+        **history
+    }
+
 @router.get("/graph")
 async def get_graph():
     """Genera y devuelve una visualización del grafo del sistema"""
+    metro_system = get_metro_system()
     buf = generate_graph_visualization(metro_system)
     return StreamingResponse(buf, media_type="image/png")
 
+def _cached_response(request: Request, content_fn, media_type: str, etag: str) -> Response:
+    """Respuesta con ETag; si el cliente ya tiene esa versión responde 304 sin contenido"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content_fn(), media_type=media_type, headers=headers)
+
+@router.get("/network.geojson")
+async def get_network_geojson(request: Request):
+    """Líneas, transbordos y estaciones con el clima actual en GeoJSON"""
+    network_map = get_network_map()
+    etag = f'"{network_map.version[:16]}-{network_map.weather_epoch}"'
+    return _cached_response(request, network_map.geojson, "application/geo+json", etag)
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_tile(z: int, x: int, y: int, request: Request):
+    """Tesela vectorial (Mapbox Vector Tile) de la red con las capas 'lines' y 'stations'"""
+    network_map = get_network_map()
+    tile = network_map.tile(z, x, y)
+    if tile is None:
+        return Response(status_code=404)
+    etag = f'"{network_map.version[:16]}-{network_map.weather_epoch}-{z}-{x}-{y}"'
+    return _cached_response(request, lambda: tile, "application/vnd.mapbox-vector-tile", etag)
+
 @router.get("/route")
 async def get_route(origin: str, destination: str):
     """Calcular ruta entre dos estaciones"""
+    metro_system = get_metro_system()
     logger.info(f"Solicitud de ruta: {origin} -> {destination}")
     
     if not origin or not destination:
@@ -138,7 +360,12 @@ async def get_route(origin: str, destination: str):
             "message": "Origen y destino son requeridos"
         }
     
-    route = metro_system.find_route(origin, destination)
+    stations, error = _resolve_stations(origin, destination)
+    if error:
+        return {"status": "error", **error}
+    origin, destination = stations
+    
+    route = await find_route(metro_system, origin, destination)
     if route:
         logger.info(f"Ruta encontrada con {len(route['path'])} estaciones")
         return {
@@ -152,15 +379,178 @@ async def get_route(origin: str, destination: str):
         "message": "No se encontró una ruta disponible"
     }
 
+@router.get("/route/timetable")
+async def get_timetable_route(origin: str, destination: str, depart_at: Optional[str] = None,
+                              criterion: str = "earliest"):
+    """Calcular un viaje saliendo a una hora dada ('HH:MM') según el horario de las líneas"""
+    metro_system = get_metro_system()
+    logger.info(f"Solicitud de viaje con horario: {origin} -> {destination} ({depart_at}, {criterion})")
+    
+    if criterion not in TIMETABLE_CRITERIA:
+        return {
+            "status": "error",
+            "message": f"Criterio no soportado; use uno de: {', '.join(TIMETABLE_CRITERIA)}"
+        }
+    
+    if depart_at is not None:
+        from app.models.timetable import parse_clock
+        try:
+            parse_clock(depart_at)
+        except ValueError:
+            return {
+                "status": "error",
+                "message": f"Hora de salida inválida: '{depart_at}'; use el formato HH:MM (00:00 a 23:59)"
+            }
+    
+    stations, error = _resolve_stations(origin, destination)
+    if error:
+        return {"status": "error", **error}
+    origin, destination = stations
+    
+    result = await asyncio.to_thread(metro_system.find_timetable_route, origin, destination, depart_at, criterion)
+    if result:
+        return {
+            "status": "success",
+            **result
+        }
+    
+    return {
+        "status": "error",
+        "message": "No se encontró un viaje disponible a esa hora"
+    }
+
+@router.get("/route/reliability")
+async def get_route_reliability(origin: str, destination: str, samples: int = RELIABILITY_SAMPLES):
+    """
+    Confiabilidad del viaje entre dos estaciones saliendo ahora: percentiles (p50/p90/p99)
+    del tiempo y de la hora de llegada en `samples` futuros simulados del clima, y la
+    probabilidad de que la mejor ruta cambie respecto de la actual.
+    """
+    from app.services.reliability_service import estimate_route_reliability
+    metro_system = get_metro_system()
+    weather_monitoring_system = get_weather_monitoring_system()
+    logger.info(f"Solicitud de confiabilidad: {origin} -> {destination} ({samples} muestras)")
+    
+    stations, error = _resolve_stations(origin, destination)
+    if error:
+        return {"status": "error", **error}
+    origin, destination = stations
+    
+    try:
+        result = await asyncio.to_thread(
+            estimate_route_reliability, metro_system, weather_monitoring_system, origin, destination, samples
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    
+    return {
+        "status": "success",
+        **result
+    }
+
+@router.get("/matrix")
+async def get_matrix(stations: Optional[str] = None, format: str = "json", metric: str = "times"):
+    """
+    Matriz de tiempos de viaje (minutos) y transbordos entre estaciones separadas por comas
+    (toda la red, en el orden de /stations, si no se indican). Con format=npy devuelve
+    la matriz indicada en `metric` como arreglo NumPy (.npy).
+    """
+    metro_system = get_metro_system()
+    if format not in MATRIX_FORMATS or metric not in MATRIX_METRICS:
+        return {
+            "status": "error",
+            "message": f"Use format en {MATRIX_FORMATS} y metric en {MATRIX_METRICS}"
+        }
+    
+    names = [name.strip() for name in stations.split(",") if name.strip()] if stations else None
+    if names:
+        names, error = _resolve_stations(*names)
+        if error:
+            return {"status": "error", **error}
+    try:
+        matrix = await asyncio.to_thread(metro_system.travel_time_matrix, names)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    
+    if format == "npy":
+        import numpy as np
+        buf = io.BytesIO()
+        np.save(buf, matrix[metric], allow_pickle=False)
+        return Response(
+            content=buf.getvalue(),
+            media_type="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="matrix_{metric}.npy"',
+                "X-Weights-Version": str(matrix["weights_version"])
+            }
+        )
+    
+    return {
+        "status": "success",
+        "stations": matrix["stations"],
+        "times": [
+            [round(time, 2) if math.isfinite(time) else None for time in row]
+            for row in matrix["times"].tolist()
+        ],
+        "transfers": matrix["transfers"].tolist(),
+        "weights_version": matrix["weights_version"]
+    }
+
+@router.get("/nearest")
+async def get_nearest_stations(lat: float, lon: float, k: int = 1):
+    """Obtener las k estaciones más cercanas a una coordenada"""
+    metro_system = get_metro_system()
+    error = _coordinates_error((lat, lon))
+    if error:
+        return {"status": "error", "message": error}
+    k = max(1, min(k, MAX_NEAREST_STATIONS))
+    return {
+        "status": "success",
+        "stations": metro_system.nearest_stations(lat, lon, k)
+    }
+
+@router.get("/route/coordinates")
+async def get_route_between_coordinates(origin_lat: float, origin_lon: float,
+                                        destination_lat: float, destination_lon: float,
+                                        k: int = NEAREST_STATIONS_K):
+    """Calcular ruta entre dos coordenadas con tramos a pie hasta las estaciones más cercanas"""
+    metro_system = get_metro_system()
+    logger.info(f"Solicitud de ruta por coordenadas: ({origin_lat}, {origin_lon}) -> ({destination_lat}, {destination_lon})")
+    
+    error = _coordinates_error((origin_lat, origin_lon), (destination_lat, destination_lon))
+    if error:
+        return {"status": "error", "message": error}
+    
+    k = max(1, min(k, MAX_NEAREST_STATIONS))
+    route = await asyncio.to_thread(
+        metro_system.find_route_between_coordinates,
+        (origin_lat, origin_lon),
+        (destination_lat, destination_lon),
+        k
+    )
+    if route:
+        logger.info(f"Ruta encontrada con {len(route['path'])} estaciones")
+        return {
+            "status": "success",
+            "route": route
+        }
+    
+    return {
+        "status": "error",
+        "message": "No se encontró una ruta disponible"
+    }
+
 @router.get("/station/{station_name}")
 async def get_station_info(station_name: str):
     """Obtener información detallada de una estación específica"""
+    metro_system = get_metro_system()
+    weather_monitoring_system = get_weather_monitoring_system()
     # Buscar la estación en todas las líneas
     station_found = False
     station_coordinates = None
     station_lines = []
     
-    for line_name, line_info in METRO_LINES.items():
+    for line_name, line_info in metro_system.network.lines.items():
         if station_name in line_info["stations"]:
             station_found = True
             station_coordinates = line_info["stations"][station_name]
@@ -176,7 +566,7 @@ async def get_station_info(station_name: str):
         }
     
     # Obtener clima actual de la estación
-    weather = weather_monitoring_system.update_weather().get(station_name, {})
+    weather = weather_monitoring_system.current_conditions().get(station_name, {})
     
     return {
         "status": "success",
@@ -192,6 +582,7 @@ async def get_station_info(station_name: str):
 @router.get("/route/weather-impact")
 async def get_weather_impact(origin: str, destination: str):
     """Calcular el impacto del clima en una ruta específica"""
+    metro_system = get_metro_system()
     logger.info(f"Solicitud de impacto del clima en ruta: {origin} -> {destination}")
     
     if not origin or not destination:
@@ -200,6 +591,11 @@ async def get_weather_impact(origin: str, destination: str):
             "message": "Origen y destino son requeridos"
         }
     
+    stations, error = _resolve_stations(origin, destination)
+    if error:
+        return {"status": "error", **error}
+    origin, destination = stations
+    
     impact = metro_system.get_weather_impact_on_route(origin, destination)
     
     if "error" in impact:
@@ -214,21 +610,22 @@ async def get_weather_impact(origin: str, destination: str):
     }
 
 @router.post("/weather/force-update")
+@router.post("/admin/weather/tick")
 async def force_weather_update():
-    """Forzar una actualización del clima y recalcular los pesos del grafo"""
+    """
+    Forzar una actualización del clima y recalcular los pesos del grafo (administración).
+    Las demás rutas solo leen la última instantánea publicada.
+    """
+    weather_monitoring_system = get_weather_monitoring_system()
     try:
-        # Forzar actualización del clima
-        weather_monitoring_system._last_update = None  # Resetear el tiempo de última actualización
-        updated_conditions = weather_monitoring_system.update_weather()
-        
-        # Transmitir a los clientes conectados
-        if weather_monitoring_system.connected_clients:
-            await weather_monitoring_system.broadcast_weather()
+        # Forzar una actualización: pasa por el pipeline y notifica a todos los suscriptores
+        snapshot = await weather_monitoring_system.tick()
         
         return {
             "status": "success",
             "message": "Clima actualizado y pesos recalculados",
-            "stations_updated": len(updated_conditions),
+            "stations_updated": len(snapshot.conditions) if snapshot else 0,
+            "version": snapshot.version if snapshot else weather_monitoring_system.epoch,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
@@ -236,4 +633,83 @@ async def force_weather_update():
         return {
             "status": "error",
             "message": f"Error: {str(e)}"
-        } 
\ No newline at end of file
+        } 
+
+@router.get("/admin/popular-routes")
+async def get_popular_routes():
+    """Obtener los pares origen-destino más solicitados y si su ruta ya está precalculada"""
+    metro_system = get_metro_system()
+    return {
+        "status": "success",
+        "popular_routes": metro_system.popular_routes(),
+        "metadata": {
+            "weights_version": metro_system.weights_version,
+            "cached_routes": metro_system.cached_routes,
+            **coalescing_stats()
+        }
+    }
+
+
+@router.get("/admin/weather-pipeline")
+async def get_weather_pipeline():
+    """Obtener la versión actual del clima y la duración de cada suscriptor del pipeline"""
+    weather_monitoring_system = get_weather_monitoring_system()
+    return {
+        "status": "success",
+        "version": weather_monitoring_system.epoch,
+        "last_updated": weather_monitoring_system.last_update.isoformat() if weather_monitoring_system.last_update else None,
+        "subscribers": weather_monitoring_system.subscriber_stats
+    }
+
+
+@router.post("/admin/network/reload")
+async def reload_network():
+    """
+    Volver a leer la red (líneas, transbordos y tipos de transporte) de la configuración y
+    ponerla en servicio sin reiniciar: se construye en segundo plano, se reutiliza lo que
+    no cambió y se reemplaza de forma atómica sin cortar las conexiones WebSocket.
+    """
+    from app.services.network_service import reload_network as reload
+    try:
+        result = await reload()
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", **result}
+
+
+@router.get("/admin/closures")
+async def get_closures():
+    """Obtener las conexiones y estaciones cerradas"""
+    metro_system = get_metro_system()
+    return {"status": "success", **metro_system.closures()}
+
+
+def _closure_response(operation, *args):
+    try:
+        return {"status": "success", **operation(*args)}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+
+@router.post("/admin/closures/edges")
+async def close_edge(station1: str, station2: str):
+    """Cerrar la conexión entre dos estaciones"""
+    return _closure_response(get_metro_system().close_edge, station1, station2)
+
+
+@router.delete("/admin/closures/edges")
+async def reopen_edge(station1: str, station2: str):
+    """Reabrir la conexión entre dos estaciones"""
+    return _closure_response(get_metro_system().reopen_edge, station1, station2)
+
+
+@router.post("/admin/closures/stations/{station_name}")
+async def close_station(station_name: str):
+    """Cerrar una estación"""
+    return _closure_response(get_metro_system().close_station, station_name)
+
+
+@router.delete("/admin/closures/stations/{station_name}")
+async def reopen_station(station_name: str):
+    """Reabrir una estación"""
+    return _closure_response(get_metro_system().reopen_station, station_name)
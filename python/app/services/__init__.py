@@ -1,12 +1,163 @@
 """
 Módulo de servicios del Metro de Medellín.
 Contiene la lógica de negocio y servicios del sistema.
+
+Los servicios se crean de forma diferida (en el arranque de la aplicación o en
+el primer uso) para que importar el paquete no cargue networkx, numpy ni la red.
 """
 
-from app.services.weather_service import weather_monitoring_system
-from app.services.metro_service import metro_system
+import logging
+
+logger = logging.getLogger(__name__)
+
+_metro_system = None
+_weather_monitoring_system = None
+_network_map = None
+
+
+def init_services():
+    """Crea los servicios de metro y clima, los enlaza y restaura la última instantánea"""
+    global _metro_system, _weather_monitoring_system, _network_map
+    if _metro_system is not None:
+        return
+
+    from app.services.metro_service import create_metro_system
+    from app.services.weather_service import create_weather_monitoring_system
+    from app.services.snapshot_service import restore_warm_start
+    from app.services.map_service import create_network_map
+    from app.models.network_config import NetworkConfig
+    from app.config import SHARED_STATE_NAME, RECORD_PATH
+
+    # La definición de la red se lee una vez y se pasa a cada servicio que depende de ella
+    network = NetworkConfig.current()
+    metro_system = create_metro_system(network)
+    weather_monitoring_system = create_weather_monitoring_system(network)
+    if RECORD_PATH:
+        from app.services.recording_service import open_recorder
+        open_recorder(network.config_hash)
+
+    # Establecer la referencia circular después de crear ambos servicios
+    weather_monitoring_system.set_metro_system(metro_system)
+
+    # Continuar desde la última instantánea si la configuración de la red no cambió
+    restore_warm_start(metro_system, weather_monitoring_system)
+
+    # Con varios workers, uno publica el clima en memoria compartida y el resto lo lee
+    if SHARED_STATE_NAME:
+        weather_monitoring_system.attach_shared_state(SHARED_STATE_NAME)
+
+    # Clima restaurado de la instantánea
+    if weather_monitoring_system.snapshot is not None:
+        if RECORD_PATH and not weather_monitoring_system.is_shared_reader:
+            from app.services.recording_service import record_snapshot
+            record_snapshot(weather_monitoring_system.snapshot)
+        weather_monitoring_system.history.append_snapshot(weather_monitoring_system.snapshot)
+    network_map = create_network_map(weather_monitoring_system, network)
+    _subscribe_pipeline(metro_system, weather_monitoring_system, network_map)
+    # Si el productor deja de responder y este lector toma su lugar, pasa a simular y publicar
+    weather_monitoring_system.on_promoted = lambda: _subscribe_pipeline(
+        _metro_system, _weather_monitoring_system, _network_map
+    )
+
+    _metro_system = metro_system
+    _weather_monitoring_system = weather_monitoring_system
+    _network_map = network_map
+
+
+def _subscribe_pipeline(metro_system, weather_monitoring_system, network_map):
+    """
+    Registra los suscriptores del pipeline del clima, invocados una vez por actualización
+    en este orden. Los workers lectores reciben los pesos del productor y no los recalculan
+    ni guardan.
+    """
+    from app.services.snapshot_service import snapshot_saver
+    from app.config import RECORD_PATH
+
+    weather_monitoring_system.clear_subscribers()
+    is_reader = weather_monitoring_system.is_shared_reader
+    if RECORD_PATH and not is_reader:
+        from app.services.recording_service import record_snapshot
+        weather_monitoring_system.subscribe("recorder", record_snapshot)
+    if not is_reader:
+        weather_monitoring_system.subscribe("graph_weights", metro_system.apply_weather)
+    weather_monitoring_system.subscribe("route_cache", metro_system.refresh_route_cache)
+    if weather_monitoring_system.shared_state and not is_reader:
+        weather_monitoring_system.subscribe("shared_state", weather_monitoring_system.publish_shared_state)
+    if not is_reader:
+        weather_monitoring_system.subscribe("snapshot", snapshot_saver(metro_system, weather_monitoring_system))
+    weather_monitoring_system.subscribe("weather_history", weather_monitoring_system.history.append_snapshot)
+    weather_monitoring_system.subscribe("network_map", network_map.apply_snapshot)
+    weather_monitoring_system.subscribe("broadcast", weather_monitoring_system.broadcast_weather)
+
+
+def install_network(metro_system, weather_layout, network_map) -> dict:
+    """
+    Reemplaza la red en servicio por otra construida aparte (recarga de la configuración):
+    el sistema de metro, la grilla de clima y el mapa. Se ejecuta en el bucle de eventos
+    sin ceder el control, así que ninguna actualización del clima ni consulta atendida en
+    el bucle ve una mezcla de ambas redes; las consultas en curso en otros hilos terminan
+    con la red que fijaron al empezar. Las conexiones WebSocket no se interrumpen.
+    """
+    global _metro_system, _network_map
+    from app.services.snapshot_service import snapshot_saver
+
+    previous = _metro_system
+    weather_monitoring_system = _weather_monitoring_system
+    reused = metro_system.inherit_state(previous)
+    snapshot = weather_monitoring_system.apply_network(weather_layout)
+    network_map.apply_snapshot(snapshot)
+    weather_monitoring_system.set_metro_system(metro_system)
+
+    # Los suscriptores del pipeline pasan a la red nueva sin cambiar su orden
+    weather_monitoring_system.replace_subscriber("graph_weights", metro_system.apply_weather)
+    weather_monitoring_system.replace_subscriber("route_cache", metro_system.refresh_route_cache)
+    weather_monitoring_system.replace_subscriber("snapshot", snapshot_saver(metro_system, weather_monitoring_system))
+    weather_monitoring_system.replace_subscriber("network_map", network_map.apply_snapshot)
+
+    _metro_system = metro_system
+    _network_map = network_map
+    metro_system.schedule_prewarm()
+    return reused
+
+
+def shutdown_services():
+    """Libera los recursos compartidos de los servicios"""
+    from app.services.reliability_service import shutdown_reliability_pool
+    from app.services.recording_service import close_recorder
+    shutdown_reliability_pool()
+    close_recorder()
+    if _weather_monitoring_system is not None:
+        _weather_monitoring_system.detach_shared_state()
+    if _metro_system is not None:
+        _metro_system.history.close()
+
+
+def get_metro_system():
+    """Obtiene el sistema de metro, creándolo si aún no existe"""
+    if _metro_system is None:
+        init_services()
+    return _metro_system
+
+
+def get_weather_monitoring_system():
+    """Obtiene el sistema de monitoreo del clima, creándolo si aún no existe"""
+    if _weather_monitoring_system is None:
+        init_services()
+    return _weather_monitoring_system
+
+
+def get_network_map():
+    """Obtiene el mapa de la red para el cliente, creándolo si aún no existe"""
+    if _network_map is None:
+        init_services()
+    return _network_map
 
-# Establecer la referencia circular después de importar ambos servicios
-weather_monitoring_system.set_metro_system(metro_system)
 
-__all__ = ['weather_monitoring_system', 'metro_system'] 
\ No newline at end of file
+__all__ = [
+    'init_services',
+    'shutdown_services',
+    'get_metro_system',
+    'get_weather_monitoring_system',
+    'get_network_map',
+    'install_network'
+]
@@ -0,0 +1,187 @@
+"""
+Servicio que maneja las conexiones WebSocket de los clientes: envíos serializados,
+varias consultas en curso por conexión y límites de concurrencia y de tasa.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from fastapi import WebSocket
+from app.config import WS_MAX_IN_FLIGHT, WS_RATE_LIMIT, WS_RATE_BURST
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class ClientConnection:
+    """
+    Conexión WebSocket de un cliente.
+    Las consultas se procesan como tareas independientes, así que las respuestas pueden
+    llegar en otro orden (el cliente las empareja por id). Los envíos se serializan con
+    un candado porque varias tareas y las difusiones comparten el mismo socket.
+    """
+
+    def __init__(self, websocket: WebSocket, max_in_flight: int = WS_MAX_IN_FLIGHT,
+                 rate: float = WS_RATE_LIMIT, burst: int = WS_RATE_BURST):
+        self.websocket = websocket
+        # Suscripción: estaciones de interés (None = toda la red) y rutas de otros usuarios
+        self.stations: Optional[frozenset] = None
+        self.others_routes = True
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rate_limiter = TokenBucket(rate, burst)
+        self._tasks = set()
+        self._send_lock = asyncio.Lock()
+
+    async def send_json(self, message: Dict):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    def admit(self) -> Optional[Dict]:
+        """Reserva un lugar para una nueva consulta o devuelve el motivo del rechazo"""
+        if self.in_flight >= self.max_in_flight:
+            return {
+                "code": "too_many_requests_in_flight",
+                "message": f"Se permiten como máximo {self.max_in_flight} consultas en curso por conexión"
+            }
+        if not self.rate_limiter.consume():
+            return {
+                "code": "rate_limited",
+                "message": "Demasiadas consultas; intente de nuevo en unos segundos",
+                "retry_after": round(self.rate_limiter.retry_after(), 2)
+            }
+        self.in_flight += 1
+        return None
+
+    def start(self, request: Awaitable):
+        """Procesa una consulta admitida sin bloquear la lectura de nuevos mensajes"""
+        task = asyncio.create_task(self._run(request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, request: Awaitable):
+        try:
+            await request
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error al procesar consulta del websocket: {e}", exc_info=True)
+        finally:
+            self.in_flight -= 1
+
+    def cancel_pending(self):
+        """Cancela las consultas en curso al cerrarse la conexión"""
+        for task in list(self._tasks):
+            task.cancel()
+
+
+def resolve_subscription(network_lines: Dict[str, Dict], lines: Sequence[str] = (), stations: Sequence[str] = (),
+                         bbox: Optional[Sequence[float]] = None) -> Set[str]:
+    """
+    Convierte líneas, estaciones y un rectángulo [lat_min, lon_min, lat_max, lon_max]
+    en el conjunto de estaciones que cubren en las líneas de la red en servicio.
+    Lanza ValueError si algún filtro no existe.
+    """
+    coordinates = {
+        station: coords
+        for line_info in network_lines.values()
+        for station, coords in line_info["stations"].items()
+    }
+    resolved = set()
+    for line in lines:
+        if line not in network_lines:
+            raise ValueError(f"Línea '{line}' no encontrada")
+        resolved.update(network_lines[line]["stations"])
+    for station in stations:
+        if station not in coordinates:
+            raise ValueError(f"Estación '{station}' no encontrada")
+        resolved.add(station)
+    if bbox is not None:
+        if len(bbox) != 4:
+            raise ValueError("El rectángulo debe ser [lat_min, lon_min, lat_max, lon_max]")
+        lat_min, lon_min, lat_max, lon_max = (float(value) for value in bbox)
+        resolved.update(
+            station for station, (lat, lon) in coordinates.items()
+            if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+        )
+    return resolved
+
+
+class ClientRegistry:
+    """
+    Clientes conectados indexados por suscripción.
+    Los clientes sin filtros reciben toda la red; el resto queda indexado por estación,
+    de modo que una ruta o un cambio de clima solo se entrega a quienes les interesa
+    sin recorrer a todos los clientes.
+    """
+
+    def __init__(self):
+        self._clients: Set[ClientConnection] = set()
+        self._everything: Set[ClientConnection] = set()
+        self._by_station: Dict[str, Set[ClientConnection]] = {}
+
+    def __iter__(self) -> Iterator[ClientConnection]:
+        return iter(list(self._clients))
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, client) -> bool:
+        return client in self._clients
+
+    def add(self, client: ClientConnection):
+        self._clients.add(client)
+        self._index(client)
+
+    def discard(self, client: ClientConnection):
+        self._clients.discard(client)
+        self._unindex(client)
+
+    def __isub__(self, clients: Iterable[ClientConnection]) -> "ClientRegistry":
+        for client in clients:
+            self.discard(client)
+        return self
+
+    def subscribe(self, client: ClientConnection, stations: Optional[Set[str]], others_routes: bool = True):
+        """Reemplaza la suscripción de un cliente (stations=None para toda la red)"""
+        self._unindex(client)
+        client.stations = frozenset(stations) if stations is not None else None
+        client.others_routes = others_routes
+        if client in self._clients:
+            self._index(client)
+
+    def _index(self, client: ClientConnection):
+        if client.stations is None:
+            self._everything.add(client)
+            return
+        for station in client.stations:
+            self._by_station.setdefault(station, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        self._everything.discard(client)
+        for station in client.stations or ():
+            subscribers = self._by_station.get(station)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._by_station[station]
+
+    def route_recipients(self, path: Sequence[str], requester: Optional[ClientConnection] = None) -> Set[ClientConnection]:
+        """Clientes que deben recibir una ruta: quien la pidió y los suscritos a sus estaciones"""
+        candidates = set(self._everything)
+        for station in path:
+            candidates.update(self._by_station.get(station, ()))
+        recipients = {client for client in candidates if client.others_routes}
+        if requester is not None and requester in self._clients:
+            recipients.add(requester)
+        return recipients
+
+    def weather_recipients(self, conditions: Dict[str, Dict]) -> List[Tuple[ClientConnection, Dict[str, Dict]]]:
+        """Pares (cliente, clima de sus estaciones); los clientes sin filtros reciben todo"""
+        deliveries = [(client, conditions) for client in self._everything]
+        partial: Dict[ClientConnection, Dict[str, Dict]] = {}
+        for station, subscribers in self._by_station.items():
+            if station in conditions:
+                for client in subscribers:
+                    partial.setdefault(client, {})[station] = conditions[station]
+        deliveries.extend(partial.items())
+        return deliveries
@@ -0,0 +1,21 @@
+"""
+Servicio que prepara el mapa de la red (GeoJSON y teselas vectoriales) para el cliente.
+"""
+
+from app.models.network_config import NetworkConfig
+from app.models.network_map import NetworkMap
+import logging
+
+logger = logging.getLogger(__name__)
+
+def build_network_map(network: NetworkConfig) -> NetworkMap:
+    """Geometría del mapa de una versión de la red, todavía sin clima"""
+    return NetworkMap(network.lines, network.transfers, network.transport_types, network.config_hash)
+
+def create_network_map(weather_monitoring_system, network: NetworkConfig) -> NetworkMap:
+    """Crea el mapa de la red en servicio con el clima ya publicado"""
+    network_map = build_network_map(network)
+    snapshot = weather_monitoring_system.snapshot
+    if snapshot is not None:
+        network_map.apply_snapshot(snapshot)
+    return network_map
@@ -3,19 +3,24 @@ Servicio que maneja las operaciones del sistema de metro.
 """
 
 from app.models.metro import MetroSystem
+from app.models.network_config import NetworkConfig
+from app.services.snapshot_service import get_warm_start
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Crear una instancia única del sistema de metro
-try:
-    metro_system = MetroSystem()
-    logger.info("Sistema de metro inicializado correctamente")
-except KeyError as ke:
-    logger.error(f"Error de configuración en el sistema de metro: falta el campo '{ke}'", exc_info=True)
-    raise
-except Exception as e:
-    logger.error(f"Error al inicializar el sistema de metro: {e}", exc_info=True)
-    raise
+def create_metro_system(network: NetworkConfig) -> MetroSystem:
+    """Crea la instancia única del sistema de metro para la red indicada"""
+    try:
+        # Con una instantánea válida la red ya fue verificada en una ejecución anterior
+        metro_system = MetroSystem(network, verify_connectivity=get_warm_start(network.config_hash) is None)
+        logger.info("Sistema de metro inicializado correctamente")
+        return metro_system
+    except KeyError as ke:
+        logger.error(f"Error de configuración en el sistema de metro: falta el campo '{ke}'", exc_info=True)
+        raise
+    except Exception as e:
+        logger.error(f"Error al inicializar el sistema de metro: {e}", exc_info=True)
+        raise
 
-# La referencia circular se establecerá en el archivo __init__.py del paquete services 
\ No newline at end of file
+# La referencia circular se establece en init_services() del paquete services 
\ No newline at end of file
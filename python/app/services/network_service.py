@@ -0,0 +1,77 @@
+"""
+Servicio de recarga en caliente de la red: vuelve a leer METRO_LINES, TRANSFER_CONNECTIONS,
+LINE_TRANSPORT_TYPES y LINE_SERVICE de app/config.py, construye en segundo plano el grafo, el horario,
+los índices, la grilla de clima y el mapa de la red nueva y la pone en servicio con un
+reemplazo atómico, sin reiniciar el proceso ni cortar las conexiones WebSocket.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict
+from app.models.metro import MetroSystem
+from app.models.network_config import NetworkConfig, diff_networks, load_network_config
+from app.services.map_service import build_network_map
+
+logger = logging.getLogger(__name__)
+
+# Una sola recarga a la vez
+_reload_lock = asyncio.Lock()
+
+
+def _build_network(metro_system, weather_monitoring_system, network: NetworkConfig):
+    """Construye aparte todo lo que depende de la red, sin tocar la red en servicio"""
+    new_metro_system = MetroSystem(network=network, previous=metro_system)
+    weather_layout = weather_monitoring_system.prepare_network(network)
+    network_map = build_network_map(network)
+    return new_metro_system, weather_layout, network_map
+
+
+async def reload_network() -> Dict:
+    """
+    Recarga la definición de la red y la reemplaza si cambió. Lanza ValueError si la
+    configuración no se puede leer o si el proceso comparte el clima con otros workers
+    (la memoria compartida tiene el tamaño de la red con la que se creó).
+    """
+    from app.services import get_metro_system, get_weather_monitoring_system, install_network
+
+    async with _reload_lock:
+        metro_system = get_metro_system()
+        weather_monitoring_system = get_weather_monitoring_system()
+        if weather_monitoring_system.shared_state is not None:
+            raise ValueError("La recarga de la red no está disponible con estado compartido entre workers; reinícielos")
+
+        start = time.perf_counter()
+        network = await asyncio.to_thread(load_network_config)
+        if network.same_network(metro_system.network):
+            logger.info("Recarga de la red: la configuración no cambió")
+            return {"changed": False, "network_version": network.config_hash[:16]}
+
+        diff = diff_networks(metro_system.network, network)
+        new_metro_system, weather_layout, network_map = await asyncio.to_thread(
+            _build_network, metro_system, weather_monitoring_system, network
+        )
+        built = time.perf_counter()
+
+        # Reemplazo atómico: sin await desde aquí hasta el final
+        reused = install_network(new_metro_system, weather_layout, network_map)
+        swapped = time.perf_counter()
+
+        logger.info(
+            f"Red recargada ({network.config_hash[:16]}): "
+            f"{new_metro_system.metro_graph.number_of_nodes()} estaciones, "
+            f"{new_metro_system.metro_graph.number_of_edges()} conexiones; "
+            f"construcción {(built - start) * 1000:.1f} ms, reemplazo {(swapped - built) * 1000:.1f} ms"
+        )
+        return {
+            "changed": True,
+            "network_version": network.config_hash[:16],
+            "stations": new_metro_system.metro_graph.number_of_nodes(),
+            "connections": new_metro_system.metro_graph.number_of_edges(),
+            "weights_version": new_metro_system.weights_version,
+            "diff": diff,
+            **reused,
+            "station_indexes_reused": new_metro_system.station_search is metro_system.station_search,
+            "build_ms": round((built - start) * 1000, 1),
+            "swap_ms": round((swapped - built) * 1000, 1)
+        }
@@ -0,0 +1,61 @@
+"""
+Servicio de grabación: anexa las actualizaciones del clima y las consultas de rutas
+(HTTP y WebSocket) al registro binario configurado en RECORD_PATH.
+Si la grabación no está activada, las funciones no hacen nada.
+"""
+
+import os
+from typing import Optional
+from app.config import RECORD_PATH
+from app.utils.recording import HTTP, WEATHER, WEBSOCKET, RecordWriter, encode_json, encode_weather
+import logging
+
+logger = logging.getLogger(__name__)
+
+_writer: Optional[RecordWriter] = None
+
+
+def open_recorder(config_hash: str):
+    """Abre el registro configurado, identificado por el hash de la configuración de la red"""
+    global _writer
+    if _writer is None and RECORD_PATH:
+        _writer = RecordWriter(RECORD_PATH, config_hash)
+        logger.info(f"Grabando el clima y las consultas en {RECORD_PATH}")
+
+
+def get_recorder() -> Optional[RecordWriter]:
+    """Grabador del registro configurado (None si no se abrió)"""
+    return _writer
+
+
+def record_snapshot(snapshot):
+    """Suscriptor del pipeline del clima: graba cada instantánea publicada"""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.write(
+            WEATHER,
+            encode_weather(snapshot.version, snapshot.states, snapshot.intensity, snapshot.readings),
+            snapshot.timestamp.timestamp()
+        )
+
+
+def record_http(method: str, path: str, query: str):
+    """Graba una consulta HTTP"""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.write(HTTP, encode_json({"method": method, "path": path, "query": query}))
+
+
+def record_websocket(connection, message: dict):
+    """Graba un mensaje de un cliente WebSocket junto con la conexión que lo envió"""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.write(WEBSOCKET, encode_json({"connection": f"{os.getpid()}-{id(connection)}", "message": message}))
+
+
+def close_recorder():
+    """Cierra el registro de grabación, si se abrió"""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
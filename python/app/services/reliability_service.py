@@ -0,0 +1,171 @@
+"""
+Servicio de confiabilidad de rutas: percentiles del tiempo de llegada y probabilidad
+de que cambie la ruta según futuros del clima simulados por Monte Carlo.
+Las simulaciones grandes se reparten por bloques en un grupo de procesos.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+import multiprocessing
+import numpy as np
+from app.config import (
+    LOCAL_UTC_OFFSET,
+    MAX_RELIABILITY_SAMPLES,
+    RELIABILITY_CHUNK_SIZE,
+    RELIABILITY_PARALLEL_THRESHOLD,
+    RELIABILITY_WORKERS,
+    WEATHER_UPDATE_INTERVAL
+)
+from app.models.metro import LINE_CHANGE_TIME
+from app.models.reliability import ReliabilityModel, simulate
+from app.models.timetable import format_clock
+from app.models.weather_simulator import INTENSITY_RANGE
+from app.utils.routing import csr_shortest_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+MAX_ALTERNATIVE_PATHS = 3
+
+_process_pool = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Grupo de procesos para las simulaciones grandes (se crea en el primer uso)"""
+    global _process_pool
+    if _process_pool is None:
+        # spawn: los procesos no heredan los hilos ni los candados del servidor
+        _process_pool = ProcessPoolExecutor(
+            max_workers=RELIABILITY_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_reliability_pool():
+    """Detiene el grupo de procesos de las simulaciones, si se creó"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+def _line_changes(path, lines, edge_lookup) -> int:
+    """Cambios de línea a lo largo de un camino, contados como en MetroSystem._build_route"""
+    path_lines = [lines[edge_lookup[(a, b)]] for a, b in zip(path, path[1:])]
+    return sum(1 for a, b in zip(path_lines, path_lines[1:]) if a != b)
+
+
+def estimate_route_reliability(metro_system, weather_monitoring_system, origin: str,
+                               destination: str, samples: int) -> dict:
+    """
+    Simula `samples` futuros del clima para el viaje entre dos estaciones saliendo ahora.
+    El clima de cada muestra se toma a mitad del viaje (según el tiempo con los pesos
+    actuales) de la cadena de Markov de WEATHER_STATES, partiendo del estado actual.
+    Devuelve los percentiles del tiempo y de la hora de llegada, la probabilidad de que
+    la mejor ruta no sea la actual y las rutas alternativas más frecuentes.
+    """
+    for station in (origin, destination):
+        if station not in metro_system.metro_graph:
+            raise ValueError(f"Estación '{station}' no encontrada")
+    if not 1 <= samples <= MAX_RELIABILITY_SAMPLES:
+        raise ValueError(f"El número de muestras debe estar entre 1 y {MAX_RELIABILITY_SAMPLES}")
+
+    network = metro_system.edge_cost_model()
+    nodes = network["nodes"]
+    node_index = {station: i for i, station in enumerate(nodes)}
+    source, target = node_index[origin], node_index[destination]
+    weights = metro_system.pin_weights()
+
+    # Ruta y tiempo con los pesos actuales
+    indptr, neighbors, edge_ids = network["indptr"].tolist(), network["neighbors"].tolist(), network["edge_ids"].tolist()
+    current_cost, current_path = csr_shortest_path(indptr, neighbors, edge_ids, weights.values.tolist(), source, target)
+    if current_path is None:
+        raise ValueError(f"No existe ruta entre {origin} y {destination}")
+
+    endpoints = network["endpoints"]
+    edge_lookup = {}
+    for eid, (a, b) in enumerate(endpoints.tolist()):
+        edge_lookup[(a, b)] = edge_lookup[(b, a)] = eid
+    lines = network["lines"]
+
+    steps = max(1, round(current_cost * 60 / 2 / WEATHER_UPDATE_INTERVAL))
+    station_cells = weather_monitoring_system.station_cells(nodes)
+    model = ReliabilityModel(
+        indptr=network["indptr"],
+        neighbors=network["neighbors"],
+        edge_ids=network["edge_ids"],
+        endpoint_cells=station_cells[endpoints],
+        base_time=network["base_time"],
+        penalties=network["penalties"],
+        closed=np.isinf(weights.values),
+        forecast=weather_monitoring_system.forecast(steps),
+        intensity_range=INTENSITY_RANGE,
+        sunny=weather_monitoring_system.simulator.state_index["sunny"],
+        source=source,
+        target=target
+    )
+
+    # Bloques con semillas independientes; en paralelo solo si compensa crear los procesos
+    seeds = np.random.SeedSequence()
+    if samples >= RELIABILITY_PARALLEL_THRESHOLD and RELIABILITY_WORKERS > 1:
+        chunks = [min(RELIABILITY_CHUNK_SIZE, samples - start) for start in range(0, samples, RELIABILITY_CHUNK_SIZE)]
+        pool = _get_process_pool()
+        futures = [pool.submit(simulate, model, size, seed) for size, seed in zip(chunks, seeds.spawn(len(chunks)))]
+        results = [future.result() for future in futures]
+        logger.info(f"Simulación de confiabilidad repartida en {len(chunks)} bloques")
+    else:
+        results = [simulate(model, samples, seeds)]
+    costs = np.concatenate([costs for costs, _ in results])
+    paths = [path for _, chunk_paths in results for path in chunk_paths]
+
+    # Tiempo total como en /route: tiempo de las aristas más el de cada cambio de línea
+    changes = {
+        path: _line_changes(path, lines, edge_lookup)
+        for path in set(paths) if path is not None
+    }
+    times = np.array([
+        cost + LINE_CHANGE_TIME * changes[path]
+        for cost, path in zip(costs.tolist(), paths) if path is not None
+    ])
+    current_path = tuple(current_path)
+    current_time = current_cost + LINE_CHANGE_TIME * _line_changes(current_path, lines, edge_lookup)
+
+    now = datetime.now(timezone(timedelta(hours=LOCAL_UTC_OFFSET)))
+    departure = now.hour * 60.0 + now.minute + now.second / 60.0
+    reachable = len(times)
+    travel_time = {}
+    arrival = {}
+    if reachable:
+        for p, value in zip(PERCENTILES, np.percentile(times, PERCENTILES).tolist()):
+            travel_time[f"p{p}"] = round(value, 1)
+            arrival[f"p{p}"] = format_clock(departure + value)
+        travel_time["mean"] = round(float(times.mean()), 1)
+
+    frequencies = Counter(path for path in paths if path is not None)
+    alternatives = [
+        {"path": [nodes[i] for i in path], "probability": round(count / samples, 4)}
+        for path, count in frequencies.most_common()
+        if path != current_path
+    ][:MAX_ALTERNATIVE_PATHS]
+    logger.info(
+        f"Confiabilidad {origin} -> {destination}: {samples} muestras a {steps} pasos del clima, "
+        f"p90 {travel_time.get('p90')} min"
+    )
+    return {
+        "origin": origin,
+        "destination": destination,
+        "samples": samples,
+        "depart_at": format_clock(departure),
+        "forecast_steps": steps,
+        "path": [nodes[i] for i in current_path],
+        "estimated_time": round(current_time, 1),
+        "travel_time": travel_time,
+        "arrival": arrival,
+        "path_change_probability": round(1.0 - frequencies[current_path] / samples, 4),
+        "no_route_probability": round(1.0 - reachable / samples, 4),
+        "alternatives": alternatives,
+        "weights_version": weights.version
+    }
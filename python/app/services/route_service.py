@@ -0,0 +1,40 @@
+"""
+Servicio de cálculo de rutas para las consultas HTTP y WebSocket.
+Las consultas idénticas que llegan mientras otra está en curso (mismo origen, destino
+y versión de los pesos) comparten su cálculo en lugar de repetirlo.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_route_flights = SingleFlight()
+
+
+async def find_route(metro_system, origin: str, destination: str) -> Optional[Dict]:
+    """
+    Calcula la ruta en un hilo aparte. La clave incluye la versión de los pesos, que
+    cambia con cada época del clima y con cada cierre: una consulta nunca recibe una
+    ruta calculada con otro clima. Las consultas agrupadas cuentan igual en la
+    popularidad de la ruta.
+    """
+    key = (origin, destination, metro_system.weights_version)
+    route, shared = await _route_flights.run(
+        key, lambda: asyncio.to_thread(metro_system.find_route, origin, destination)
+    )
+    if shared:
+        metro_system.popularity.add((origin, destination))
+        logger.debug(f"Consulta agrupada con el cálculo en curso: {origin} -> {destination}")
+    return route
+
+
+def coalescing_stats() -> Dict[str, int]:
+    """Cálculos de rutas ejecutados, consultas agrupadas y cálculos en curso"""
+    return {
+        "route_computations": _route_flights.executions,
+        "coalesced_requests": _route_flights.coalesced,
+        "in_flight_routes": _route_flights.in_flight
+    }
@@ -0,0 +1,62 @@
+"""
+Servicio de instantáneas para arranques en caliente.
+Guarda periódicamente el estado del clima, los pesos del grafo y la época,
+y los restaura al iniciar si la configuración de la red no cambió.
+"""
+
+from typing import Dict, Optional
+import logging
+import numpy as np
+from app.config import SNAPSHOT_PATH, SNAPSHOT_INTERVAL
+from app.utils.snapshot import save_snapshot, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+_warm_start: Optional[Dict[str, np.ndarray]] = None
+_warm_start_loaded = False
+
+
+def get_warm_start(config_hash: str) -> Optional[Dict[str, np.ndarray]]:
+    """Obtiene (una sola vez) la instantánea válida para la configuración de la red indicada, si existe"""
+    global _warm_start, _warm_start_loaded
+    if not _warm_start_loaded:
+        _warm_start = load_snapshot(SNAPSHOT_PATH, config_hash)
+        _warm_start_loaded = True
+    return _warm_start
+
+
+def restore_warm_start(metro_system, weather_system) -> bool:
+    """Restaura el clima y los pesos del grafo desde la instantánea"""
+    snapshot = get_warm_start(metro_system.network.config_hash)
+    if snapshot is None:
+        return False
+    try:
+        weather_snapshot = weather_system.restore_state(snapshot)
+        metro_system.restore_edge_weights(snapshot["edge_weights"], weather_snapshot.conditions, reset_closures=True)
+        logger.info(f"Arranque en caliente desde {SNAPSHOT_PATH} (época {weather_system.epoch})")
+        return True
+    except Exception as e:
+        logger.warning(f"No se pudo restaurar la instantánea: {e}", exc_info=True)
+        return False
+
+
+def save_state(metro_system, weather_system):
+    """Guarda el estado actual del clima y los pesos del grafo"""
+    try:
+        save_snapshot(
+            SNAPSHOT_PATH,
+            metro_system.network.config_hash,
+            edge_weights=metro_system.edge_weights(),
+            **weather_system.export_state()
+        )
+        logger.debug(f"Instantánea guardada en {SNAPSHOT_PATH} (época {weather_system.epoch})")
+    except Exception as e:
+        logger.error(f"Error al guardar la instantánea: {e}", exc_info=True)
+
+
+def snapshot_saver(metro_system, weather_system):
+    """Suscriptor del pipeline del clima que guarda una instantánea cada SNAPSHOT_INTERVAL versiones"""
+    def save_periodically(snapshot):
+        if snapshot.version % SNAPSHOT_INTERVAL == 0:
+            save_state(metro_system, weather_system)
+    return save_periodically
@@ -1,101 +1,122 @@
-from typing import Dict
+from typing import Optional
 import asyncio
 import logging
 from datetime import datetime, timezone
-from app.models.weather_monitoring import WeatherMonitoringSystem as BaseWeatherMonitoringSystem, WeatherStation
+from app.models.weather_monitoring import WeatherMonitoringSystem as BaseWeatherMonitoringSystem
+from app.models.network_config import NetworkConfig
+from app.models.weather_snapshot import WeatherSnapshot
 from app.config import (
     WEATHER_UPDATE_INTERVAL, 
-    WEATHER_STATES, 
-    METRO_LINES,
-    WEATHER_SPEED_FACTORS
+    SHARED_STATE_POLL_INTERVAL
 )
-import random
+from app.utils.shared_state import SharedNetworkState
+from app.services.connection_service import ClientRegistry
 
 logger = logging.getLogger(__name__)
 
 class WeatherMonitoringSystem(BaseWeatherMonitoringSystem):
     """Extiende la clase base con funcionalidades específicas del servicio"""
     
-    def __init__(self):
-        super().__init__()
-        self.connected_clients = set()
-        self._previous_weather = {}  # Para rastrear cambios en el clima
+    def __init__(self, network: NetworkConfig):
+        super().__init__(network)
+        self.connected_clients = ClientRegistry()
+        self.shared_state = None  # Estado compartido entre workers (opcional)
+        self._shared_version = -1
+        self.on_promoted = None  # Se invoca cuando este lector pasa a ser el productor
 
-    def get_all_stations(self) -> Dict[str, list]:
-        """Obtiene todas las estaciones y sus coordenadas de METRO_LINES"""
-        all_stations = {}
-        for line_info in METRO_LINES.values():
-            all_stations.update(line_info["stations"])
-        return all_stations
+    def attach_shared_state(self, name: str):
+        """
+        Se une al estado compartido entre workers.
+        El productor publica el clima y los pesos; los demás workers solo los leen.
+        """
+        self.shared_state = SharedNetworkState.attach(
+            name,
+            n_cells=self.simulator.size,
+            n_edges=self.metro_system.metro_graph.number_of_edges()
+        )
+        if self.shared_state.is_producer:
+            if self.snapshot:
+                self.publish_shared_state(self.snapshot)
+        else:
+            self.sync_from_shared_state()
 
-    def initialize_stations(self):
-        stations_coords = self.get_all_stations()
-        for station_name, coords in stations_coords.items():
-            station_id = f"MDE-{abs(hash(station_name)) % 1000:03d}"
-            self.stations[station_name] = WeatherStation(
-                station_id=station_id,
-                location=coords
-            )
+    def detach_shared_state(self):
+        if self.shared_state:
+            self.shared_state.close()
+            self.shared_state = None
 
-    def update_weather(self) -> Dict[str, Dict]:
-        current_time = datetime.now(timezone.utc)
-        if (self._last_update and 
-            (current_time - self._last_update).total_seconds() < WEATHER_UPDATE_INTERVAL):
-            return self._cache
+    @property
+    def is_shared_reader(self) -> bool:
+        """Indica si este proceso lee el clima de otro productor en lugar de simularlo"""
+        return self.shared_state is not None and not self.shared_state.is_producer
 
-        updated_conditions = {}
-        for station_name, station in self.stations.items():
-            current = station.weather_data.get("type", "sunny")
-            weather_state = WEATHER_STATES[current]
-            
-            # Determinar siguiente estado del clima
-            transitions = weather_state["transitions"]
-            next_state = random.choices(
-                list(transitions.keys()),
-                weights=list(transitions.values())
-            )[0]
-            
-            new_state = WEATHER_STATES[next_state]
-            readings = station.generate_readings(new_state)
-            
-            station.weather_data = {
-                "type": next_state,
-                "intensity": random.uniform(0.8, 1.0),
-                "readings": readings
-            }
-            station.last_updated = current_time
-            
-            updated_conditions[station_name] = {
-                "station_id": station.station_id,
-                "type": next_state,
-                "name": new_state["name"],
-                "icon": new_state["icon"],
-                "intensity": station.weather_data["intensity"],
-                "location": station.location,
-                "readings": readings,
-                "last_updated": current_time.isoformat(),
-                "status": station.status
-            }
+    def publish_shared_state(self, snapshot: WeatherSnapshot):
+        """
+        Suscriptor del pipeline (solo el productor): publica la instantánea
+        y los pesos del grafo en la memoria compartida.
+        """
+        self.shared_state.publish(
+            epoch=snapshot.version,
+            last_update=snapshot.timestamp.timestamp(),
+            states=snapshot.states,
+            intensity=snapshot.intensity,
+            readings=snapshot.readings,
+            edge_weights=self.metro_system.edge_weights()
+        )
+
+    def sync_from_shared_state(self) -> Optional[WeatherSnapshot]:
+        """Aplica la última publicación del productor; devuelve su instantánea si era nueva"""
+        state = self.shared_state.read(self._shared_version)
+        if state is None:
+            return None
+
+        snapshot = self.restore_state({
+            "weather_states": state["states"],
+            "weather_intensity": state["intensity"],
+            "weather_readings": state["readings"],
+            "epoch": state["epoch"],
+            "last_update": state["last_update"]
+        })
+        self.metro_system.restore_edge_weights(state["edge_weights"], snapshot.conditions)
+        self._shared_version = state["version"]
+        return snapshot
 
-        self._cache = updated_conditions
-        self._last_update = current_time
-        return updated_conditions
+    async def tick(self) -> Optional[WeatherSnapshot]:
+        """
+        Genera una actualización del clima y la entrega a los suscriptores.
+        Los workers lectores no simulan: entregan la última publicación del productor, si es nueva.
+        Si el productor dejó de responder, un lector toma su lugar y continúa desde su último estado.
+        """
+        if self.is_shared_reader:
+            if self.shared_state.producer_alive() or not self.shared_state.take_over():
+                snapshot = self.sync_from_shared_state()
+                if snapshot is not None:
+                    await self.notify_subscribers(snapshot)
+                return snapshot
+            self.sync_from_shared_state()
+            if self.on_promoted is not None:
+                self.on_promoted()
+        if self.shared_state is not None:
+            self.shared_state.heartbeat()
+        return await super().tick()
 
-    async def broadcast_weather(self):
-        """Envía actualizaciones del clima a todos los clientes conectados"""
+    async def broadcast_weather(self, snapshot: Optional[WeatherSnapshot] = None):
+        """Envía actualizaciones del clima a los clientes conectados (solo sus estaciones suscritas)"""
         if self.connected_clients:
-            message = {
-                "type": "weather_update",
-                "weather_conditions": self.update_weather(),
-                "metadata": {
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "stations_reporting": len(self.stations),
-                    "system_status": "operational"
-                }
+            conditions = snapshot.conditions if snapshot else self.current_conditions()
+            metadata = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "stations_reporting": len(self.stations),
+                "system_status": "operational"
             }
             
             disconnected_clients = set()
-            for client in self.connected_clients:
+            for client, client_conditions in self.connected_clients.weather_recipients(conditions):
+                message = {
+                    "type": "weather_update",
+                    "weather_conditions": client_conditions,
+                    "metadata": metadata
+                }
                 try:
                     await client.send_json(message)
                 except Exception as e:
@@ -105,41 +126,18 @@ class WeatherMonitoringSystem(BaseWeatherMonitoringSystem):
             self.connected_clients -= disconnected_clients
 
     async def update_weather_periodically(self):
-        """Actualiza y transmite el clima periódicamente"""
+        """
+        Actualiza el clima periódicamente; los suscriptores se encargan de aplicarlo y transmitirlo.
+        Es, junto con la actualización forzada de administración, el único lugar donde se genera clima.
+        """
         while True:
             try:
-                # Actualizar el clima
-                updated_conditions = self.update_weather()
-                
-                # Registrar cambios significativos en el clima
-                if self.metro_system:
-                    significant_changes = []
-                    for station_name, weather in updated_conditions.items():
-                        if station_name in self._previous_weather:
-                            prev_type = self._previous_weather[station_name].get('type')
-                            curr_type = weather.get('type')
-                            if prev_type != curr_type:
-                                significant_changes.append({
-                                    'station': station_name,
-                                    'from': prev_type,
-                                    'to': curr_type,
-                                    'impact': f"{round((1 - WEATHER_SPEED_FACTORS.get(curr_type, 1.0)) * 100)}%"
-                                })
-                    
-                    if significant_changes:
-                        logger.info(f"Cambios significativos en el clima: {len(significant_changes)} estaciones")
-                        for change in significant_changes:
-                            logger.info(f"Estación {change['station']}: {change['from']} → {change['to']} (impacto: {change['impact']})")
-                
-                # Guardar el estado actual para la próxima comparación
-                self._previous_weather = {k: v.copy() if isinstance(v, dict) else v for k, v in updated_conditions.items()}
-                
-                # Transmitir las actualizaciones a los clientes
-                await self.broadcast_weather()
-                
-                await asyncio.sleep(WEATHER_UPDATE_INTERVAL)
+                await asyncio.sleep(SHARED_STATE_POLL_INTERVAL if self.is_shared_reader else WEATHER_UPDATE_INTERVAL)
+                await self.tick()
             except Exception as e:
                 logger.error(f"Error en actualización periódica del clima: {e}", exc_info=True)
                 await asyncio.sleep(1)
 
-weather_monitoring_system = WeatherMonitoringSystem() 
\ No newline at end of file
+def create_weather_monitoring_system(network: NetworkConfig) -> WeatherMonitoringSystem:
+    """Crea la instancia única del sistema de monitoreo del clima para las estaciones de la red"""
+    return WeatherMonitoringSystem(network)
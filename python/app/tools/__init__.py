@@ -0,0 +1,3 @@
+"""
+Herramientas de línea de comandos que usan los modelos sin levantar el servidor.
+"""
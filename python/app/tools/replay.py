@@ -0,0 +1,202 @@
+"""
+Reproducción de un registro grabado con METRO_RECORD_PATH.
+
+Publica cada actualización del clima grabada en el pipeline del clima (pesos del grafo,
+caché de rutas, mapa, difusión) y envía cada consulta grabada a la API, por HTTP o por
+WebSocket, en el orden original y a la velocidad original o acelerada. El clima no se
+simula y el generador aleatorio se fija con --seed, y antes de cada registro se espera
+a que terminen los precálculos de rutas en segundo plano: dos reproducciones del mismo
+registro con el mismo código producen los mismos caminos.
+
+Uso (desde el directorio python/):
+    python -m app.tools.replay grabacion.bin --speed 0 --results actual.jsonl
+    python -m app.tools.replay grabacion.bin --speed 0 --compare actual.jsonl
+Con --speed 0 los registros se reproducen sin esperas; con --speed 10, diez veces más rápido.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+KIND_NAMES = {1: "weather", 2: "http", 3: "websocket"}
+
+
+def _isolate_config(workdir: str):
+    """
+    Evita que la reproducción toque el estado de producción: sin instantáneas compartidas,
+    registro de rutas, memoria compartida ni grabación. Se aplica antes de importar la
+    aplicación, que lee estos valores al importarse o al crear los servicios.
+    """
+    config.SNAPSHOT_PATH = os.path.join(workdir, "snapshot.npz")
+    config.ROUTE_LOG_PATH = ""
+    config.SHARED_STATE_NAME = ""
+    config.RECORD_PATH = ""
+
+
+def _signature(body) -> Optional[object]:
+    """Parte determinista de una respuesta para comparar reproducciones: el camino o el estado"""
+    if not isinstance(body, dict):
+        return None
+    for candidate in (body, body.get("route"), body.get("journey"), (body.get("data") or {}).get("new_route")):
+        if isinstance(candidate, dict) and "path" in candidate:
+            return candidate["path"]
+    return body.get("status") or body.get("type")
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def replay(path: str, speed: float, seed: int) -> List[Dict]:
+    """Reproduce el registro y devuelve el resultado de cada registro en orden"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services import init_services, shutdown_services, get_metro_system, get_weather_monitoring_system
+    from app.utils.recording import HTTP, WEATHER, WEBSOCKET, decode_weather, read_header, read_records
+
+    _, config_hash = read_header(path)
+
+    # La reproducción controla el clima: se crean los servicios sin la tarea periódica
+    @asynccontextmanager
+    async def replay_lifespan(_):
+        init_services()
+        yield
+        shutdown_services()
+
+    app.router.lifespan_context = replay_lifespan
+    random.seed(seed)
+    results = []
+    sockets = {}
+    with TestClient(app) as client:
+        metro_system = get_metro_system()
+        weather_monitoring_system = get_weather_monitoring_system()
+        if config_hash != metro_system.network.config_hash:
+            logger.warning("El registro se grabó con otra configuración de la red; los resultados pueden diferir")
+        first_timestamp = None
+        start = time.perf_counter()
+        for index, (kind, timestamp, payload) in enumerate(read_records(path)):
+            if first_timestamp is None:
+                first_timestamp = timestamp
+            if speed > 0:
+                delay = (timestamp - first_timestamp) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            metro_system.wait_for_background_work()
+            began = time.perf_counter()
+            if kind == WEATHER:
+                weather = decode_weather(payload)
+                snapshot = weather_monitoring_system.restore_state({
+                    "weather_states": weather["states"],
+                    "weather_intensity": weather["intensity"],
+                    "weather_readings": weather["readings"],
+                    "epoch": weather["version"],
+                    "last_update": timestamp
+                })
+                client.portal.call(weather_monitoring_system.notify_subscribers, snapshot)
+                target, signature = f"version {weather['version']}", None
+            elif kind == HTTP:
+                request = json.loads(payload)
+                target = f"{request['path']}?{request['query']}" if request["query"] else request["path"]
+                response = client.request(request["method"], target)
+                try:
+                    signature = _signature(response.json())
+                except ValueError:
+                    signature = response.status_code
+            elif kind == WEBSOCKET:
+                request = json.loads(payload)
+                websocket = sockets.get(request["connection"])
+                if websocket is None:
+                    websocket = client.websocket_connect("/ws").__enter__()
+                    websocket.receive_json()  # Datos iniciales
+                    sockets[request["connection"]] = websocket
+                # Id propio para reconocer la respuesta entre las difusiones a la conexión
+                message = {**request["message"], "id": f"replay-{index}"}
+                websocket.send_json(message)
+                while True:
+                    reply = websocket.receive_json()
+                    if reply.get("id") == message["id"]:
+                        break
+                target = f"{request['message'].get('origin')} -> {request['message'].get('destination')}"
+                signature = _signature(reply)
+            else:
+                logger.warning(f"Registro de tipo desconocido {kind}; se omite")
+                continue
+
+            results.append({
+                "index": index,
+                "kind": KIND_NAMES[kind],
+                "target": target,
+                "ms": round((time.perf_counter() - began) * 1000, 3),
+                "signature": signature
+            })
+
+        for websocket in sockets.values():
+            websocket.close()
+            websocket.__exit__(None, None, None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduce un registro de clima y consultas grabado")
+    parser.add_argument("recording", help="Registro grabado con METRO_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Factor de velocidad respecto de la grabación (0 = sin esperas)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador aleatorio")
+    parser.add_argument("--results", help="Guarda el resultado de cada registro (JSON por línea)")
+    parser.add_argument("--compare", help="Compara con los resultados de una reproducción anterior")
+    args = parser.parse_args(argv)
+    if args.speed < 0:
+        parser.error("--speed no puede ser negativo")
+
+    logging.basicConfig(level=logging.WARNING)
+    _isolate_config(tempfile.mkdtemp(prefix="metro-replay-"))
+    results = replay(args.recording, args.speed, args.seed)
+
+    by_kind: Dict[str, List[float]] = {}
+    for result in results:
+        by_kind.setdefault(result["kind"], []).append(result["ms"])
+    print(f"{len(results)} registros reproducidos")
+    for kind, samples in by_kind.items():
+        print(f"{kind:10s} {len(samples):6d}  mediana {statistics.median(samples):8.2f} ms  "
+              f"p95 {_percentile(samples, 95):8.2f} ms  max {max(samples):8.2f} ms")
+
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = {entry["index"]: entry for entry in map(json.loads, f)}
+        differences = [
+            result for result in results
+            if result["index"] in previous and previous[result["index"]]["signature"] != result["signature"]
+        ]
+        missing = len(set(previous) - {result["index"] for result in results})
+        print(f"Comparación con {args.compare}: {len(differences)} respuestas distintas, {missing} registros faltantes")
+        for result in differences[:10]:
+            print(f"  #{result['index']} {result['kind']} {result['target']}")
+        for kind, samples in by_kind.items():
+            before = [entry["ms"] for entry in previous.values() if entry["kind"] == kind]
+            if before:
+                print(f"  {kind:10s} mediana {statistics.median(before):8.2f} ms -> {statistics.median(samples):8.2f} ms")
+        return 1 if differences or missing else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Simulador de escenarios del clima para planificación de capacidad.
+
+Simula un día completo de actualizaciones del clima (una cada WEATHER_UPDATE_INTERVAL
+segundos) en toda la red, sin servidor ni WebSocket, y escribe dos tablas por columnas:
+  - ticks.<formato>: retraso promedio y máximo, tramos más afectados y conectividad
+    de la red en cada actualización.
+  - segments.<formato>: retraso promedio y máximo, fracción del tiempo suspendido y
+    número de actualizaciones entre los más afectados de cada tramo.
+
+Uso (desde el directorio python/):
+    python -m app.tools.scenario --output scenario_out --seed 7
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from typing import Dict
+import numpy as np
+from app.config import (
+    SCENARIO_BLOCK_TICKS,
+    SCENARIO_FORMATS,
+    SCENARIO_SUSPENSION_PENALTY,
+    SCENARIO_TICKS,
+    SCENARIO_WORST_SEGMENTS,
+    WEATHER_UPDATE_INTERVAL
+)
+from app.models.metro import MetroSystem
+from app.models.network_config import NetworkConfig
+from app.models.scenario import run_scenario
+from app.models.weather_monitoring import WeatherMonitoringSystem
+from app.models.weather_simulator import WeatherSimulator
+
+logger = logging.getLogger(__name__)
+
+
+def write_table(path: str, columns: Dict[str, np.ndarray], fmt: str) -> str:
+    """Escribe una tabla por columnas como .npz (un arreglo por columna) o .csv"""
+    if fmt == "npz":
+        path = f"{path}.npz"
+        np.savez_compressed(path, **columns)
+        return path
+
+    path = f"{path}.csv"
+    names = list(columns)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name].tolist() for name in names)))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador de escenarios del clima para toda la red")
+    parser.add_argument("--ticks", type=int, default=SCENARIO_TICKS,
+                        help=f"Actualizaciones del clima a simular (por defecto un día: {SCENARIO_TICKS})")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para repetir el escenario")
+    parser.add_argument("--output", default="scenario", help="Directorio de salida")
+    parser.add_argument("--format", choices=SCENARIO_FORMATS, default=SCENARIO_FORMATS[0])
+    parser.add_argument("--worst", type=int, default=SCENARIO_WORST_SEGMENTS,
+                        help="Tramos más afectados a registrar por actualización")
+    parser.add_argument("--suspension-penalty", type=float, default=SCENARIO_SUSPENSION_PENALTY,
+                        help="Penalización desde la que un tramo se considera suspendido")
+    args = parser.parse_args(argv)
+    if args.ticks < 1 or args.worst < 1:
+        parser.error("--ticks y --worst deben ser positivos")
+
+    logging.basicConfig(level=logging.WARNING)
+    start = time.perf_counter()
+
+    # La red y la grilla de clima son las mismas del servidor
+    network_config = NetworkConfig.current()
+    metro_system = MetroSystem(network_config, verify_connectivity=False)
+    weather_monitoring_system = WeatherMonitoringSystem(network_config)
+    network = metro_system.edge_cost_model()
+    endpoint_cells = weather_monitoring_system.station_cells(network["nodes"])[network["endpoints"]]
+    simulator = WeatherSimulator(weather_monitoring_system.simulator.size, args.seed)
+    rng = np.random.default_rng(None if args.seed is None else args.seed + 1)
+
+    ticks, segments = run_scenario(
+        network, endpoint_cells, simulator, args.ticks, args.worst,
+        args.suspension_penalty, SCENARIO_BLOCK_TICKS, rng
+    )
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.output, exist_ok=True)
+    written = [
+        write_table(os.path.join(args.output, "ticks"), ticks, args.format),
+        write_table(os.path.join(args.output, "segments"), segments, args.format)
+    ]
+
+    hours = args.ticks * WEATHER_UPDATE_INTERVAL / 3600
+    print(f"{args.ticks} actualizaciones ({hours:.1f} h de clima) simuladas en {elapsed:.2f} s")
+    print(f"Retraso promedio por tramo: {ticks['mean_delay'].mean():.2f} min "
+          f"(máximo de una actualización: {ticks['mean_delay'].max():.2f} min)")
+    print(f"Pares de estaciones conectados: mínimo {ticks['connected_pairs'].min():.1%}, "
+          f"promedio {ticks['connected_pairs'].mean():.1%}; hasta {ticks['components'].max()} componentes")
+    print("Tramos con mayor retraso promedio:")
+    for eid in np.argsort(-segments["mean_delay"])[:args.worst].tolist():
+        print(f"  {segments['station1'][eid]} - {segments['station2'][eid]} ({segments['line'][eid]}): "
+              f"{segments['mean_delay'][eid]:.2f} min, suspendido {segments['suspended_fraction'][eid]:.1%}")
+    for path in written:
+        print(f"Escrito {path}")
+    metro_system.history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,13 @@ Módulo de utilidades del Metro de Medellín.
 Contiene funciones auxiliares y herramientas comunes.
 """
 
-from app.utils.graph_utils import generate_graph_visualization
+__all__ = ['generate_graph_visualization']
 
-__all__ = ['generate_graph_visualization'] 
\ No newline at end of file
+
+def __getattr__(name):
+    # Importación diferida: app.utils.gtfs se importa desde config.py y no debe
+    # arrastrar módulos que a su vez dependen de la configuración
+    if name == 'generate_graph_visualization':
+        from app.utils.graph_utils import generate_graph_visualization
+        return generate_graph_visualization
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
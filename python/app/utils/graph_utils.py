@@ -1,15 +1,12 @@
-import matplotlib.pyplot as plt
 from io import BytesIO
-import networkx as nx
 from app.config import (
-    METRO_LINES, 
     WEATHER_STATES, 
     TRANSFER_VISUAL
 )
 
-def get_station_coordinates(station_name: str) -> list:
-    """Obtiene las coordenadas de una estación desde METRO_LINES"""
-    for line_info in METRO_LINES.values():
+def get_station_coordinates(station_name: str, lines: dict) -> list:
+    """Obtiene las coordenadas de una estación desde las líneas de la red"""
+    for line_info in lines.values():
         if station_name in line_info["stations"]:
             return line_info["stations"][station_name]
     return None
@@ -19,20 +16,25 @@ def generate_graph_visualization(metro_system):
     Genera una visualización del sistema de metro con las rutas actuales
     y el estado del clima.
     """
+    # matplotlib y networkx son pesados: se importan solo cuando se pide una visualización
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     plt.figure(figsize=(15, 10))
     
     # Crear un grafo nuevo para la visualización
     G = metro_system.metro_graph.copy()
     
     # Crear un diccionario de posiciones único para cada estación
+    lines = metro_system.network.lines
     pos = {}
-    for line_info in METRO_LINES.values():
+    for line_info in lines.values():
         for station, coords in line_info["stations"].items():
             if station not in pos:  # Solo agregar si no existe
                 pos[station] = [coords[1], coords[0]]
     
     # Dibujar las líneas del metro con diferentes colores
-    for line_name, line_info in METRO_LINES.items():
+    for line_name, line_info in lines.items():
         stations = list(line_info["stations"].keys())
         edge_list = [
             (station1, station2)
@@ -89,7 +91,7 @@ def generate_graph_visualization(metro_system):
     # Crear leyenda para las líneas
     legend_elements = [
         plt.Line2D([0], [0], color=info["color"], label=f'Línea {line}')
-        for line, info in METRO_LINES.items()
+        for line, info in lines.items()
     ]
     if metro_system.route_history:
         legend_elements.append(
@@ -0,0 +1,232 @@
+"""
+Importador de feeds GTFS como fuente alternativa de la red.
+Lee stops.txt, routes.txt, trips.txt y stop_times.txt directamente del zip, fila por
+fila, y produce las mismas estructuras que config.py define a mano (líneas con sus
+estaciones, conexiones de transbordo, frecuencias y tipo de transporte por línea).
+Este módulo solo usa la biblioteca estándar porque se importa desde config.py.
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import pickle
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMPORTER_VERSION = 2
+DEFAULT_COLOR = "#6c757d"
+DEFAULT_HEADWAY = 10
+
+# Tipos de ruta GTFS (route_type) a tipos de transporte de la red
+GTFS_TRANSPORT_TYPES = {
+    "0": "tranvia",  # Tranvía
+    "1": "metro",    # Metro
+    "2": "metro",    # Tren
+    "3": "bus",      # Bus
+    "6": "cable",    # Teleférico
+    "7": "cable"     # Funicular
+}
+
+
+def feed_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash del contenido del feed (leído por bloques)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _rows(feed: zipfile.ZipFile, name: str) -> Iterator[Dict[str, str]]:
+    """Recorre un archivo del feed fila por fila sin cargarlo completo"""
+    with feed.open(name) as raw:
+        reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+        header = [column.strip() for column in next(reader, [])]
+        for row in reader:
+            if row:
+                yield dict(zip(header, row))
+
+
+def _parse_time(value: str) -> Optional[float]:
+    """Convierte 'HH:MM:SS' (la hora puede pasar de 24) a minutos desde la medianoche"""
+    if not value:
+        return None
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 60.0 + int(minutes) + int(seconds) / 60.0
+
+
+def _format_time(minutes: float) -> str:
+    """Minutos a 'HH:MM' dentro del mismo día (los servicios después de medianoche se recortan)"""
+    total = min(int(minutes), 24 * 60 - 1)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def compile_feed(path: str) -> Dict:
+    """Compila un feed GTFS a las estructuras de la red"""
+    with zipfile.ZipFile(path) as feed:
+        names = set(feed.namelist())
+
+        # Rutas: la clave de la línea es el nombre corto (o el id si no hay)
+        routes: Dict[str, Dict] = {}
+        used_keys = set()
+        for row in _rows(feed, "routes.txt"):
+            key = row.get("route_short_name") or row["route_id"]
+            if key in used_keys:
+                key = f"{key}-{row['route_id']}"
+            used_keys.add(key)
+            color = row.get("route_color")
+            routes[row["route_id"]] = {
+                "key": key,
+                "color": f"#{color}" if color else DEFAULT_COLOR,
+                "type": GTFS_TRANSPORT_TYPES.get(row.get("route_type", ""), "bus")
+            }
+
+        trips: Dict[str, Tuple[str, str, str]] = {}
+        for row in _rows(feed, "trips.txt"):
+            if row["route_id"] in routes:
+                trips[row["trip_id"]] = (
+                    row["route_id"], row.get("direction_id") or "0", row.get("service_id", "")
+                )
+
+        stops: Dict[str, Tuple[str, float, float, str]] = {}
+        for row in _rows(feed, "stops.txt"):
+            stops[row["stop_id"]] = (
+                row["stop_name"].strip(),
+                float(row["stop_lat"]),
+                float(row["stop_lon"]),
+                row.get("parent_station", "")
+            )
+
+        # stop_times.txt es el archivo grande y la especificación no exige que sus filas
+        # vengan agrupadas por viaje: una primera pasada solo cuenta las paradas de cada
+        # viaje y guarda la hora de su primera parada; la segunda recoge las paradas del
+        # recorrido más largo de cada ruta. La memoria crece con los viajes, no con las filas
+        trip_stops: Dict[str, int] = {}
+        trip_start: Dict[str, Tuple[int, Optional[float]]] = {}
+        used_stops = set()
+        for row in _rows(feed, "stop_times.txt"):
+            trip_id = row["trip_id"]
+            if trip_id not in trips:
+                continue
+            if row["stop_id"] in stops:
+                trip_stops[trip_id] = trip_stops.get(trip_id, 0) + 1
+                used_stops.add(row["stop_id"])
+            stop_sequence = int(row["stop_sequence"])
+            if trip_id not in trip_start or stop_sequence < trip_start[trip_id][0]:
+                trip_start[trip_id] = (
+                    stop_sequence,
+                    _parse_time(row.get("departure_time") or row.get("arrival_time", ""))
+                )
+
+        # Se prefiere el sentido 0 para fijar el orden de las estaciones de la línea
+        best: Dict[str, Tuple[Tuple[bool, int], str]] = {}
+        for trip_id, count in trip_stops.items():
+            route_id, direction, _ = trips[trip_id]
+            rank = (direction == "0", count)
+            if route_id not in best or rank > best[route_id][0]:
+                best[route_id] = (rank, trip_id)
+
+        # Horas de salida por ruta, sentido y calendario (service_id): los viajes de
+        # calendarios distintos (laborable, fin de semana...) no se mezclan
+        departures: Dict[Tuple[str, str, str], set] = {}
+        for trip_id, (_, departure) in trip_start.items():
+            if departure is not None:
+                departures.setdefault(trips[trip_id], set()).add(departure)
+
+        longest_trips = {trip_id: route_id for route_id, (_, trip_id) in best.items()}
+        trip_rows: Dict[str, List[Tuple[int, str]]] = {trip_id: [] for trip_id in longest_trips}
+        for row in _rows(feed, "stop_times.txt"):
+            rows = trip_rows.get(row["trip_id"])
+            if rows is not None and row["stop_id"] in stops:
+                rows.append((int(row["stop_sequence"]), row["stop_id"]))
+
+        longest = {
+            route_id: [stop_id for _, stop_id in sorted(trip_rows[trip_id])]
+            for trip_id, route_id in longest_trips.items()
+        }
+
+        lines: Dict[str, Dict] = {}
+        services: Dict[str, Dict] = {}
+        transport_types: Dict[str, str] = {}
+        for route_id, sequence in longest.items():
+            route = routes[route_id]
+            stations: Dict[str, List[float]] = {}
+            for stop_id in sequence:
+                name, lat, lon, _ = stops[stop_id]
+                stations.setdefault(name, [lat, lon])
+            if len(stations) < 2:
+                continue
+            lines[route["key"]] = {"color": route["color"], "stations": stations}
+            transport_types[route["key"]] = route["type"]
+
+            # Frecuencia promedio en el sentido y calendario con más viajes
+            times = max(
+                (sorted(service_times) for (rid, _, _), service_times in departures.items() if rid == route_id),
+                key=len,
+                default=[]
+            )
+            headway = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else DEFAULT_HEADWAY
+            services[route["key"]] = {
+                "headway": round(max(headway, 0.5), 1),
+                "first_departure": _format_time(times[0]) if times else "05:00",
+                "last_departure": _format_time(times[-1]) if times else "22:00"
+            }
+
+        # Transbordos: paradas con nombre distinto dentro de una misma estación padre
+        # (parent_station) y los pares declarados en transfers.txt si existe
+        transfers = set()
+        by_parent: Dict[str, set] = {}
+        for stop_id in used_stops:
+            name, _, _, parent = stops[stop_id]
+            if parent:
+                by_parent.setdefault(parent, set()).add(name)
+        for group in by_parent.values():
+            group = sorted(group)
+            transfers.update((a, b) for i, a in enumerate(group) for b in group[i + 1:])
+        if "transfers.txt" in names:
+            for row in _rows(feed, "transfers.txt"):
+                a, b = row.get("from_stop_id"), row.get("to_stop_id")
+                if a in used_stops and b in used_stops and stops[a][0] != stops[b][0]:
+                    transfers.add(tuple(sorted((stops[a][0], stops[b][0]))))
+
+    if not lines:
+        raise ValueError(f"El feed GTFS {path} no define ninguna línea con al menos dos estaciones")
+    logger.info(f"Feed GTFS compilado: {len(lines)} líneas y {len(transfers)} transbordos")
+    return {
+        "lines": lines,
+        "transfers": sorted(transfers),
+        "services": services,
+        "transport_types": transport_types
+    }
+
+
+def load_gtfs_network(path: str, cache_dir: str) -> Dict:
+    """
+    Carga la red desde un feed GTFS usando un artefacto binario en caché,
+    identificado por el hash del feed, para no recompilarlo en cada arranque.
+    """
+    key = f"{feed_hash(path)[:20]}-v{IMPORTER_VERSION}"
+    artifact = os.path.join(cache_dir, f"gtfs-{key}.pickle")
+    try:
+        with open(artifact, "rb") as f:
+            network = pickle.load(f)
+        logger.info(f"Red cargada desde el artefacto GTFS {artifact}")
+        return network
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Artefacto GTFS inválido, se recompila el feed: {e}")
+
+    network = compile_feed(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{artifact}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(network, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, artifact)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el artefacto GTFS: {e}")
+    return network
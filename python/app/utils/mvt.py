@@ -0,0 +1,134 @@
+"""
+Codificación mínima de teselas vectoriales Mapbox (MVT 2.1) sin dependencias:
+protobuf escrito a mano para capas con puntos y líneas, y proyección Web Mercator.
+"""
+import struct
+from math import asinh, pi, radians, tan
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+EXTENT = 4096
+BUFFER = 64
+
+POINT = 1
+LINESTRING = 2
+
+_MOVE_TO = 1
+_LINE_TO = 2
+
+
+def world_position(lat: float, lon: float) -> Tuple[float, float]:
+    """Proyección Web Mercator normalizada a [0, 1] (zoom 0)"""
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - asinh(tan(radians(lat))) / pi) / 2.0
+    return x, y
+
+
+def tile_point(world: Tuple[float, float], z: int, x: int, y: int, extent: int = EXTENT) -> Tuple[int, int]:
+    """Coordenadas enteras de un punto dentro de la tesela (z, x, y)"""
+    scale = 1 << z
+    return round((world[0] * scale - x) * extent), round((world[1] * scale - y) * extent)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _length_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def encode_geometry(geometry_type: int, parts: Sequence[Sequence[Tuple[int, int]]]) -> List[int]:
+    """Codifica puntos (cada parte un punto) o líneas (cada parte una polilínea) como comandos MVT"""
+    commands: List[int] = []
+    cursor_x, cursor_y = 0, 0
+    if geometry_type == POINT:
+        commands.append(_command(_MOVE_TO, len(parts)))
+        for (px, py), in parts:
+            commands += [_zigzag(px - cursor_x), _zigzag(py - cursor_y)]
+            cursor_x, cursor_y = px, py
+        return commands
+
+    for part in parts:
+        (px, py), rest = part[0], part[1:]
+        commands += [_command(_MOVE_TO, 1), _zigzag(px - cursor_x), _zigzag(py - cursor_y)]
+        cursor_x, cursor_y = px, py
+        commands.append(_command(_LINE_TO, len(rest)))
+        for px, py in rest:
+            commands += [_zigzag(px - cursor_x), _zigzag(py - cursor_y)]
+            cursor_x, cursor_y = px, py
+    return commands
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        payload = _key(7, 0) + _varint(int(value))
+    elif isinstance(value, int):
+        payload = _key(6, 0) + _varint(_zigzag(value))
+    elif isinstance(value, float):
+        payload = _key(3, 1) + struct.pack("<d", value)
+    else:
+        payload = _length_delimited(1, str(value).encode("utf-8"))
+    return payload
+
+
+def encode_layer(name: str, features: Iterable[Tuple[int, List[int], Dict]], extent: int = EXTENT) -> bytes:
+    """Codifica una capa; cada elemento es (tipo de geometría, comandos, propiedades)"""
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, object], int] = {}
+    encoded_values: List[bytes] = []
+    body = bytearray()
+    for geometry_type, geometry, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            value_key = (type(value), value)
+            if value_key not in values:
+                values[value_key] = len(encoded_values)
+                encoded_values.append(_encode_value(value))
+            tags.append(values[value_key])
+        feature = _packed(2, tags) + _key(3, 0) + _varint(geometry_type) + _packed(4, geometry)
+        body += _length_delimited(2, feature)
+
+    layer = bytearray(_key(15, 0) + _varint(2))
+    layer += _length_delimited(1, name.encode("utf-8"))
+    layer += body
+    for key in keys:
+        layer += _length_delimited(3, key.encode("utf-8"))
+    for value in encoded_values:
+        layer += _length_delimited(4, value)
+    layer += _key(5, 0) + _varint(extent)
+    return bytes(layer)
+
+
+def encode_tile(layers: Dict[str, List[Tuple[int, List[int], Dict]]]) -> bytes:
+    """Codifica una tesela con las capas que tienen elementos"""
+    return b"".join(
+        _length_delimited(3, encode_layer(name, features))
+        for name, features in layers.items() if features
+    )
@@ -0,0 +1,64 @@
+import hashlib
+import heapq
+from threading import Lock
+from typing import Dict, Hashable, List, Tuple
+import numpy as np
+
+
+class CountMinSketch:
+    """
+    Contador aproximado de frecuencias con memoria fija.
+    Nunca subestima: la estimación es el mínimo entre `depth` contadores, uno por fila,
+    cada fila con un hash independiente (BLAKE2b con una sal distinta por fila).
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+        self._salts = [row.to_bytes(hashlib.blake2b.SALT_SIZE, "little") for row in range(depth)]
+
+    def _columns(self, item: Hashable) -> np.ndarray:
+        data = repr(item).encode("utf-8")
+        return np.array([
+            int.from_bytes(hashlib.blake2b(data, digest_size=8, salt=salt).digest(), "little") % self.width
+            for salt in self._salts
+        ])
+
+    def add(self, item: Hashable, count: int = 1) -> int:
+        """Suma `count` ocurrencias y devuelve la nueva estimación"""
+        columns = self._columns(item)
+        self.table[self._rows, columns] += count
+        return int(self.table[self._rows, columns].min())
+
+    def estimate(self, item: Hashable) -> int:
+        return int(self.table[self._rows, self._columns(item)].min())
+
+
+class TopKTracker:
+    """Mantiene los k elementos más frecuentes de un flujo usando un CountMinSketch"""
+
+    def __init__(self, k: int, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._top: Dict[Hashable, int] = {}
+        self._lock = Lock()
+
+    def add(self, item: Hashable):
+        with self._lock:
+            estimate = self.sketch.add(item)
+            if item in self._top or len(self._top) < self.k:
+                self._top[item] = estimate
+                return
+
+            # Reemplazar al menos frecuente si el nuevo elemento lo supera
+            weakest = min(self._top, key=self._top.get)
+            if estimate > self._top[weakest]:
+                del self._top[weakest]
+                self._top[item] = estimate
+
+    def top(self) -> List[Tuple[Hashable, int]]:
+        """Elementos más frecuentes con su frecuencia estimada, de mayor a menor"""
+        with self._lock:
+            return heapq.nlargest(self.k, self._top.items(), key=lambda entry: entry[1])
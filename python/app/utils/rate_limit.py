@@ -0,0 +1,32 @@
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de tasa por cubeta de fichas: se recargan `rate` fichas por segundo
+    hasta un máximo de `burst`; cada solicitud consume una ficha.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, tokens: float = 1.0) -> bool:
+        """Consume fichas si hay suficientes; devuelve False si se excedió la tasa"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Segundos hasta que haya fichas suficientes"""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
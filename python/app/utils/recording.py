@@ -0,0 +1,125 @@
+"""
+Registro binario compacto de actualizaciones del clima y consultas, para grabarlas en
+producción y reproducirlas después de forma determinista.
+
+Formato (little endian):
+  - Cabecera: "MREC", versión del formato (uint16) y hash de la configuración de la red
+    (32 bytes) con la que se grabó.
+  - Registros: tipo (uint8), marca de tiempo Unix (float64), largo del contenido (uint32)
+    y el contenido. Cada registro se agrega con una sola escritura en modo de anexado,
+    así que varios procesos pueden grabar en el mismo archivo.
+El clima se guarda como arreglos (estado int8, intensidad float64 y lecturas en décimas
+int16 por celda); las consultas, como JSON.
+"""
+import json
+import logging
+import os
+import struct
+import time
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MREC"
+FORMAT_VERSION = 1
+
+# Tipos de registro
+WEATHER = 1
+HTTP = 2
+WEBSOCKET = 3
+
+_HEADER = struct.Struct("<4sH32s")
+_RECORD = struct.Struct("<BdI")
+_WEATHER = struct.Struct("<qI")  # Versión del clima y número de celdas
+_READING_FIELDS = 4
+
+
+def encode_weather(version: int, states: np.ndarray, intensity: np.ndarray, readings: np.ndarray) -> bytes:
+    """Contenido de un registro del clima"""
+    return b"".join((
+        _WEATHER.pack(version, len(states)),
+        np.asarray(states, dtype=np.int8).tobytes(),
+        np.asarray(intensity, dtype="<f8").tobytes(),
+        np.round(np.asarray(readings) * 10).astype("<i2").tobytes()  # Las lecturas tienen un decimal
+    ))
+
+
+def decode_weather(payload: bytes) -> Dict:
+    """Arreglos de un registro del clima"""
+    version, cells = _WEATHER.unpack_from(payload)
+    offset = _WEATHER.size
+    states = np.frombuffer(payload, dtype=np.int8, count=cells, offset=offset)
+    offset += cells
+    intensity = np.frombuffer(payload, dtype="<f8", count=cells, offset=offset)
+    offset += cells * 8
+    readings = np.frombuffer(payload, dtype="<i2", count=cells * _READING_FIELDS, offset=offset)
+    return {
+        "version": version,
+        "states": states.copy(),
+        "intensity": intensity.astype(np.float64),
+        "readings": readings.reshape(cells, _READING_FIELDS) / 10.0
+    }
+
+
+def encode_json(message) -> bytes:
+    """Contenido de un registro de consulta"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RecordWriter:
+    """Grabador que anexa registros a un archivo, creándolo con su cabecera si no existe"""
+
+    def __init__(self, path: str, config_hash: str):
+        self.path = path
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            os.write(fd, _HEADER.pack(MAGIC, FORMAT_VERSION, bytes.fromhex(config_hash)))
+        except FileExistsError:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        self._fd = fd
+
+    def write(self, kind: int, payload: bytes, timestamp: Optional[float] = None):
+        if self._fd is None:
+            return
+        header = _RECORD.pack(kind, time.time() if timestamp is None else timestamp, len(payload))
+        os.write(self._fd, header + payload)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def read_header(path: str) -> Tuple[int, str]:
+    """Versión del formato y hash de configuración de un registro"""
+    with open(path, "rb") as f:
+        data = f.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} no es un registro de grabación")
+    magic, version, config_hash = _HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} no es un registro de grabación")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Versión de registro no soportada: {version}")
+    return version, config_hash.hex()
+
+
+def read_records(path: str) -> Iterator[Tuple[int, float, bytes]]:
+    """Recorre los registros (tipo, marca de tiempo, contenido) en el orden en que se grabaron"""
+    read_header(path)
+    with open(path, "rb") as f:
+        f.seek(_HEADER.size)
+        while True:
+            header = f.read(_RECORD.size)
+            if not header:
+                return
+            if len(header) < _RECORD.size:
+                logger.warning(f"Registro incompleto al final de {path}; se ignora")
+                return
+            kind, timestamp, length = _RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning(f"Registro incompleto al final de {path}; se ignora")
+                return
+            yield kind, timestamp, payload
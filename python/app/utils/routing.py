@@ -0,0 +1,93 @@
+import heapq
+from itertools import count
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import networkx as nx
+
+
+def multi_source_dijkstra(graph: nx.Graph, sources: Dict[str, float], targets: Dict[str, float],
+                          weight: Union[str, Callable] = 'weight') -> Optional[Tuple[float, List[str]]]:
+    """
+    Búsqueda de Dijkstra desde varios orígenes con costo inicial propio
+    hacia varios destinos con costo final propio (por ejemplo tramos a pie).
+    `weight` es el nombre del atributo de peso o una función (u, v, data) como en networkx.
+    Devuelve el costo total y el camino de la mejor combinación, o None si no hay ruta.
+    """
+    if callable(weight):
+        weight_of = weight
+    else:
+        weight_of = lambda u, v, data: data.get(weight, 1.0)
+
+    distances: Dict[str, float] = {}
+    predecessors: Dict[str, Optional[str]] = {}
+    tie = count()
+    heap = []
+    for node, cost in sources.items():
+        heapq.heappush(heap, (cost, next(tie), node, None))
+
+    best_cost = float('inf')
+    best_target = None
+
+    while heap:
+        dist, _, node, previous = heapq.heappop(heap)
+        if node in distances:
+            continue
+        # Ningún nodo restante puede mejorar la mejor combinación encontrada
+        if dist >= best_cost:
+            break
+        distances[node] = dist
+        predecessors[node] = previous
+
+        if node in targets and dist + targets[node] < best_cost:
+            best_cost = dist + targets[node]
+            best_target = node
+
+        for neighbor, data in graph[node].items():
+            if neighbor not in distances:
+                cost = weight_of(node, neighbor, data)
+                if cost is not None:  # None = arista oculta (por ejemplo, cerrada)
+                    heapq.heappush(heap, (dist + cost, next(tie), neighbor, node))
+
+    if best_target is None:
+        return None
+
+    path = [best_target]
+    while predecessors[path[-1]] is not None:
+        path.append(predecessors[path[-1]])
+    path.reverse()
+    return best_cost, path
+
+
+def csr_shortest_path(indptr: List[int], neighbors: List[int], edge_ids: List[int], weights: List[float],
+                      source: int, target: int) -> Tuple[float, Optional[List[int]]]:
+    """
+    Dijkstra entre dos nodos sobre una adyacencia CSR (nodos y aristas numerados)
+    con el peso de cada arista por su id; las aristas con peso infinito se omiten.
+    Pensada para evaluar muchos vectores de pesos sobre la misma red sin networkx.
+    Devuelve el costo y el camino (índices de nodos), o (inf, None) si no hay ruta.
+    """
+    inf = float('inf')
+    distances = [inf] * (len(indptr) - 1)
+    predecessors = [-1] * (len(indptr) - 1)
+    distances[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        dist, node = heapq.heappop(heap)
+        if dist > distances[node]:
+            continue
+        if node == target:
+            break
+        for k in range(indptr[node], indptr[node + 1]):
+            cost = dist + weights[edge_ids[k]]
+            neighbor = neighbors[k]
+            if cost < distances[neighbor]:
+                distances[neighbor] = cost
+                predecessors[neighbor] = node
+                heapq.heappush(heap, (cost, neighbor))
+
+    if distances[target] == inf:
+        return inf, None
+    path = [target]
+    while path[-1] != source:
+        path.append(predecessors[path[-1]])
+    path.reverse()
+    return distances[target], path
@@ -0,0 +1,251 @@
+import os
+import time
+import logging
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.config import SHARED_STATE_PRODUCER_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Cabecera: secuencia del seqlock, época, número de celdas, número de aristas, última actualización,
+# pid del productor (0 = sin productor) y último latido del productor. Le sigue la tabla con
+# los pid de los procesos adjuntos (0 = libre)
+HEADER_FIELDS = 7
+SEQUENCE, EPOCH, CELLS, EDGES, LAST_UPDATE, PRODUCER_PID, HEARTBEAT = range(HEADER_FIELDS)
+MAX_ATTACHED_PROCESSES = 128
+READING_COLUMNS = 4
+MAX_READ_ATTEMPTS = 1000
+
+
+def _layout(n_cells: int, n_edges: int) -> Tuple[Dict[str, tuple], int]:
+    """Desplazamientos (en bytes) y formas de cada arreglo dentro del segmento, y su tamaño total"""
+    layout = {}
+    offset = (HEADER_FIELDS + MAX_ATTACHED_PROCESSES) * 8
+    for name, dtype, shape in (
+        ("intensity", np.float64, (n_cells,)),
+        ("readings", np.float64, (n_cells, READING_COLUMNS)),
+        ("edge_weights", np.float64, (n_edges,)),
+        ("states", np.int8, (n_cells,)),
+    ):
+        layout[name] = (offset, dtype, shape)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+@contextmanager
+def _ownership_lock(name: str):
+    """
+    Bloqueo entre procesos (archivo con flock) para los cambios de dueño del segmento:
+    crearlo, adjuntarse, tomar el rol de productor y soltarlo al salir.
+    """
+    import fcntl  # Solo POSIX: se importa al usar el estado compartido
+
+    with open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedNetworkState:
+    """
+    Estado de la red (clima por celda y pesos de aristas) en memoria compartida.
+    Un único proceso productor publica y los demás workers leen con un seqlock:
+    la secuencia es impar mientras se escribe y cada publicación completa la
+    incrementa en dos, de modo que un lector reintenta si la vio cambiar.
+
+    El productor deja en la cabecera su pid y un latido; si termina, se cuelga o
+    muere, un lector toma su lugar. El segmento no pertenece a ningún proceso:
+    lo elimina el último que se separa, así que sobrevive a la caída del productor.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, is_producer: bool):
+        self.shm = shm
+        self.is_producer = is_producer
+        self._header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self._attached = np.ndarray(
+            (MAX_ATTACHED_PROCESSES,), dtype=np.int64, buffer=shm.buf, offset=HEADER_FIELDS * 8
+        )
+        self.n_cells = int(self._header[CELLS])
+        self.n_edges = int(self._header[EDGES])
+        self._arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in _layout(self.n_cells, self.n_edges)[0].items()
+        }
+
+    @classmethod
+    def attach(cls, name: str, n_cells: int, n_edges: int) -> "SharedNetworkState":
+        """
+        Se une al segmento con el nombre indicado. El proceso que lo crea queda como
+        productor, y también el que lo encuentra sin un productor vivo (por ejemplo,
+        al reiniciar los workers tras la caída del productor).
+        """
+        _, size = _layout(n_cells, n_edges)
+        with _ownership_lock(name):
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                return cls._create(name, n_cells, n_edges, size)
+            # Nadie es dueño del segmento: que el resource tracker no lo elimine al salir
+            resource_tracker.unregister(shm._name, "shared_memory")
+            state = cls(shm, is_producer=False)
+            if (state.n_cells, state.n_edges) != (n_cells, n_edges):
+                if state.producer_alive():
+                    state._release()
+                    raise ValueError(
+                        f"La memoria compartida '{name}' tiene {state.n_cells} celdas y {state.n_edges} aristas; "
+                        f"se esperaban {n_cells} y {n_edges}"
+                    )
+                # Segmento abandonado de una ejecución anterior con otra red
+                state._release(unlink=True)
+                return cls._create(name, n_cells, n_edges, size)
+
+            try:
+                state._register_process()
+            except ValueError:
+                state._release()
+                raise
+            if not state.producer_alive():
+                state._become_producer()
+                logger.warning(f"Memoria compartida '{name}' sin productor activo: este proceso toma su lugar")
+            else:
+                logger.info(f"Memoria compartida '{name}' adjuntada: este proceso lee el clima del productor")
+            return state
+
+    @classmethod
+    def _create(cls, name: str, n_cells: int, n_edges: int, size: int) -> "SharedNetworkState":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        header = np.ndarray((HEADER_FIELDS + MAX_ATTACHED_PROCESSES,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[CELLS], header[EDGES] = n_cells, n_edges
+        state = cls(shm, is_producer=False)
+        state._register_process()
+        state._become_producer()
+        logger.info(f"Memoria compartida '{name}' creada: este proceso es el productor del clima")
+        return state
+
+    def _register_process(self):
+        """Anota este proceso en la tabla de adjuntos, reusando los lugares de procesos muertos"""
+        for slot, pid in enumerate(self._attached):
+            if pid == 0 or not _pid_alive(int(pid)):
+                self._attached[slot] = os.getpid()
+                return
+        raise ValueError(
+            f"La memoria compartida '{self.shm.name}' admite hasta {MAX_ATTACHED_PROCESSES} procesos adjuntos"
+        )
+
+    def _become_producer(self):
+        self.is_producer = True
+        self._header[PRODUCER_PID] = os.getpid()
+        self.heartbeat()
+
+    def heartbeat(self):
+        """Marca al productor como vivo (solo el productor)"""
+        self._header[HEARTBEAT] = np.float64(time.time()).view(np.int64)
+
+    def producer_alive(self) -> bool:
+        """Indica si hay un productor con el proceso vivo y un latido reciente"""
+        pid = int(self._header[PRODUCER_PID])
+        if pid == 0 or not _pid_alive(pid):
+            return False
+        heartbeat = float(self._header[HEARTBEAT:HEARTBEAT + 1].view(np.float64)[0])
+        return time.time() - heartbeat <= SHARED_STATE_PRODUCER_TIMEOUT
+
+    def take_over(self) -> bool:
+        """
+        Toma el rol de productor si el actual ya no está vivo.
+        Devuelve True si este proceso pasó a ser el productor; solo un lector lo logra.
+        """
+        if self.is_producer:
+            return False
+        with _ownership_lock(self.shm.name):
+            if self.producer_alive():
+                return False
+            self._become_producer()
+        logger.warning(f"El productor de la memoria compartida '{self.shm.name}' ya no está activo: este proceso toma su lugar")
+        return True
+
+    @property
+    def version(self) -> int:
+        """Número de publicaciones completas (0 si el productor aún no publica)"""
+        return int(self._header[SEQUENCE]) // 2
+
+    def publish(self, epoch: int, last_update: float, states: np.ndarray, intensity: np.ndarray,
+                readings: np.ndarray, edge_weights: np.ndarray):
+        """Publica un nuevo estado (solo el productor)"""
+        if not self.is_producer:
+            raise RuntimeError("Solo el proceso productor puede publicar el estado compartido")
+        header = self._header
+        header[SEQUENCE] += 1  # impar: escritura en curso
+        header[EPOCH] = epoch
+        header[LAST_UPDATE] = np.float64(last_update).view(np.int64)
+        self._arrays["states"][:] = states
+        self._arrays["intensity"][:] = intensity
+        self._arrays["readings"][:] = readings
+        self._arrays["edge_weights"][:] = edge_weights
+        header[SEQUENCE] += 1  # par: publicación completa
+        self.heartbeat()
+
+    def read(self, known_version: int = -1) -> Optional[Dict]:
+        """
+        Lee una copia consistente del estado publicado.
+        Devuelve None si no hay publicaciones o si la versión no cambió desde `known_version`.
+        """
+        for _ in range(MAX_READ_ATTEMPTS):
+            start = int(self._header[SEQUENCE])
+            if start % 2:
+                time.sleep(0)
+                continue
+            if start == 0 or start // 2 == known_version:
+                return None
+
+            snapshot = {name: array.copy() for name, array in self._arrays.items()}
+            epoch = int(self._header[EPOCH])
+            last_update = float(self._header[LAST_UPDATE:LAST_UPDATE + 1].view(np.float64)[0])
+
+            if int(self._header[SEQUENCE]) == start:
+                snapshot.update(version=start // 2, epoch=epoch, last_update=last_update)
+                return snapshot
+
+        logger.warning("No se pudo leer un estado consistente de la memoria compartida")
+        return None
+
+    def close(self):
+        """
+        Se separa del segmento. El productor deja libre su rol para que un lector lo tome;
+        el último proceso adjunto elimina el segmento.
+        """
+        with _ownership_lock(self.shm.name):
+            self._attached[self._attached == os.getpid()] = 0
+            if self.is_producer:
+                self._header[PRODUCER_PID] = 0
+            # Los procesos que murieron sin separarse no cuentan
+            last = not any(pid and _pid_alive(int(pid)) for pid in self._attached)
+            self._release(unlink=last)
+
+    def _release(self, unlink: bool = False):
+        self._arrays = {}
+        self._header = None
+        self._attached = None
+        self.shm.close()
+        if unlink:
+            # unlink() quita el registro del resource tracker, que se anuló al adjuntarse
+            resource_tracker.register(self.shm._name, "shared_memory")
+            self.shm.unlink()
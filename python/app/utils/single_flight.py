@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas: la primera llamada con una clave ejecuta la
+    función y las que llegan con la misma clave mientras está en curso esperan ese mismo
+    resultado (o excepción) en lugar de repetir el trabajo. Se usa desde un solo bucle
+    de eventos. El cálculo compartido no se cancela si se cancela alguna de las llamadas.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0  # Llamadas que ejecutaron la función
+        self.coalesced = 0   # Llamadas que esperaron una ejecución en curso
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """Resultado de la función para la clave y si se compartió una ejecución en curso"""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(function())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Si todas las llamadas se cancelaron nadie lee la excepción: se marca como leída
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import (
+    TRANSFER_TIME,
+    WEATHER_STATES,
+    WEATHER_GRID_CELL_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def network_config_hash(lines: Dict[str, Dict], transfers: List[Tuple[str, str]]) -> str:
+    """
+    Hash de la configuración de una red y del clima.
+    Una instantánea solo es válida si fue generada con la misma configuración.
+    """
+    config = {
+        "version": SNAPSHOT_VERSION,
+        "lines": lines,
+        "transfers": transfers,
+        "transfer_time": TRANSFER_TIME,
+        "weather_states": WEATHER_STATES,
+        "grid_cell_size": WEATHER_GRID_CELL_SIZE
+    }
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(path: str, config_hash: str, **arrays: np.ndarray):
+    """Guarda una instantánea comprimida de forma atómica (archivo temporal + reemplazo)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, config_hash=np.array(config_hash), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, config_hash: str) -> Optional[Dict[str, np.ndarray]]:
+    """Carga una instantánea si existe y coincide con el hash de configuración"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["config_hash"]) != config_hash:
+                logger.info("Instantánea descartada: la configuración de la red cambió")
+                return None
+            return {key: data[key] for key in data.files if key != "config_hash"}
+    except Exception as e:
+        logger.warning(f"No se pudo cargar la instantánea {path}: {e}")
+        return None
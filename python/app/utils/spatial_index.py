@@ -0,0 +1,107 @@
+from math import cos, radians, floor, hypot, isfinite
+import heapq
+from typing import Dict, Iterable, List, Tuple
+from app.config import DEFAULT_COORDINATES
+
+# Metros por grado de latitud (aproximación equirectangular, suficiente a escala urbana)
+METERS_PER_DEGREE = 111_320.0
+
+Cell = Tuple[int, int]
+
+
+class GridIndex:
+    """
+    Índice espacial de grilla regular sobre coordenadas (lat, lon).
+    Proyecta las coordenadas a metros alrededor de un origen y agrupa
+    los puntos en celdas cuadradas de `cell_size` metros.
+    """
+
+    def __init__(self, cell_size: float, origin: Tuple[float, float] = DEFAULT_COORDINATES):
+        self.cell_size = float(cell_size)
+        self.origin = origin
+        self._meters_per_lon = METERS_PER_DEGREE * cos(radians(origin[0]))
+        self.cells: Dict[Cell, List[str]] = {}
+        self.points: Dict[str, Tuple[float, float]] = {}
+        # Rectángulo de celdas ocupadas: (x mínima, y mínima, x máxima, y máxima)
+        self._bounds: Tuple[int, int, int, int] = None
+
+    def project(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Convierte (lat, lon) a metros (x, y) relativos al origen"""
+        x = (lon - self.origin[1]) * self._meters_per_lon
+        y = (lat - self.origin[0]) * METERS_PER_DEGREE
+        return x, y
+
+    def cell_of(self, lat: float, lon: float) -> Cell:
+        """Obtiene la celda que contiene una coordenada"""
+        x, y = self.project(lat, lon)
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def insert(self, name: str, coords: Iterable[float]) -> Cell:
+        lat, lon = coords
+        cell = self.cell_of(lat, lon)
+        self.points[name] = (lat, lon)
+        self.cells.setdefault(cell, []).append(name)
+        if self._bounds is None:
+            self._bounds = cell + cell
+        else:
+            x0, y0, x1, y1 = self._bounds
+            self._bounds = (min(x0, cell[0]), min(y0, cell[1]), max(x1, cell[0]), max(y1, cell[1]))
+        return cell
+
+    @classmethod
+    def build(cls, points: Dict[str, Iterable[float]], cell_size: float) -> "GridIndex":
+        """Construye el índice a partir de un diccionario nombre -> coordenadas"""
+        index = cls(cell_size)
+        for name, coords in points.items():
+            index.insert(name, coords)
+        return index
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Obtiene los k puntos más cercanos a una coordenada con su distancia en metros.
+        Recorre anillos de celdas alrededor de la celda de la consulta, recortados al
+        rectángulo de celdas ocupadas (una consulta lejana empieza en el primer anillo
+        que lo toca), y se detiene cuando ningún anillo más lejano puede mejorar los k
+        mejores candidatos. Lanza ValueError si la coordenada no es finita.
+        """
+        if not (isfinite(lat) and isfinite(lon)):
+            raise ValueError(f"Coordenada inválida: ({lat}, {lon})")
+        if not self.points or k <= 0:
+            return []
+
+        x, y = self.project(lat, lon)
+        cx, cy = floor(x / self.cell_size), floor(y / self.cell_size)
+        x0, y0, x1, y1 = self._bounds
+        first_ring = max(x0 - cx, cx - x1, y0 - cy, cy - y1, 0)
+        last_ring = max(abs(x0 - cx), abs(x1 - cx), abs(y0 - cy), abs(y1 - cy))
+
+        candidates = []
+        for ring in range(first_ring, last_ring + 1):
+            for cell in self._ring_cells(cx, cy, ring, self._bounds):
+                for name in self.cells.get(cell, ()):
+                    px, py = self.project(*self.points[name])
+                    candidates.append((hypot(px - x, py - y), name))
+
+            # Cualquier punto fuera de este anillo está al menos a `ring` celdas
+            if len(candidates) >= k:
+                best = heapq.nsmallest(k, candidates)
+                if best[-1][0] <= ring * self.cell_size:
+                    return [(name, distance) for distance, name in best]
+
+        return [(name, distance) for distance, name in heapq.nsmallest(k, candidates)]
+
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int, bounds: Tuple[int, int, int, int]) -> Iterable[Cell]:
+        """Celdas en el borde del cuadrado de radio `ring` alrededor de (cx, cy) dentro de `bounds`"""
+        x0, y0, x1, y1 = bounds
+        if ring == 0:
+            yield cx, cy
+            return
+        for y in (cy - ring, cy + ring):
+            if y0 <= y <= y1:
+                for x in range(max(cx - ring, x0), min(cx + ring, x1) + 1):
+                    yield x, y
+        for x in (cx - ring, cx + ring):
+            if x0 <= x <= x1:
+                for y in range(max(cy - ring + 1, y0), min(cy + ring - 1, y1) + 1):
+                    yield x, y
@@ -0,0 +1,147 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Palabras genéricas al inicio de los nombres ("Estación de metro cable ...") que no
+# distinguen una estación de otra; el resto del nombre es su nombre corto
+GENERIC_WORDS = {"estacion", "de", "del", "metro", "cable", "bus", "tranvia"}
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas sin tildes ni signos, con las palabras separadas por un espacio"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(stripped.casefold()))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de cada palabra con relleno en los bordes (como pg_trgm)"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class StationSearchIndex:
+    """
+    Índice de búsqueda de estaciones sin distinguir tildes ni mayúsculas.
+    Combina un índice de prefijos (arreglo ordenado de los sufijos del nombre que
+    empiezan en cada palabra, consultado con búsqueda binaria) con un índice invertido
+    de trigramas para tolerar errores de escritura. Se construye una sola vez.
+    """
+
+    # Puntajes: coincidencia exacta > prefijo del nombre > prefijo de una palabra > parecido
+    EXACT = 1.0
+    NAME_PREFIX = 0.9
+    WORD_PREFIX = 0.75
+    FUZZY = 0.7
+
+    def __init__(self, stations: Iterable[str]):
+        self.stations: List[str] = list(dict.fromkeys(stations))
+        self._position = {station: i for i, station in enumerate(self.stations)}
+        self._normalized: List[str] = []
+        self._short: List[str] = []
+        self._exact: Dict[str, List[int]] = {}
+        suffixes: List[Tuple[str, int, int]] = []
+        self._trigrams: List[Set[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+
+        for i, station in enumerate(self.stations):
+            normalized = normalize(station)
+            words = normalized.split()
+            generic = 0
+            while generic < len(words) - 1 and words[generic] in GENERIC_WORDS:
+                generic += 1
+            short = " ".join(words[generic:])
+            self._normalized.append(normalized)
+            self._short.append(short)
+            # Coincidencia exacta: el nombre completo, el corto y el corto con el tipo de
+            # transporte delante ("metro caribe", "bus caribe") para distinguir paradas homónimas
+            keys = {normalized, short} | {" ".join(words[position:]) for position in range(1, generic)}
+            for key in keys:
+                self._exact.setdefault(key, []).append(i)
+
+            # Sufijo desde cada palabra del nombre corto, más el nombre completo; los que
+            # empiezan en el nombre corto o en el completo cuentan como prefijo del nombre
+            for position in [0] + list(range(max(generic, 1), len(words))):
+                suffixes.append((" ".join(words[position:]), 0 if position <= generic else 1, i))
+
+            grams = trigrams(short)
+            self._trigrams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(i)
+
+        suffixes.sort()
+        self._suffix_keys = [suffix for suffix, _, _ in suffixes]
+        self._suffix_entries = [(kind, i) for _, kind, i in suffixes]
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Estaciones que coinciden con la consulta, de la más a la menos parecida"""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        def offer(i: int, score: float, match: str):
+            if score > scores.get(i, (0.0, ""))[0]:
+                scores[i] = (score, match)
+
+        for i in self._exact.get(q, ()):
+            offer(i, self.EXACT, "exact")
+
+        # Prefijos: todos los sufijos que empiezan con la consulta quedan contiguos
+        start = bisect_left(self._suffix_keys, q)
+        for k in range(start, len(self._suffix_keys)):
+            suffix = self._suffix_keys[k]
+            if not suffix.startswith(q):
+                break
+            kind, i = self._suffix_entries[k]
+            coverage = len(q) / len(suffix)
+            if kind == 0:
+                offer(i, self.NAME_PREFIX + 0.09 * coverage, "prefix")
+            else:
+                offer(i, self.WORD_PREFIX + 0.09 * coverage, "prefix")
+
+        # Parecido por trigramas (coeficiente de Jaccard) para errores de escritura
+        query_grams = trigrams(q)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for i in self._postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        for i, count in shared.items():
+            similarity = count / (len(query_grams) + len(self._trigrams[i]) - count)
+            offer(i, self.FUZZY * similarity, "fuzzy")
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], item[0]))
+        return [
+            {"station": self.stations[i], "score": round(score, 3), "match": match}
+            for i, (score, match) in ranked[:limit]
+        ]
+
+    def resolve(self, name: str, threshold: float, margin: float) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Estación a la que se refiere un nombre escrito por un usuario. Se acepta la mejor
+        coincidencia si supera `threshold` y aventaja por `margin` a la segunda estación.
+        Las estaciones que comparten nombre corto (la parada de metro y la de bus de un
+        mismo lugar) empatan y el nombre es ambiguo, salvo que indique el tipo de
+        transporte ("metro caribe"). Devuelve la estación (o None) y las sugerencias consideradas.
+        """
+        if name in self._position:
+            return name, []
+        suggestions = self.search(name, limit=5)
+        if not suggestions:
+            return None, []
+        best = suggestions[0]
+        runner_up = suggestions[1]["score"] if len(suggestions) > 1 else 0.0
+        # Una coincidencia exacta gana aunque otros nombres empiecen igual ("Industriales 1")
+        decisive = best["score"] - runner_up >= margin or (best["match"] == "exact" and runner_up < self.EXACT)
+        if best["score"] >= threshold and decisive:
+            return best["station"], suggestions
+        return None, suggestions
@@ -0,0 +1,96 @@
+"""
+Benchmark de arranque en frío del servidor.
+
+Mide en procesos nuevos:
+  - el tiempo de importar app.routes.api y app.main, y
+  - el tiempo desde que se lanza uvicorn hasta que responde la primera solicitud.
+
+Uso (desde el directorio python/):
+    python benchmarks/startup_benchmark.py --runs 5 --import-budget-ms 300
+Termina con código 1 si la mediana del tiempo de importación supera el presupuesto.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure_import(module: str) -> float:
+    """Tiempo (ms) de importar un módulo en un intérprete nuevo"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(path: str, timeout: float = 60.0) -> float:
+    """Tiempo (ms) desde lanzar uvicorn hasta recibir la primera respuesta exitosa"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"El servidor no respondió en {timeout} segundos")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/stations", help="Ruta de la primera solicitud")
+    parser.add_argument("--import-budget-ms", type=float, default=None,
+                        help="Presupuesto para la mediana del tiempo de importación de app.routes.api")
+    args = parser.parse_args()
+
+    results = {
+        "import app.routes.api": [measure_import("app.routes.api") for _ in range(args.runs)],
+        "import app.main": [measure_import("app.main") for _ in range(args.runs)],
+        f"primera solicitud {args.path}": [measure_first_request(args.path) for _ in range(args.runs)],
+    }
+
+    for name, samples in results.items():
+        print(f"{name:32s} mediana {statistics.median(samples):8.1f} ms  "
+              f"min {min(samples):8.1f} ms  max {max(samples):8.1f} ms")
+
+    if args.import_budget_ms is not None:
+        median_import = statistics.median(results["import app.routes.api"])
+        if median_import > args.import_budget_ms:
+            print(f"Presupuesto de importación superado: {median_import:.1f} ms > {args.import_budget_ms:.1f} ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()